@@ -0,0 +1,654 @@
+"""Offline benchmarks for the Sekolah Kita scraper.
+
+Runs against synthetic data shaped like the national dataset, so no network access is needed.
+
+    python bench_sekolah_kita.py writers --rows 400000
+    python bench_sekolah_kita.py memory --rows 400000
+    python bench_sekolah_kita.py transfer --rows 200000 --mbps 100
+    python bench_sekolah_kita.py --json suite --schools 20000 --output bench.json
+"""
+
+import argparse
+import csv
+import gzip
+import http.client
+import io
+import json
+import multiprocessing
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import scrape_sekolah_kita as scraper
+
+MOCK_SERVER = Path(__file__).resolve().with_name("mock_sekolah_kita_api.py")
+# Scraper modes exercised by the suite, as extra command-line arguments
+SUITE_MODES: Dict[str, List[str]] = {
+    "thread": [],
+    "adaptive": ["--adaptive-workers"],
+    "async": ["--engine", "async"],
+    "stream": ["--stream"],
+    "tuned": ["--tune-page-size"],
+}
+# Roughly the national shape: 38 provinces, ~514 kabupaten/kota, one in seven schools without a phone
+PROVINCE_COUNT = 38
+KABUPATEN_COUNT = 514
+BENTUK = ("TK", "KB", "SPS", "TPA", "RA")
+# How a listing page is fetched in the transfer benchmark: the old uncompressed read-then-parse,
+# gzip with the same read-then-parse, and gzip decompressed and parsed as the bytes arrive
+TRANSFER_MODES = ("buffered", "gzip", "streamed")
+
+
+def synthetic_rows(count: int, seed: int = 1) -> List[Tuple[str, ...]]:
+    rng = random.Random(seed)
+    provinces = [f"Prov. Provinsi {index + 1}" for index in range(PROVINCE_COUNT)]
+    kabupaten = [
+        (f"{'Kota' if index % 5 == 0 else 'Kab.'} Daerah {index + 1}", provinces[index % PROVINCE_COUNT])
+        for index in range(KABUPATEN_COUNT)
+    ]
+    rows: List[Tuple[str, ...]] = []
+    for index in range(count):
+        city, province = kabupaten[rng.randrange(KABUPATEN_COUNT)]
+        phone = "" if index % 7 == 0 else f"0{rng.randint(21, 999)}-{rng.randint(100000, 9999999)}"
+        rows.append(
+            (
+                f"{rng.choice(BENTUK)} {rng.choice(('NEGERI', 'SWASTA', 'ISLAM', 'KRISTEN'))} {rng.randint(1, 400)} {city.split()[-1]}",
+                f"Jl. {rng.choice(('Merdeka', 'Sudirman', 'Diponegoro', 'Kartini', 'Pahlawan'))} No. {rng.randint(1, 300)}",
+                city,
+                province,
+                phone,
+                str(uuid.UUID(int=rng.getrandbits(128))),
+            )
+        )
+    return rows
+
+
+def read_csv(path: Path) -> int:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+def read_jsonl(path: Path, output_format: str) -> int:
+    if output_format == "jsonl.zst":
+        zstandard = scraper.import_optional("zstandard", output_format)
+        stream = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+    else:
+        stream = gzip.open(path, "rt", encoding="utf-8")
+    with stream:
+        return sum(1 for line in stream if json.loads(line))
+
+
+def read_parquet(path: Path) -> int:
+    parquet = scraper.import_optional("pyarrow.parquet", "parquet")
+    return parquet.read_table(str(path)).num_rows
+
+
+def read_sqlite(path: Path) -> int:
+    conn = sqlite3.connect(str(path))
+    try:
+        return len(conn.execute("SELECT * FROM schools").fetchall())
+    finally:
+        conn.close()
+
+
+def synthetic_api_page(rows: List[Tuple[str, ...]], total: int, seed: int) -> Dict[str, Any]:
+    # A cari-sekolah response: the listing fields the scraper reads plus the kind of extra fields
+    # the API sends along with every school
+    rng = random.Random(seed)
+    data = []
+    for name, address, city, province, _, sekolah_id in rows:
+        data.append(
+            {
+                "sekolah_id": sekolah_id,
+                "npsn": str(rng.randint(10000000, 99999999)),
+                "nama": name,
+                "bentuk_pendidikan": rng.choice(BENTUK),
+                "status_sekolah": rng.choice(("NEGERI", "SWASTA")),
+                "alamat_jalan": address,
+                "desa": f"Desa {rng.randint(1, 5000)}",
+                "kecamatan": f"Kec. Kecamatan {rng.randint(1, 700)}",
+                "kabupaten": city,
+                "provinsi": province,
+                "kode_wilayah": f"{rng.randint(10, 99)}{rng.randint(1000, 9999)}",
+                "akreditasi": rng.choice(("A", "B", "C", "Belum Terakreditasi")),
+                "lintang": round(rng.uniform(-11.0, 6.0), 6),
+                "bujur": round(rng.uniform(95.0, 141.0), 6),
+            }
+        )
+    return {"total": total, "data": data}
+
+
+def peak_rss_mb() -> float:
+    # On Linux ru_maxrss survives fork+exec and would report the parent's peak, but VmHWM starts
+    # fresh with the new address space
+    try:
+        with open("/proc/self/status", "r") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+
+    # ru_maxrss is in bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024.0 * 1024.0)
+
+
+def listing_memory_child(paths: List[str], mode: str, results: Any) -> None:
+    # Runs in a fresh process so its peak RSS covers only this mode's listing
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    pages: Dict[int, List[Any]] = {}
+    for page, path in enumerate(paths):
+        body = Path(path).read_bytes()
+        if mode == "records":
+            result = json.loads(body.decode("utf-8", errors="ignore"), object_hook=scraper.school_record_hook)
+        else:
+            result = json.loads(body.decode("utf-8", errors="ignore"))
+        pages[page] = list(result.get("data") or [])
+        del body, result
+    if mode == "records":
+        items = scraper.merge_pages(pages)
+    else:
+        # The previous merge: every page list stays alive next to the concatenated copy
+        items = []
+        for page in sorted(pages):
+            items.extend(pages[page])
+    rows = sum(1 for row in items if row.get("sekolah_id"))
+    results.put(
+        {
+            "mode": mode,
+            "rows": rows,
+            "seconds": round(time.perf_counter() - started, 3),
+            "baseline_rss_mb": round(baseline, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+    )
+
+
+def bench_memory(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        print("The memory benchmark needs the resource module (Linux/macOS).", file=sys.stderr)
+        sys.exit(2)
+    page_size = args.page_size if args.page_size > 0 else args.rows
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.rows} synthetic API items in pages of {page_size}...", file=sys.stderr)
+        rows = synthetic_rows(args.rows)
+        paths: List[str] = []
+        for page, start in enumerate(range(0, len(rows), page_size)):
+            path = Path(tmp) / f"page_{page}.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(synthetic_api_page(rows[start : start + page_size], len(rows), seed=page), f, ensure_ascii=False)
+            paths.append(str(path))
+        del rows
+        # Spawned, not forked, so a child does not inherit this process's memory
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        for mode in ("raw", "records"):
+            proc = context.Process(target=listing_memory_child, args=(paths, mode, queue))
+            proc.start()
+            results.append(queue.get())
+            proc.join()
+    return results
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    # Serves one pre-encoded listing page, compressed when asked, paced to a link speed
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    raw = b""
+    compressed = b""
+    bytes_per_second = 0.0
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        gzipped = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        body = self.compressed if gzipped else self.raw
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        started = time.perf_counter()
+        step = scraper.STREAM_CHUNK_BYTES
+        for offset in range(0, len(body), step):
+            self.wfile.write(body[offset : offset + step])
+            if self.bytes_per_second:
+                ahead = (offset + step) / self.bytes_per_second - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+def transfer_child(url: str, mode: str, results: Any) -> None:
+    # Runs in a fresh process so its peak RSS covers only this mode's transfer and parse
+    baseline = peak_rss_mb()
+    payload = json.dumps(scraper.build_page_payload(0, 0)).encode("utf-8")
+    started = time.perf_counter()
+    first: List[float] = []
+
+    def hook(obj: Dict[str, Any]) -> Any:
+        record = scraper.school_record_hook(obj)
+        if not first and record is not obj:
+            first.append(time.perf_counter() - started)
+        return record
+
+    if mode == "streamed":
+        status, _, _, result, wire_bytes = scraper.ConnectionPool().request(
+            "POST",
+            url,
+            payload,
+            {"Content-Type": "application/json"},
+            consume=lambda chunks: scraper.read_json_array(chunks, "data", hook)[0],
+        )
+    else:
+        # What post_json did before: read the whole body, decode it to str, then parse
+        parts = urllib.parse.urlsplit(url)
+        conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=600)
+        headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip" if mode == "gzip" else "identity"}
+        conn.request("POST", parts.path, body=payload, headers=headers)
+        resp = conn.getresponse()
+        body = resp.read()
+        status, wire_bytes = resp.status, len(body)
+        if resp.getheader("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        # Parsing only starts after the last byte, and every record appears at once when it ends
+        result = json.loads(body.decode("utf-8", errors="ignore"), object_hook=hook)
+        del body
+        conn.close()
+    seconds = time.perf_counter() - started
+    results.put(
+        {
+            "mode": mode,
+            "status": status,
+            "rows": len(result.get("data") or []),
+            "wire_mb": round(wire_bytes / 1e6, 1),
+            "first_record_seconds": round(first[0] if first else seconds, 3),
+            "seconds": round(seconds, 3),
+            "baseline_rss_mb": round(baseline, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+    )
+
+
+def bench_transfer(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    try:
+        import resource  # noqa: F401
+    except ImportError:
+        print("The transfer benchmark needs the resource module (Linux/macOS).", file=sys.stderr)
+        sys.exit(2)
+    print(f"Generating a listing page of {args.rows} synthetic API items...", file=sys.stderr)
+    rows = synthetic_rows(args.rows)
+    raw = json.dumps(synthetic_api_page(rows, len(rows), seed=1), ensure_ascii=False).encode("utf-8")
+    del rows
+    handler = type(
+        "BoundPageHandler",
+        (PageHandler,),
+        {"raw": raw, "compressed": gzip.compress(raw, compresslevel=6), "bytes_per_second": args.mbps * 125000.0},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}{scraper.CARI_ENDPOINT[len(scraper.API_BASE) :]}"
+    results: List[Dict[str, Any]] = []
+    # Spawned, not forked, so a child does not inherit the page held by this process
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    try:
+        for mode in args.modes:
+            print(f"Running {mode}...", file=sys.stderr)
+            proc = context.Process(target=transfer_child, args=(url, mode, queue))
+            proc.start()
+            results.append(queue.get())
+            proc.join()
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    return {
+        f"p{pct}_ms": round(scraper.percentile(latencies, pct) * 1000.0, 1) for pct in (50, 95, 99)
+    }
+
+
+def run_instrumented(args: argparse.Namespace) -> Dict[str, Any]:
+    # One scrape in this process, with every request attempt recorded through the scraper's observers
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def observe(endpoint: str, latency: float, error: Optional[BaseException]) -> None:
+        with lock:
+            latencies.setdefault(endpoint, []).append(latency)
+            if error is not None:
+                errors[endpoint] = errors.get(endpoint, 0) + 1
+
+    scraper.REQUEST_OBSERVERS.append(observe)
+    exit_code = 0
+    started = time.perf_counter()
+    try:
+        scraper.main(args.scraper_args)
+    except SystemExit as exc:
+        exit_code = exc.code if isinstance(exc.code, int) else int(exc.code is not None)
+    wall = time.perf_counter() - started
+    everything = [latency for values in latencies.values() for latency in values]
+    metrics = {
+        "exit_code": exit_code,
+        "wall_seconds": round(wall, 3),
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "requests_per_second": round(len(everything) / wall, 2) if wall > 0 else 0.0,
+        "latency": latency_summary(everything),
+        "endpoints": {
+            endpoint: {"requests": len(values), "errors": errors.get(endpoint, 0), "latency": latency_summary(values)}
+            for endpoint, values in latencies.items()
+        },
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    with open(args.metrics, "w", encoding="utf-8") as f:
+        json.dump(metrics, f)
+    return metrics
+
+
+def server_stats(api_base: str) -> Dict[str, int]:
+    with urllib.request.urlopen(f"{api_base}/__stats", timeout=10) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def start_mock_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    command = [
+        sys.executable,
+        str(MOCK_SERVER),
+        "--port",
+        "0",
+        "--schools",
+        str(args.schools),
+        "--regions",
+        str(args.regions),
+        "--seed",
+        str(args.seed),
+        "--listing-latency",
+        args.listing_latency,
+        "--row-cost",
+        str(args.row_cost),
+        "--detail-latency",
+        args.detail_latency,
+        "--error-rate",
+        str(args.error_rate),
+        "--throttle-rate",
+        str(args.throttle_rate),
+        "--retry-after",
+        str(args.retry_after),
+    ]
+    if args.compress:
+        command.append("--compress")
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = server.stdout.readline().strip() if server.stdout else ""
+    if not line.startswith("Listening on "):
+        server.kill()
+        print(f"Mock server failed to start: {line or 'no output'}", file=sys.stderr)
+        sys.exit(1)
+    return server, line[len("Listening on ") :]
+
+
+def bench_suite(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    print(f"Starting mock API with {args.schools} schools...", file=sys.stderr)
+    server, api_base = start_mock_server(args)
+    results: List[Dict[str, Any]] = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for mode in args.modes:
+                output = Path(tmp) / f"{mode}.csv"
+                metrics_path = Path(tmp) / f"{mode}.json"
+                scraper_args = ["--api-base", api_base, "--no-cache", "--no-journal", "--output", str(output)]
+                scraper_args += ["--rps", str(args.rps)] if args.rps > 0 else ["--no-rate-limit"]
+                if args.skip_phone:
+                    scraper_args.append("--skip-phone")
+                scraper_args += SUITE_MODES[mode]
+                before = server_stats(api_base)
+                print(f"Running {mode}...", file=sys.stderr)
+                # Each mode gets its own interpreter, so peak RSS and warm-up are not shared between modes
+                completed = subprocess.run(
+                    [sys.executable, str(Path(__file__).resolve()), "run", "--metrics", str(metrics_path), "--"]
+                    + scraper_args,
+                    stdout=subprocess.DEVNULL,
+                    stderr=None if args.verbose else subprocess.DEVNULL,
+                )
+                after = server_stats(api_base)
+                try:
+                    with open(metrics_path, "r", encoding="utf-8") as f:
+                        metrics = json.load(f)
+                except (OSError, ValueError):
+                    metrics = {"exit_code": completed.returncode}
+                rows = read_csv(output) if output.exists() else 0
+                results.append(
+                    dict(
+                        {"mode": mode, "rows": rows},
+                        **metrics,
+                        server={key: after[key] - before.get(key, 0) for key in after},
+                    )
+                )
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+READERS: Dict[str, Callable[[Path, str], int]] = {
+    "csv": lambda path, _: read_csv(path),
+    "jsonl.gz": read_jsonl,
+    "jsonl.zst": read_jsonl,
+    "parquet": lambda path, _: read_parquet(path),
+    "sqlite": lambda path, _: read_sqlite(path),
+}
+
+
+def bench_writers(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    print(f"Generating {args.rows} synthetic rows...", file=sys.stderr)
+    rows = synthetic_rows(args.rows)
+    results: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for output_format in args.formats or list(scraper.OUTPUT_FORMATS):
+            try:
+                scraper.check_output_format(output_format)
+            except RuntimeError as exc:
+                print(f"Skipping {output_format}: {exc}", file=sys.stderr)
+                continue
+            path = Path(tmp) / f"bench{scraper.OUTPUT_FORMATS[output_format]}"
+            # Feed the writer page by page, like the streaming pipeline does
+            started = time.perf_counter()
+            writer = scraper.open_writer(str(path), output_format)
+            for start in range(0, len(rows), args.page_size):
+                writer.write(rows[start : start + args.page_size])
+                writer.flush()
+            writer.close()
+            write_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            read_back = READERS[output_format](path, output_format)
+            read_seconds = time.perf_counter() - started
+            if read_back != len(rows):
+                print(f"Warning: {output_format} read back {read_back} of {len(rows)} rows.", file=sys.stderr)
+            results.append(
+                {
+                    "format": output_format,
+                    "rows": len(rows),
+                    "write_seconds": round(write_seconds, 3),
+                    "read_seconds": round(read_seconds, 3),
+                    "bytes": path.stat().st_size,
+                }
+            )
+            path.unlink()
+    return results
+
+
+def print_table(results: List[Dict[str, Any]], columns: List[Tuple[str, str]]) -> None:
+    widths = [max(len(title), *(len(str(row[key])) for row in results)) for key, title in columns]
+    print("  ".join(title.ljust(width) for (_, title), width in zip(columns, widths)).rstrip())
+    for row in results:
+        print("  ".join(str(row[key]).ljust(width) for (key, _), width in zip(columns, widths)).rstrip())
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the Sekolah Kita scraper.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON instead of a table.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    writers = commands.add_parser("writers", help="Compare output formats by write time, read-back time and size.")
+    writers.add_argument("--rows", type=int, default=400000, help="Number of synthetic schools (default 400000).")
+    writers.add_argument(
+        "--page-size",
+        type=int,
+        default=scraper.STREAM_PAGE_SIZE,
+        help=f"Rows handed to the writer per call (default {scraper.STREAM_PAGE_SIZE}).",
+    )
+    writers.add_argument(
+        "--formats",
+        nargs="+",
+        choices=list(scraper.OUTPUT_FORMATS),
+        default=None,
+        help="Formats to compare (default: all whose dependencies are installed).",
+    )
+
+    memory = commands.add_parser(
+        "memory", help="Compare peak RSS of listing into raw API dicts (old) and compact records (new)."
+    )
+    memory.add_argument("--rows", type=int, default=400000, help="Number of synthetic schools (default 400000).")
+    memory.add_argument(
+        "--page-size",
+        type=int,
+        default=0,
+        help="Schools per API page. Default (0) puts everything in one page, like the scraper's default.",
+    )
+
+    transfer = commands.add_parser(
+        "transfer",
+        help="Compare bytes on the wire, time to first record and peak RSS of fetching one large listing page.",
+    )
+    transfer.add_argument("--rows", type=int, default=200000, help="Schools in the page (default 200000).")
+    transfer.add_argument(
+        "--mbps", type=float, default=100.0, help="Simulated link speed in Mbit/s; 0 is unlimited (default 100)."
+    )
+    transfer.add_argument(
+        "--modes",
+        nargs="+",
+        choices=TRANSFER_MODES,
+        default=list(TRANSFER_MODES),
+        help="Fetch modes to compare (default: all).",
+    )
+
+    suite = commands.add_parser(
+        "suite", help="Run the scraper end-to-end in each mode against a local mock API and report metrics."
+    )
+    suite.add_argument("--schools", type=int, default=20000, help="Schools in the mock dataset (default 20000).")
+    suite.add_argument("--regions", type=int, default=50, help="Kabupaten/kota in the mock dataset (default 50).")
+    suite.add_argument("--seed", type=int, default=1, help="Seed for the mock dataset and injected faults.")
+    suite.add_argument("--listing-latency", default="0.05", help="Mock cari-sekolah latency spec (default 0.05).")
+    suite.add_argument("--row-cost", type=float, default=0.00002, help="Mock latency per listed school in seconds.")
+    suite.add_argument(
+        "--detail-latency", default="lognormal:0.02:0.5", help="Mock full-detail latency spec (default lognormal:0.02:0.5)."
+    )
+    suite.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock responses that are 500.")
+    suite.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of mock responses that are 429.")
+    suite.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on mock 429s (default 1).")
+    suite.add_argument("--compress", action="store_true", help="Let the mock API gzip its responses.")
+    suite.add_argument(
+        "--modes",
+        nargs="+",
+        choices=list(SUITE_MODES),
+        default=list(SUITE_MODES),
+        help="Scraper modes to run (default: all).",
+    )
+    suite.add_argument("--rps", type=float, default=0.0, help="Scraper --rps; 0 runs with --no-rate-limit (default).")
+    suite.add_argument("--skip-phone", action="store_true", help="Listing only.")
+    suite.add_argument("--output", default=None, help="Also write the JSON report to this file.")
+    suite.add_argument("--verbose", action="store_true", help="Show the scraper's own progress output.")
+
+    run = commands.add_parser("run", help="Run one scrape in this process and write its request metrics (used by suite).")
+    run.add_argument("--metrics", required=True, help="Where to write the metrics JSON.")
+    run.add_argument("scraper_args", nargs=argparse.REMAINDER, help="Arguments for scrape_sekolah_kita.py after '--'.")
+    args = parser.parse_args(argv)
+    if args.command == "run" and args.scraper_args[:1] == ["--"]:
+        args.scraper_args = args.scraper_args[1:]
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.command == "writers":
+        results = bench_writers(args)
+        columns = [
+            ("format", "format"),
+            ("rows", "rows"),
+            ("write_seconds", "write s"),
+            ("read_seconds", "read s"),
+            ("bytes", "bytes"),
+        ]
+    elif args.command == "memory":
+        results = bench_memory(args)
+        columns = [
+            ("mode", "mode"),
+            ("rows", "rows"),
+            ("seconds", "parse s"),
+            ("baseline_rss_mb", "baseline MB"),
+            ("peak_rss_mb", "peak MB"),
+        ]
+    elif args.command == "transfer":
+        results = bench_transfer(args)
+        columns = [
+            ("mode", "mode"),
+            ("rows", "rows"),
+            ("wire_mb", "wire MB"),
+            ("first_record_seconds", "first record s"),
+            ("seconds", "total s"),
+            ("baseline_rss_mb", "baseline MB"),
+            ("peak_rss_mb", "peak MB"),
+        ]
+    elif args.command == "suite":
+        results = bench_suite(args)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        # A mode that crashed before writing metrics still gets a row
+        empty = {"requests": 0, "requests_per_second": 0.0, "wall_seconds": 0.0, "peak_rss_mb": 0.0}
+        table = [dict(empty, **row, **row.get("latency", {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0})) for row in results]
+        columns = [
+            ("mode", "mode"),
+            ("exit_code", "exit"),
+            ("rows", "rows"),
+            ("wall_seconds", "wall s"),
+            ("requests", "requests"),
+            ("requests_per_second", "req/s"),
+            ("p50_ms", "p50 ms"),
+            ("p95_ms", "p95 ms"),
+            ("p99_ms", "p99 ms"),
+            ("peak_rss_mb", "peak MB"),
+        ]
+    else:
+        run_instrumented(args)
+        return
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(table if args.command == "suite" else results, columns)
+
+
+if __name__ == "__main__":
+    main()
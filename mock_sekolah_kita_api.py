@@ -0,0 +1,276 @@
+"""Local stand-in for the Sekolah Kita API, for benchmarks and offline testing.
+
+Implements POST /v1/sekolah-service/sekolah/cari-sekolah (paging, total, kabupaten_kota,
+bentuk_pendidikan, status_sekolah and keyword filters) and GET .../full-detail/{sekolah_id}
+over a synthetic dataset, with configurable latency, 5xx errors and 429 throttling, and optional
+gzip/deflate compression for clients that accept it.
+
+    python mock_sekolah_kita_api.py --port 8765 --schools 50000 --detail-latency lognormal:0.08:0.5
+    python scrape_sekolah_kita.py --api-base http://127.0.0.1:8765
+
+GET /__stats returns request, error and throttle counters.
+"""
+
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CARI_PATH = "/v1/sekolah-service/sekolah/cari-sekolah"
+DETAIL_PREFIX = "/v1/sekolah-service/sekolah/full-detail/"
+# The scraper only asks for the early-childhood forms; the others are there so the filter has work to do
+BENTUK = ("TK", "KB", "SPS", "TPA", "RA", "SD", "SMP")
+STATUS = ("NEGERI", "SWASTA")
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    # "0.02" or "fixed:0.02", "uniform:LOW:HIGH", "normal:MEAN:SD", "lognormal:MEDIAN:SIGMA", "exp:MEAN"
+    kind, _, rest = spec.partition(":")
+    if not rest:
+        kind, rest = "fixed", spec
+    try:
+        values = [float(value) for value in rest.split(":")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid latency spec: {spec}") from None
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        # Parameterised by the median, which is easier to reason about than mu
+        return lambda rng: values[0] * rng.lognormvariate(0.0, values[1])
+    if kind == "exp" and len(values) == 1:
+        return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+    raise argparse.ArgumentTypeError(f"invalid latency spec: {spec}")
+
+
+def build_dataset(schools: int, regions: int, seed: int) -> List[Dict[str, Any]]:
+    # Region sizes follow a Zipf-like curve, so a few regions are much larger than the rest
+    rng = random.Random(seed)
+    provinces = [f"Prov. Provinsi {index + 1}" for index in range(max(1, regions // 14))]
+    kabupaten = [
+        (f"{'Kota' if index % 5 == 0 else 'Kab.'} Daerah {index + 1}", provinces[index % len(provinces)])
+        for index in range(regions)
+    ]
+    weights = [1.0 / (index + 1) for index in range(regions)]
+    data: List[Dict[str, Any]] = []
+    for index in range(schools):
+        city, province = rng.choices(kabupaten, weights)[0]
+        bentuk = rng.choice(BENTUK)
+        data.append(
+            {
+                "sekolah_id": f"{seed:04x}{index:012x}-mock",
+                "npsn": str(10000000 + index),
+                "nama": f"{bentuk} {rng.choice(STATUS)} {index} {city.split()[-1]}",
+                "bentuk_pendidikan": bentuk,
+                "status_sekolah": rng.choice(STATUS),
+                "alamat_jalan": f"Jl. {rng.choice(('Merdeka', 'Sudirman', 'Diponegoro', 'Kartini'))} No. {rng.randint(1, 300)}",
+                "kecamatan": f"Kec. Kecamatan {rng.randint(1, 700)}",
+                "kabupaten": city,
+                "provinsi": province,
+                "nomor_telepon": None if index % 7 == 0 else f"0{rng.randint(21, 999)}-{rng.randint(100000, 9999999)}",
+            }
+        )
+    return data
+
+
+class MockState:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.data = build_dataset(args.schools, args.regions, args.seed)
+        self.by_id = {row["sekolah_id"]: row for row in self.data}
+        self.listing_latency = args.listing_latency
+        self.detail_latency = args.detail_latency
+        self.row_cost = args.row_cost
+        self.error_rate = args.error_rate
+        self.throttle_rate = args.throttle_rate
+        self.retry_after = args.retry_after
+        self.compress = args.compress
+        self.rng = random.Random(args.seed + 1)
+        self.lock = threading.Lock()
+        self.counters = {"requests": 0, "listing": 0, "detail": 0, "errors": 0, "throttled": 0}
+        # Filtered listings are cached so deep paging does not re-filter the whole dataset each time
+        self._filtered: Dict[Tuple[str, str, str, str], List[Dict[str, Any]]] = {}
+
+    def filtered(self, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        bentuk = payload.get("bentuk_pendidikan") or ""
+        if isinstance(bentuk, list):
+            bentuk = ",".join(bentuk)
+        key = (
+            payload.get("kabupaten_kota") or "",
+            bentuk,
+            payload.get("status_sekolah") or "",
+            (payload.get("keyword") or "").lower(),
+        )
+        with self.lock:
+            rows = self._filtered.get(key)
+        if rows is None:
+            kab, forms, status, keyword = key
+            allowed = set(forms.split(",")) if forms else None
+            rows = [
+                row
+                for row in self.data
+                if (not kab or row["kabupaten"] == kab)
+                and (allowed is None or row["bentuk_pendidikan"] in allowed)
+                and (not status or row["status_sekolah"] == status)
+                and (not keyword or keyword in row["nama"].lower() or keyword in row["kabupaten"].lower())
+            ]
+            with self.lock:
+                self._filtered[key] = rows
+        return rows
+
+    def draw(self, sampler: Callable[[random.Random], float]) -> Tuple[float, Optional[int]]:
+        # Returns (latency, injected status or None)
+        with self.lock:
+            self.counters["requests"] += 1
+            latency = sampler(self.rng)
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                self.counters["throttled"] += 1
+                return latency, 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.counters["errors"] += 1
+                return latency, 500
+        return latency, None
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus delayed ACKs add ~40ms to each response
+    disable_nagle_algorithm = True
+    state: MockState
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        encoded = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        accepted = [value.split(";")[0].strip().lower() for value in (self.headers.get("Accept-Encoding") or "").split(",")]
+        encoding = next((name for name in ("gzip", "deflate") if name in accepted), None) if self.state.compress else None
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if encoding == "gzip":
+            encoded = gzip.compress(encoded, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+        elif encoding == "deflate":
+            encoded = zlib.compress(encoded, 6)
+            self.send_header("Content-Encoding", "deflate")
+        self.send_header("Content-Length", str(len(encoded)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def _inject(self, sampler: Callable[[random.Random], float], extra: float = 0.0) -> bool:
+        latency, status = self.state.draw(sampler)
+        time.sleep(latency + extra)
+        if status == 429:
+            self._send(429, {"message": "Too Many Requests"}, {"Retry-After": f"{self.state.retry_after:g}"})
+            return True
+        if status is not None:
+            self._send(status, {"message": "Internal Server Error"})
+            return True
+        return False
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            page, size = int(payload.get("page", 0)), int(payload.get("size", 10))
+        except ValueError:
+            self._send(400, {"message": "Bad Request"})
+            return
+        if self.path != CARI_PATH:
+            self._send(404, {"message": "Not Found"})
+            return
+        with self.state.lock:
+            self.state.counters["listing"] += 1
+        rows = self.state.filtered(payload)
+        chunk = rows[page * size : (page + 1) * size]
+        # Larger pages take longer, which is what the page-size tuner measures
+        if self._inject(self.state.listing_latency, extra=len(chunk) * self.state.row_cost):
+            return
+        self._send(200, {"total": len(rows), "data": [{k: v for k, v in row.items() if k != "nomor_telepon"} for row in chunk]})
+
+    def do_GET(self) -> None:
+        if self.path == "/__stats":
+            with self.state.lock:
+                self._send(200, dict(self.state.counters))
+            return
+        if not self.path.startswith(DETAIL_PREFIX):
+            self._send(404, {"message": "Not Found"})
+            return
+        with self.state.lock:
+            self.state.counters["detail"] += 1
+        if self._inject(self.state.detail_latency):
+            return
+        row = self.state.by_id.get(self.path[len(DETAIL_PREFIX) :])
+        if row is None:
+            self._send(404, {"message": "Not Found"})
+            return
+        self._send(200, {"data": {"sekolah": [dict(row)]}})
+
+
+def serve(args: argparse.Namespace) -> ThreadingHTTPServer:
+    handler = type("BoundMockHandler", (MockHandler,), {"state": MockState(args)})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local mock of the Sekolah Kita API.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on; 0 picks a free one (default 8765).")
+    parser.add_argument("--schools", type=int, default=10000, help="Number of synthetic schools (default 10000).")
+    parser.add_argument("--regions", type=int, default=50, help="Number of kabupaten/kota (default 50).")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the dataset and injected faults.")
+    parser.add_argument(
+        "--listing-latency",
+        type=parse_latency,
+        default=parse_latency("0.05"),
+        help="Base latency of cari-sekolah: SECONDS, uniform:LOW:HIGH, normal:MEAN:SD, lognormal:MEDIAN:SIGMA or exp:MEAN (default 0.05).",
+    )
+    parser.add_argument(
+        "--row-cost",
+        type=float,
+        default=0.00002,
+        help="Extra cari-sekolah latency per returned school in seconds (default 0.00002).",
+    )
+    parser.add_argument(
+        "--detail-latency",
+        type=parse_latency,
+        default=parse_latency("lognormal:0.02:0.5"),
+        help="Latency of full-detail, same forms as --listing-latency (default lognormal:0.02:0.5).",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429 (default 1).")
+    parser.add_argument(
+        "--compress", action="store_true", help="Compress responses with gzip or deflate when the client accepts it."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    server = serve(args)
+    host, port = server.server_address[:2]
+    # The first stdout line is read by the benchmark harness to find the port
+    print(f"Listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
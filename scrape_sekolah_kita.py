@@ -1,46 +1,197 @@
 import argparse
+import asyncio
+import codecs
+import cProfile
 import csv
+import difflib
+import email.utils
+import functools
+import gzip
+import hashlib
+import heapq
+import importlib
+import io
 import json
 import math
+import os
+import pstats
+import queue
 import random
+import secrets
+import socket
+import sqlite3
+import ssl
+import subprocess
 import sys
 import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime
+import tracemalloc
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.managers import BaseManager
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import http.client
 import urllib.error
+import urllib.parse
 import urllib.request
+import zlib
 
 
 API_BASE = "https://sekolah.data.kemendikdasmen.go.id"
-CARI_ENDPOINT = f"{API_BASE}/v1/sekolah-service/sekolah/cari-sekolah"
-DETAIL_ENDPOINT = f"{API_BASE}/v1/sekolah-service/sekolah/full-detail"
+CARI_PATH = "/v1/sekolah-service/sekolah/cari-sekolah"
+DETAIL_PATH = "/v1/sekolah-service/sekolah/full-detail"
+CARI_ENDPOINT = f"{API_BASE}{CARI_PATH}"
+DETAIL_ENDPOINT = f"{API_BASE}{DETAIL_PATH}"
 SAFE_METADATA_WORKERS_MAX = 2
 SAFE_DETAIL_WORKERS_MAX = 4
+# Upper bounds when worker counts adapt to server load (--adaptive-workers)
+ADAPTIVE_METADATA_WORKERS_MAX = 4
+ADAPTIVE_DETAIL_WORKERS_MAX = 16
+ASYNC_CONCURRENCY_DEFAULT = 8
+# Streaming mode (--stream): page size used instead of "one giant page", and max pages buffered before writing
+STREAM_PAGE_SIZE = 500
+STREAM_WINDOW_PAGES = 8
+# Page-size tuning (--tune-page-size): probe sizes, smallest size considered, and default per-page latency target
+PAGE_SIZE_PROBES = (256, 1024, 4096)
+MIN_TUNED_PAGE_SIZE = 64
+DEFAULT_PAGE_LATENCY_TARGET = 15.0
+# Compressed transfer: encodings we accept, and how much of a response body is read per step
+ACCEPT_ENCODING = "gzip, deflate"
+STREAM_CHUNK_BYTES = 65536
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 
-# Rate limiting constants (seconds)
-MIN_DELAY = 0.5
-MAX_DELAY = 1.5
-DISABLE_RATE_LIMIT = False
+# Rate limiting defaults (requests per second across all workers, and burst size)
+DEFAULT_RPS = 3.0
+DEFAULT_BURST = 5
+MAX_RETRY_AFTER = 300.0
+# Retry scheduler: attempts per listing page or detail lookup, and backoff step in seconds
+RETRY_ATTEMPTS = 5
+RETRY_BACKOFF = 2.0
+# Request hedging (--hedge): latency percentile after which a duplicate is sent, largest share of requests
+# that may be duplicates, answers kept for the percentile and needed before the first hedge, and check interval
+HEDGE_PERCENTILE = 95.0
+HEDGE_MAX_SHARE = 0.05
+HEDGE_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_POLL_INTERVAL = 0.02
+# Circuit breaker: trips when this share of the last BREAKER_WINDOW attempts hit overload errors,
+# then pauses for a cooldown that doubles after each failed probe
+BREAKER_THRESHOLD = 0.5
+BREAKER_WINDOW = 20
+BREAKER_COOLDOWN = 30.0
+BREAKER_MAX_COOLDOWN = 300.0
+# Detail cache defaults
+DEFAULT_CACHE_TTL_DAYS = 30.0
+DEFAULT_CACHE_MAX_MB = 512
+# Region index (province -> kabupaten/kota -> schools per bentuk_pendidikan), built from one nationwide listing
+REGION_INDEX_TTL_DAYS = 7.0
+REGION_INDEX_PAGE_SIZE = 2000
+# Upper bounds (seconds) of the request latency histogram in the run summary
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Output formats (--format) and their file suffixes; buffered writers flush in chunks of these many rows
+OUTPUT_FORMATS = {
+    "csv": ".csv",
+    "jsonl.gz": ".jsonl.gz",
+    "jsonl.zst": ".jsonl.zst",
+    "parquet": ".parquet",
+    "sqlite": ".sqlite3",
+}
+PARQUET_ROW_GROUP_ROWS = 65536
+SQLITE_BATCH_ROWS = 10000
+# Sharded runs (--coordinate/--worker): pages per shard, lease renewed by worker heartbeats, tries per shard
+SHARD_PAGES_DEFAULT = 10
+SHARD_LEASE_SECONDS = 60.0
+SHARD_ATTEMPTS = 3
+# Time-boxed runs (--deadline/--time-budget): the detail phase stops early enough to leave this share of the
+# budget (but at least DEADLINE_RESERVE_MIN seconds) for writing, and lookups in flight get DEADLINE_GRACE to land
+DEADLINE_RESERVE_SHARE = 0.05
+DEADLINE_RESERVE_MIN = 10.0
+DEADLINE_GRACE = 2.0
+# Read API (serve): listen port, seconds between checks for a newer dataset, and largest page of results
+SERVE_PORT_DEFAULT = 8700
+SERVE_RELOAD_INTERVAL = 5.0
+SERVE_MAX_LIMIT = 1000
+AUTHKEY_ENV = "SEKOLAH_KITA_AUTHKEY"
 ALLOWED_BENTUK_PENDIDIKAN = "KB,MAK,PAUDQ,RA,SPKTK,SPKPG,SPS,TK,TKLB,TPA"
+# Partitioned listing (--partition): every region is split into one sub-query per school form and status;
+# sub-queries of unknown size are paged in pages of this many schools
+PARTITION_STATUSES = ("NEGERI", "SWASTA")
+PARTITION_PAGE_SIZE = 1000
 
 # Global lock for thread-safe printing
 print_lock = threading.Lock()
 
 
+def set_api_base(base: str) -> None:
+    global API_BASE, CARI_ENDPOINT, DETAIL_ENDPOINT
+    API_BASE = base.rstrip("/")
+    CARI_ENDPOINT = f"{API_BASE}{CARI_PATH}"
+    DETAIL_ENDPOINT = f"{API_BASE}{DETAIL_PATH}"
+
+
 import re
 
-def build_timestamped_output(base_dir: Path, kabupaten_kota: str = "") -> Path:
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+def region_slug(kabupaten_kota: str) -> str:
+    # Sanitize: lowercase, replace non-alphanumeric with underscore
+    return re.sub(r"[^a-z0-9]+", "_", kabupaten_kota.lower()).strip("_")
+
+
+def output_stem(kabupaten_kota: str = "") -> str:
     if kabupaten_kota:
-        # Sanitize: lowercase, replace non-alphanumeric with underscore
-        safe_name = re.sub(r"[^a-z0-9]+", "_", kabupaten_kota.lower()).strip("_")
-        filename = f"sekolah_kita_{safe_name}_{ts}.csv"
-    else:
-        filename = f"sekolah_kita_{ts}.csv"
-    return base_dir / filename
+        return f"sekolah_kita_{region_slug(kabupaten_kota)}"
+    return "sekolah_kita"
+
+
+def build_timestamped_output(base_dir: Path, kabupaten_kota: str = "", output_format: str = "csv") -> Path:
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return base_dir / f"{output_stem(kabupaten_kota)}_{ts}{OUTPUT_FORMATS[output_format]}"
+
+
+def split_output_suffix(output_path: str) -> Tuple[Path, str]:
+    # "x.jsonl.gz" splits into ("x", ".jsonl.gz"), not ("x.jsonl", ".gz")
+    path = Path(output_path)
+    for suffix in OUTPUT_FORMATS.values():
+        if path.name.endswith(suffix) and len(path.name) > len(suffix):
+            return path.with_name(path.name[: -len(suffix)]), suffix
+    return path.with_suffix(""), path.suffix
+
+
+def app_dir() -> Path:
+    if getattr(sys, 'frozen', False):
+        # Running as compiled executable: the directory of the .exe
+        return Path(sys.executable).resolve().parent
+    # Running as script: the script's directory
+    return Path(__file__).resolve().parent
+
+
+def default_cache_dir() -> Path:
+    return app_dir() / "sekolah_kita_cache"
+
+
+def default_journal_path(output_path: str, kabupaten_kota: str = "") -> Path:
+    # Not timestamped, so a re-run for the same region finds the journal of the failed run
+    return Path(output_path).resolve().parent / f"{output_stem(kabupaten_kota)}.journal.jsonl"
+
+
+def region_output_path(output_path: str, kabupaten_kota: str) -> str:
+    base, suffix = split_output_suffix(output_path)
+    return str(base.with_name(f"{base.name}_{region_slug(kabupaten_kota)}{suffix or '.csv'}"))
+
+
+def load_regions_file(path: str) -> List[str]:
+    # One Kabupaten/Kota per line; blank lines and '#' comments are skipped
+    regions: List[str] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            name = line.split("#", 1)[0].strip()
+            if name:
+                regions.append(name)
+    return regions
 
 
 def prompt_int(prompt: str, default: int, min_value: int = 1, max_value: Optional[int] = None) -> int:
@@ -62,6 +213,22 @@ def prompt_int(prompt: str, default: int, min_value: int = 1, max_value: Optiona
         return value
 
 
+def prompt_float(prompt: str, default: float, min_value: float = 0.0) -> float:
+    while True:
+        raw = input(f"{prompt} [{default}]: ").strip()
+        if not raw:
+            return default
+        try:
+            value = float(raw)
+        except ValueError:
+            print("Please enter a number.")
+            continue
+        if value < min_value:
+            print(f"Please enter a value >= {min_value}.")
+            continue
+        return value
+
+
 def prompt_optional_int(prompt: str, default: Optional[int]) -> Optional[int]:
     label = f"[{default}]" if default is not None else "[blank for all]"
     while True:
@@ -100,280 +267,4692 @@ def prompt_str(prompt: str, default: str = "") -> str:
     return raw
 
 
-def post_json(url: str, payload: Dict[str, Any], retries: int = 3, backoff: float = 2.0) -> Dict[str, Any]:
-    # Rate limit delay
-    if not DISABLE_RATE_LIMIT:
-        time.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
-    attempt = 0
-    last_err: Optional[BaseException] = None
-    while attempt < retries:
+# Undoes a gzip or deflate Content-Encoding one chunk at a time
+class ContentDecoder:
+    def __init__(self, encoding: Optional[str]) -> None:
+        self.encoding = (encoding or "").strip().lower()
+        self._first = True
+        if self.encoding in ("gzip", "x-gzip"):
+            self._inflate: Any = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == "deflate":
+            self._inflate = zlib.decompressobj()
+        elif self.encoding in ("", "identity"):
+            self._inflate = None
+        else:
+            raise ValueError(f"unsupported Content-Encoding: {self.encoding}")
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._inflate is None:
+            return chunk
         try:
-            data_bytes = json.dumps(payload).encode("utf-8")
-            req = urllib.request.Request(url, data=data_bytes, method="POST")
-            req.add_header("Content-Type", "application/json")
-            req.add_header("Accept", "application/json")
-            # User-Agent to avoid blocking
-            req.add_header("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-            
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                body = resp.read().decode("utf-8", errors="ignore")
-            return json.loads(body)
-        except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError, json.JSONDecodeError) as exc:
-            last_err = exc
-            attempt += 1
-            if attempt >= retries:
+            if self._first and self.encoding == "deflate":
+                self._first = False
+                try:
+                    return self._inflate.decompress(chunk)
+                except zlib.error:
+                    # Some servers send raw deflate without the zlib header
+                    self._inflate = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._inflate.decompress(chunk)
+        except zlib.error as exc:
+            raise ValueError(f"corrupt {self.encoding} response body: {exc}") from None
+
+    def flush(self) -> bytes:
+        if self._inflate is None:
+            return b""
+        try:
+            return self._inflate.flush()
+        except zlib.error as exc:
+            raise ValueError(f"corrupt {self.encoding} response body: {exc}") from None
+
+
+def decode_content(data: bytes, encoding: Optional[str]) -> bytes:
+    decoder = ContentDecoder(encoding)
+    return decoder.decompress(data) + decoder.flush()
+
+
+# A response body as decompressed chunks, read from the socket only as they are consumed
+class ResponseBody:
+    def __init__(self, read: Callable[[int], bytes], encoding: Optional[str]) -> None:
+        self._read = read
+        self._decoder = ContentDecoder(encoding)
+        # Bytes as sent on the wire, before decompression
+        self.wire_bytes = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self._read(STREAM_CHUNK_BYTES)
+            if not chunk:
                 break
-            # Exponential backoff with jitter
-            wait_time = (backoff * attempt) + random.uniform(0.5, 1.5)
+            self.wire_bytes += len(chunk)
+            data = self._decoder.decompress(chunk)
+            if data:
+                yield data
+        tail = self._decoder.flush()
+        if tail:
+            yield tail
+
+    def read(self) -> bytes:
+        return b"".join(self)
+
+
+# Incremental parser for a JSON object whose `key` member is a large array (the cari-sekolah "data"):
+# items are yielded as soon as each one is complete, and the other members end up in `fields`.
+# Only one chunk of text and the item being parsed are held, never the whole body.
+class JsonArrayStream:
+    def __init__(
+        self, chunks: Iterable[bytes], key: str, object_hook: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> None:
+        self.key = key
+        self.fields: Dict[str, Any] = {}
+        # Time spent waiting for chunks, so callers can tell network time from parse time
+        self.read_seconds = 0.0
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        self._items = json.JSONDecoder(object_hook=object_hook)
+        self._plain = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        # Appends the next chunk of text to the unparsed tail; False once the body is exhausted
+        while not self._eof:
+            started = time.monotonic()
+            chunk = next(self._chunks, None)
+            self.read_seconds += time.monotonic() - started
+            if chunk is None:
+                self._eof = True
+                piece = self._text.decode(b"", final=True)
+            else:
+                piece = self._text.decode(chunk)
+            if piece:
+                self._buf = self._buf[self._pos :] + piece
+                self._pos = 0
+                return True
+        return False
+
+    def _peek(self) -> str:
+        # Next non-whitespace character, without consuming it; "" at the end of the body
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, allowed: str) -> str:
+        char = self._peek()
+        if not char or char not in allowed:
+            raise ValueError(f"malformed JSON: expected one of {allowed!r}, got {char or 'end of body'!r}")
+        self._pos += 1
+        return char
+
+    def _value(self, decoder: json.JSONDecoder) -> Any:
+        while True:
+            first = self._buf[self._pos] if self._pos < len(self._buf) else ""
+            if not first or first in " \t\r\n":
+                first = self._peek()
+            try:
+                value, end = decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # Most likely cut off at the end of the chunk; read more and parse the value again
+                if self._fill():
+                    continue
+                raise
+            # A number cut off at the end of the buffer parses as a shorter one ("1." as 1), so it only
+            # counts once a delimiter follows it
+            if (
+                first not in "{[\""
+                and (end == len(self._buf) or self._buf[end] not in " \t\r\n,]}")
+                and self._fill()
+            ):
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            name = self._value(self._plain)
+            if not isinstance(name, str):
+                raise ValueError("malformed JSON: object key is not a string")
+            self._expect(":")
+            if name == self.key and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value(self._items)
+                        # Compact JSON puts the comma right after the item
+                        if self._pos < len(self._buf) and self._buf[self._pos] == ",":
+                            self._pos += 1
+                        elif self._expect(",]") == "]":
+                            break
+            else:
+                self.fields[name] = self._value(self._plain)
+            if self._expect(",}") == "}":
+                return
+
+
+def read_json_array(
+    chunks: Iterable[bytes], key: str, object_hook: Optional[Callable[[Dict[str, Any]], Any]] = None
+) -> Tuple[Dict[str, Any], float]:
+    # The parsed object, with `key` built item by item as chunks arrive, and the seconds spent parsing
+    started = time.monotonic()
+    stream = JsonArrayStream(chunks, key, object_hook)
+    items = list(stream)
+    result = dict(stream.fields)
+    # Unless the member turned out not to be an array, in which case it was parsed whole into fields
+    result.setdefault(key, items)
+    return result, time.monotonic() - started - stream.read_seconds
+
+
+# Keep-alive http.client connections, one per (thread, scheme, host, port)
+class RequestCancelled(OSError):
+    # Raised in the thread whose request ConnectionPool.cancel() aborted
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, timeout: float = 60.0) -> None:
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[http.client.HTTPConnection] = []
+        # Requests being sent or awaited, by thread: (connection, start time)
+        self._active: Dict[int, Tuple[http.client.HTTPConnection, float]] = {}
+        self._cancelled: set = set()
+        self._ssl_context = ssl.create_default_context()
+        self.connections_opened = 0
+        self.requests_served = 0
+        self.reconnects = 0
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        consume: Optional[Callable[[ResponseBody], Any]] = None,
+    ) -> Tuple[int, str, http.client.HTTPMessage, Any, int]:
+        # Returns (status, reason, headers, body, bytes on the wire). The body is decompressed; with
+        # `consume`, a successful response is handed over as chunks instead and its result is returned.
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        request_headers = {"Accept": "application/json", "Accept-Encoding": ACCEPT_ENCODING, "User-Agent": USER_AGENT}
+        request_headers.update(headers or {})
+        thread = threading.get_ident()
+        while True:
+            conn, reused = self._acquire(key)
+            with self._lock:
+                self._active[thread] = (conn, time.monotonic())
+            try:
+                # Plain-HTTP proxies expect the absolute URL as request target
+                conn.request(method, url if getattr(conn, "_via_proxy", False) else target, body=body, headers=request_headers)
+                resp = conn.getresponse()
+                reader = ResponseBody(resp.read1, resp.getheader("Content-Encoding"))
+                if consume is not None and resp.status < 400:
+                    data = consume(reader)
+                    # Whatever the parser left unread, so the connection can be reused
+                    for _ in reader:
+                        pass
+                else:
+                    data = reader.read()
+                # read1() does not mark the response finished when Content-Length runs out, and the
+                # connection refuses a new request until it is
+                resp.close()
+            except BaseException as exc:
+                self._discard(key)
+                with self._lock:
+                    cancelled = thread in self._cancelled
+                    self._cancelled.discard(thread)
+                if cancelled:
+                    raise RequestCancelled(f"{method} {url} was cancelled") from exc
+                retryable = (
+                    http.client.RemoteDisconnected,
+                    ConnectionResetError,
+                    BrokenPipeError,
+                    http.client.CannotSendRequest,
+                )
+                if reused and isinstance(exc, retryable):
+                    # The server closed an idle keep-alive connection; retry on a fresh one.
+                    with self._lock:
+                        self.reconnects += 1
+                    continue
+                raise
+            finally:
+                with self._lock:
+                    self._active.pop(thread, None)
+            with self._lock:
+                # A cancel that came too late has already shut the socket; the answer stands, the connection does not
+                if thread in self._cancelled:
+                    self._cancelled.discard(thread)
+                    resp.will_close = True
+            if resp.will_close:
+                self._discard(key)
+            with self._lock:
+                self.requests_served += 1
+            return resp.status, resp.reason, resp.headers, data, reader.wire_bytes
+
+    def started(self, thread: int) -> Optional[float]:
+        # time.monotonic() at which the request `thread` is waiting on was sent, or None if it has none
+        with self._lock:
+            active = self._active.get(thread)
+        return active[1] if active is not None else None
+
+    def cancel(self, thread: int) -> bool:
+        # Shuts down the socket of the request `thread` is waiting on, so it raises RequestCancelled
+        # instead of running into the timeout. Returns False if that thread has no request in flight.
+        with self._lock:
+            active = self._active.get(thread)
+            if active is None or active[0].sock is None:
+                return False
+            self._cancelled.add(thread)
+            sock = active[0].sock
+        try:
+            # The plain socket method: an SSL socket's own shutdown() would tear down TLS state under the reader
+            socket.socket.shutdown(sock, socket.SHUT_RDWR)
+        except OSError:
+            pass
+        return True
+
+    def _acquire(self, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        conns = self._thread_connections()
+        conn = conns.get(key)
+        if conn is not None:
+            return conn, True
+        conn = self._open(*key)
+        conns[key] = conn
+        with self._lock:
+            self.connections_opened += 1
+            self._all.append(conn)
+        return conn, False
+
+    def _thread_connections(self) -> Dict[Tuple[str, str, int], http.client.HTTPConnection]:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+    def _open(self, scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+        proxy = urllib.request.getproxies().get(scheme)
+        if proxy and urllib.request.proxy_bypass(host):
+            proxy = None
+        if scheme == "https":
+            if proxy:
+                proxy_parts = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+                conn = http.client.HTTPSConnection(
+                    proxy_parts.hostname, proxy_parts.port or 80, timeout=self.timeout, context=self._ssl_context
+                )
+                conn.set_tunnel(host, port)
+                return conn
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl_context)
+        if proxy:
+            proxy_parts = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+            conn = http.client.HTTPConnection(proxy_parts.hostname, proxy_parts.port or 80, timeout=self.timeout)
+            conn._via_proxy = True  # type: ignore[attr-defined]
+            return conn
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _discard(self, key: Tuple[str, str, int]) -> None:
+        conn = self._thread_connections().pop(key, None)
+        if conn is not None:
+            conn.close()
+            with self._lock:
+                if conn in self._all:
+                    self._all.remove(conn)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "connections_opened": self.connections_opened,
+                "requests_served": self.requests_served,
+                "reconnects": self.reconnects,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            conn.close()
+
+
+CONNECTION_POOL = ConnectionPool()
+
+
+# Process-wide token bucket shared by every worker thread and the async engine
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, enabled: bool = True) -> None:
+        self._lock = threading.Lock()
+        # Disabled buckets hand out tokens without waiting, but still honour pauses requested by the server
+        self.enabled = enabled
+        self.rate = rate
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.pauses = 0
+
+    def configure(self, rate: float, burst: int) -> None:
+        with self._lock:
+            self.rate = rate
+            self.capacity = float(max(1, burst))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def reserve(self) -> Tuple[float, int]:
+        # Take a token (possibly going into debt) and return how long to wait before using it
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self.paused_until - now)
+            if self.rate > 0 and self.enabled:
+                self.tokens = min(self.capacity, self.tokens + max(0.0, now - self.updated) * self.rate)
+                self.updated = max(self.updated, now)
+                self.tokens -= 1.0
+                wait = (self.updated - now) + (-self.tokens / self.rate if self.tokens < 0 else 0.0)
+            return wait, self.pauses
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            until = time.monotonic() + seconds
+            if until <= self.paused_until:
+                return
+            self.paused_until = until
+            self.pauses += 1
+            # No tokens accrue while paused, so workers resume at the configured rate instead of in a burst
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = max(self.updated, until)
+
+    def acquire(self) -> None:
+        while True:
+            wait, pauses = self.reserve()
+            if wait > 0:
+                time.sleep(wait)
+            # A 429/503 elsewhere while we slept invalidates our place in the queue
+            if pauses == self.pauses:
+                return
+
+    async def acquire_async(self) -> None:
+        while True:
+            wait, pauses = self.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if pauses == self.pauses:
+                return
+
+
+RATE_LIMITER = TokenBucket(DEFAULT_RPS, DEFAULT_BURST)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    return min(max(0.0, seconds), MAX_RETRY_AFTER)
+
+
+def retry_delay(exc: BaseException, attempt: int, backoff: float, limiter: Optional[TokenBucket] = None) -> float:
+    # Exponential backoff with jitter
+    delay = (backoff * attempt) + random.uniform(0.5, 1.5)
+    if isinstance(exc, urllib.error.HTTPError) and exc.code in (429, 503):
+        retry_after = parse_retry_after(exc.headers.get("Retry-After") if exc.headers else None)
+        if retry_after is not None:
+            delay = retry_after
+        # The server is telling all of us to slow down, not just this worker
+        (limiter or RATE_LIMITER).pause(delay)
+    return delay
+
+
+# Callbacks invoked after every HTTP attempt as (endpoint, latency seconds, error or None)
+REQUEST_OBSERVERS: List[Callable[[str, float, Optional[BaseException]], None]] = []
+
+
+def endpoint_name(url: str) -> str:
+    if url.startswith(DETAIL_ENDPOINT):
+        return "full-detail"
+    if url.startswith(CARI_ENDPOINT):
+        return "cari-sekolah"
+    return urllib.parse.urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1] or url
+
+
+def notify_request(
+    endpoint: str,
+    latency: float,
+    error: Optional[BaseException],
+    observers: Optional[List[Callable[[str, float, Optional[BaseException]], None]]] = None,
+) -> None:
+    for observer in list(REQUEST_OBSERVERS if observers is None else observers):
+        observer(endpoint, latency, error)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def error_label(error: BaseException) -> str:
+    if isinstance(error, urllib.error.HTTPError):
+        return f"HTTPError {error.code}"
+    return type(error).__name__
+
+
+def format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+
+# Request accounting for one endpoint. Times are summed over all workers, so they can exceed wall time.
+class EndpointMetrics:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.retries = 0
+        self.failures: Dict[str, int] = {}
+        self.bytes_received = 0
+        # Per-bucket counts for LATENCY_BUCKETS, plus one overflow bucket
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.rate_limit_wait = 0.0
+        self.network = 0.0
+        self.decode = 0.0
+        self.retry_sleep = 0.0
+        self.hedges = 0
+        self.hedges_won = 0
+
+    def quantile(self, q: float) -> float:
+        # Interpolated within the bucket, like Prometheus' histogram_quantile
+        rank = q * self.requests
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def as_dict(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets: Dict[str, int] = {}
+        for bound, count in zip([f"{bound:g}" for bound in LATENCY_BUCKETS] + ["+Inf"], self.buckets):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "hedges": {"fired": self.hedges, "won": self.hedges_won},
+            "failures": dict(self.failures),
+            "bytes_received": self.bytes_received,
+            "latency_seconds": {
+                "sum": round(self.latency_sum, 6),
+                "p50": round(self.quantile(0.50), 4),
+                "p95": round(self.quantile(0.95), 4),
+                "p99": round(self.quantile(0.99), 4),
+                "buckets": buckets,
+            },
+            "time_seconds": {
+                "rate_limit_wait": round(self.rate_limit_wait, 6),
+                "network": round(self.network, 6),
+                "decode": round(self.decode, 6),
+                "retry_sleep": round(self.retry_sleep, 6),
+            },
+        }
+
+
+# Run-wide counters behind the end-of-run breakdown, --metrics-json and --metrics-prom
+class RunMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self._phase: Optional[Tuple[str, float, int]] = None
+        self._requests = 0
+        self.started = time.monotonic()
+        self.started_at = datetime.now(timezone.utc)
+
+    def _endpoint(self, endpoint: str) -> EndpointMetrics:
+        metrics = self.endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self.endpoints[endpoint] = EndpointMetrics()
+        return metrics
+
+    def record(
+        self,
+        endpoint: str,
+        queued: float,
+        started: float,
+        received: Optional[float],
+        finished: float,
+        nbytes: int,
+        error: Optional[BaseException],
+    ) -> None:
+        # queued -> started is rate-limit wait, started -> received is network, received -> finished is decode
+        latency = finished - started
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics.requests += 1
+            self._requests += 1
+            metrics.bytes_received += nbytes
+            metrics.latency_sum += latency
+            index = 0
+            while index < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[index]:
+                index += 1
+            metrics.buckets[index] += 1
+            metrics.rate_limit_wait += started - queued
+            metrics.network += (received if received is not None else finished) - started
+            if received is not None:
+                metrics.decode += finished - received
+            if error is not None:
+                label = error_label(error)
+                metrics.failures[label] = metrics.failures.get(label, 0) + 1
+
+    def record_retry(self, endpoint: str, delay: float) -> None:
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics.retries += 1
+            metrics.retry_sleep += delay
+
+    def record_hedge_fired(self, endpoint: str) -> None:
+        with self._lock:
+            self._endpoint(endpoint).hedges += 1
+
+    def record_hedge_won(self, endpoint: str) -> None:
+        with self._lock:
+            self._endpoint(endpoint).hedges_won += 1
+
+    def total_requests(self) -> int:
+        return self._requests
+
+    def begin_phase(self, name: Optional[str]) -> None:
+        # Phases run back to back; starting one (or passing None) closes the previous one
+        now = time.monotonic()
+        with self._lock:
+            if self._phase is not None:
+                previous, since, requests = self._phase
+                phase = self.phases.setdefault(previous, {"seconds": 0.0, "requests": 0})
+                phase["seconds"] += now - since
+                phase["requests"] += self._requests - requests
+            self._phase = (name, now, self._requests) if name else None
+
+    def summary(self, status: str) -> Dict[str, Any]:
+        self.begin_phase(None)
+        with self._lock:
+            return {
+                "status": status,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "wall_seconds": round(time.monotonic() - self.started, 3),
+                "requests": self._requests,
+                "phases": {name: {"seconds": round(p["seconds"], 3), "requests": int(p["requests"])} for name, p in self.phases.items()},
+                "endpoints": {name: metrics.as_dict() for name, metrics in sorted(self.endpoints.items())},
+            }
+
+    def report(self) -> None:
+        self.begin_phase(None)
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            phases = list(self.phases.items())
+        if phases:
+            print("[Metrics] phases: " + ", ".join(f"{name} {p['seconds']:.1f}s" for name, p in phases), file=sys.stderr)
+        for name, m in endpoints:
+            failures = ", ".join(f"{label}: {count}" for label, count in sorted(m.failures.items()))
+            hedges = f", {m.hedges} hedged ({m.hedges_won} won)" if m.hedges else ""
+            print(
+                f"[Metrics] {name}: {m.requests} requests, {m.retries} retries{hedges}, {sum(m.failures.values())} failed"
+                f"{f' ({failures})' if failures else ''}, {m.bytes_received / 1e6:.1f} MB,"
+                f" p50 {m.quantile(0.5):.2f}s p95 {m.quantile(0.95):.2f}s;"
+                f" network {m.network:.1f}s, decode {m.decode:.1f}s,"
+                f" rate-limit wait {m.rate_limit_wait:.1f}s, retry sleep {m.retry_sleep:.1f}s",
+                file=sys.stderr,
+            )
+
+    def prometheus(self, status: str) -> str:
+        summary = self.summary(status)
+        prefix = "sekolah_kita"
+        lines = [
+            f"# HELP {prefix}_requests_total HTTP attempts, including retried ones.",
+            f"# TYPE {prefix}_requests_total counter",
+        ]
+        endpoints = summary["endpoints"]
+        lines += [f'{prefix}_requests_total{{endpoint="{name}"}} {m["requests"]}' for name, m in endpoints.items()]
+        lines += [f"# HELP {prefix}_request_retries_total Failed attempts that were retried.", f"# TYPE {prefix}_request_retries_total counter"]
+        lines += [f'{prefix}_request_retries_total{{endpoint="{name}"}} {m["retries"]}' for name, m in endpoints.items()]
+        lines += [f"# HELP {prefix}_request_hedges_total Duplicate requests sent for slow ones, by outcome.", f"# TYPE {prefix}_request_hedges_total counter"]
+        lines += [
+            f'{prefix}_request_hedges_total{{endpoint="{name}",outcome="{outcome}"}} {count}'
+            for name, m in endpoints.items()
+            for outcome, count in (("won", m["hedges"]["won"]), ("lost", m["hedges"]["fired"] - m["hedges"]["won"]))
+        ]
+        lines += [f"# HELP {prefix}_request_failures_total Failed attempts by error.", f"# TYPE {prefix}_request_failures_total counter"]
+        lines += [
+            f'{prefix}_request_failures_total{{endpoint="{name}",error="{label}"}} {count}'
+            for name, m in endpoints.items()
+            for label, count in sorted(m["failures"].items())
+        ]
+        lines += [f"# HELP {prefix}_response_bytes_total Response body bytes received.", f"# TYPE {prefix}_response_bytes_total counter"]
+        lines += [f'{prefix}_response_bytes_total{{endpoint="{name}"}} {m["bytes_received"]}' for name, m in endpoints.items()]
+        lines += [f"# HELP {prefix}_request_duration_seconds Time from send to decoded response.", f"# TYPE {prefix}_request_duration_seconds histogram"]
+        for name, m in endpoints.items():
+            latency = m["latency_seconds"]
+            lines += [f'{prefix}_request_duration_seconds_bucket{{endpoint="{name}",le="{le}"}} {count}' for le, count in latency["buckets"].items()]
+            lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{name}"}} {latency["sum"]}')
+            lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{name}"}} {m["requests"]}')
+        lines += [
+            f"# HELP {prefix}_request_time_seconds_total Worker time per endpoint by kind (rate_limit_wait, network, decode, retry_sleep).",
+            f"# TYPE {prefix}_request_time_seconds_total counter",
+        ]
+        lines += [
+            f'{prefix}_request_time_seconds_total{{endpoint="{name}",kind="{kind}"}} {seconds}'
+            for name, m in endpoints.items()
+            for kind, seconds in m["time_seconds"].items()
+        ]
+        lines += [f"# HELP {prefix}_phase_seconds Wall time of each run phase.", f"# TYPE {prefix}_phase_seconds gauge"]
+        lines += [f'{prefix}_phase_seconds{{phase="{name}"}} {p["seconds"]}' for name, p in summary["phases"].items()]
+        lines += [
+            f"# HELP {prefix}_run_seconds Wall time of the last run.",
+            f"# TYPE {prefix}_run_seconds gauge",
+            f'{prefix}_run_seconds{{status="{status}"}} {summary["wall_seconds"]}',
+            f"# HELP {prefix}_run_timestamp_seconds Start of the last run (Unix time).",
+            f"# TYPE {prefix}_run_timestamp_seconds gauge",
+            f"{prefix}_run_timestamp_seconds {self.started_at.timestamp():.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+RUN_METRICS = RunMetrics()
+
+
+# --profile: cProfile and tracemalloc around each phase. Each phase's stats go to <output>.<phase>.prof
+# (for pstats/snakeviz) and a readable summary of all phases to <output>.profile.txt.
+class PhaseProfiler:
+    def __init__(self, base: Path, top: int = 15) -> None:
+        self.base = base
+        self.top = top
+        self.sections: List[str] = []
+        self.files: List[Path] = []
+        self._lock = threading.Lock()
+        self._phase: Optional[str] = None
+        self._profiles: List[cProfile.Profile] = []
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._wall = 0.0
+        self._cpu = 0.0
+        tracemalloc.start()
+
+    def _thread_hook(self, frame: Any, event: str, arg: Any) -> None:
+        # Before 3.12 a profiler only sees the thread that enabled it, so each new worker thread gets its own
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+
+    def begin(self, name: Optional[str]) -> None:
+        self._end()
+        if name is None:
+            return
+        self._phase = name
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._snapshot = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        self._profiles = [profile]
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._thread_hook)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        profile.enable()
+
+    def _end(self) -> None:
+        if self._phase is None:
+            return
+        self._profiles[0].disable()
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        if sys.version_info < (3, 12):
+            threading.setprofile(None)  # type: ignore[arg-type]
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        growth = [stat for stat in snapshot.compare_to(self._snapshot, "lineno") if stat.size_diff > 0][: self.top]
+        self._snapshot = None
+        with self._lock:
+            profiles, self._profiles = self._profiles, []
+        text = io.StringIO()
+        stats = pstats.Stats(profiles[0], stream=text)
+        for profile in profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                # A thread that never ran any Python code has nothing to add
+                pass
+        path = Path(f"{self.base}.{self._phase}.prof")
+        stats.dump_stats(str(path))
+        self.files.append(path)
+        print(
+            f"[Profile] {self._phase}: wall {wall:.2f}s, CPU {cpu:.2f}s, peak traced memory {peak / 1e6:.1f} MB",
+            file=sys.stderr,
+        )
+        text.write(f"== {self._phase} ==\n")
+        text.write(f"wall {wall:.3f}s, CPU {cpu:.3f}s (all threads), peak traced memory {peak / 1e6:.1f} MB, {current / 1e6:.1f} MB at end\n\n")
+        text.write("Top allocations still held at the end of the phase:\n")
+        for stat in growth:
+            text.write(f"  {stat.traceback}: +{stat.size_diff / 1e6:.1f} MB in {stat.count_diff:+d} blocks\n")
+        text.write("\nTop functions by own time:\n")
+        stats.sort_stats("tottime").print_stats(self.top)
+        text.write("Top functions by cumulative time:\n")
+        stats.sort_stats("cumulative").print_stats(self.top)
+        self.sections.append(text.getvalue())
+        self._phase = None
+
+    def close(self) -> None:
+        self._end()
+        tracemalloc.stop()
+        if not self.sections:
+            return
+        path = Path(f"{self.base}.profile.txt")
+        path.write_text("\n".join(self.sections), encoding="utf-8")
+        print(f"Wrote profile report to {path} and {len(self.files)} .prof files next to it.", file=sys.stderr)
+
+
+PHASE_PROFILER: Optional[PhaseProfiler] = None
+
+
+def start_profiler(output_path: str) -> None:
+    global PHASE_PROFILER
+    PHASE_PROFILER = PhaseProfiler(split_output_suffix(output_path)[0])
+
+
+def begin_phase(name: Optional[str]) -> None:
+    RUN_METRICS.begin_phase(name)
+    if PHASE_PROFILER is not None:
+        PHASE_PROFILER.begin(name)
+
+
+def write_file_atomic(path: str, text: str) -> None:
+    # Scrapers of a Prometheus textfile directory must never see a half-written file
+    target = Path(path)
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, target)
+
+
+# One "\r" progress line on stderr with throughput and ETA; the rate only counts work done since it was created
+class ProgressMeter:
+    def __init__(self, label: str, total: int, done: int = 0) -> None:
+        self.label = label
+        self.total = total
+        self.base = done
+        self.started = time.monotonic()
+        self.base_requests = RUN_METRICS.total_requests()
+
+    def update(self, done: int, extra: str = "") -> None:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        rate = (done - self.base) / elapsed
+        request_rate = (RUN_METRICS.total_requests() - self.base_requests) / elapsed
+        eta = format_duration((self.total - done) / rate) if rate > 0 else "?"
+        requests = f", {request_rate:.1f} req/s" if request_rate > 0 else ""
+        pct = done / self.total * 100 if self.total else 100.0
+        with print_lock:
+            print(
+                f"{self.label}: {done}/{self.total} ({pct:.1f}%){extra}, {rate:.1f}/s{requests}, ETA {eta}   ",
+                end="\r",
+                file=sys.stderr,
+            )
+
+
+def is_overload_error(error: BaseException) -> bool:
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (TimeoutError, socket.timeout, asyncio.TimeoutError, ConnectionError))
+
+
+# AIMD limit on in-flight requests for one endpoint: +1 after a healthy window, halved on overload
+class AdaptiveConcurrency:
+    def __init__(
+        self,
+        endpoint: str,
+        initial: int,
+        maximum: int,
+        minimum: int = 1,
+        latency_target: Optional[float] = None,
+        window: int = 20,
+        max_error_rate: float = 0.05,
+    ) -> None:
+        self.endpoint = endpoint
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.in_flight = 0
+        self._cond = threading.Condition()
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._best_p95: Optional[float] = None
+        self._last_p95 = 0.0
+        self._last_decrease = 0.0
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        self.acquire()
+        try:
+            return fn(*args)
+        finally:
+            self.release()
+
+    def observe(self, endpoint: str, latency: float, error: Optional[BaseException]) -> None:
+        if endpoint != self.endpoint:
+            return
+        with self._cond:
+            if error is not None and is_overload_error(error):
+                now = time.monotonic()
+                # One cut per congestion event: ignore follow-up failures from requests already in flight
+                if now - self._last_decrease >= max(1.0, 2 * self._last_p95):
+                    self._last_decrease = now
+                    self._set_limit(self.limit / 2, f"{type(error).__name__}: {error}")
+                    self._latencies.clear()
+                    self._errors = 0
+                return
+            self._latencies.append(latency)
+            if error is not None:
+                self._errors += 1
+            if len(self._latencies) < self.window:
+                return
+            p95 = percentile(self._latencies, 95)
+            error_rate = self._errors / len(self._latencies)
+            self._latencies.clear()
+            self._errors = 0
+            self._last_p95 = p95
+            if self._best_p95 is None or p95 < self._best_p95:
+                self._best_p95 = p95
+            # Without an explicit target, latency rising well above the best window seen means the server is queueing
+            target = self.latency_target if self.latency_target is not None else 2 * self._best_p95
+            reason = f"p95 {p95:.2f}s, errors {error_rate * 100:.1f}%"
+            if error_rate > self.max_error_rate or p95 > target:
+                self._set_limit(self.limit * 0.75, reason)
+            elif self.in_flight >= int(self.limit):
+                # Only grow when the current limit is actually being used
+                self._set_limit(self.limit + 1, reason)
+
+    def _set_limit(self, value: float, reason: str) -> None:
+        old = int(self.limit)
+        self.limit = min(max(value, float(self.minimum)), float(self.maximum))
+        if int(self.limit) != old:
             with print_lock:
-                print(f"[Warn] POST {url} failed (attempt {attempt}/{retries}): {exc}. Retrying in {wait_time:.2f}s...", file=sys.stderr)
-            time.sleep(wait_time)
-    if last_err:
-        raise last_err
-    raise RuntimeError("Unknown error in post_json")
+                print(f"\n[Adaptive] {self.endpoint} workers {old} -> {int(self.limit)} ({reason})", file=sys.stderr)
+            self._cond.notify_all()
+
+
+# Stops all scheduled requests while the server is failing, and lets a single probe through to see
+# whether it has recovered. Only overload errors (5xx, 429, timeouts, dropped connections) count.
+class CircuitBreaker:
+    def __init__(
+        self,
+        threshold: float = BREAKER_THRESHOLD,
+        window: int = BREAKER_WINDOW,
+        cooldown: float = BREAKER_COOLDOWN,
+        max_cooldown: float = BREAKER_MAX_COOLDOWN,
+    ) -> None:
+        self._cond = threading.Condition()
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = "closed"
+        self.trips = 0
+        self._outcomes: Deque[bool] = deque(maxlen=max(1, window))
+        self._delay = cooldown
+        self._open_until = 0.0
+
+    def configure(self, threshold: float, cooldown: float) -> None:
+        with self._cond:
+            self.threshold = threshold
+            self.cooldown = self._delay = cooldown
+
+    def wait(self, cancelled: Callable[[], bool] = lambda: False) -> Optional[bool]:
+        # Blocks while open. Returns True for the caller that gets to probe, False when closed,
+        # and None if `cancelled` became true while waiting.
+        with self._cond:
+            while not cancelled():
+                passed, delay = self._admit()
+                if passed is not None:
+                    return passed
+                # Wake up now and then to notice cancellation
+                self._cond.wait(delay)
+            return None
+
+    async def wait_async(self) -> bool:
+        # wait() for the asyncio engine, sleeping on the event loop instead of blocking it
+        while True:
+            with self._cond:
+                passed, delay = self._admit()
+            if passed is not None:
+                return passed
+            await asyncio.sleep(delay)
+
+    def _admit(self) -> Tuple[Optional[bool], float]:
+        # Called holding _cond: (False if closed, True for the prober, or None and how long to wait before asking again)
+        if self.state == "closed":
+            return False, 0.0
+        now = time.monotonic()
+        if self.state == "open" and now >= self._open_until:
+            self.state = "half-open"
+            with print_lock:
+                print("\n[Breaker] Sending a probe request before resuming.", file=sys.stderr)
+            return True, 0.0
+        return None, min(1.0, self._open_until - now) if self.state == "open" else 1.0
+
+    def record(self, error: Optional[BaseException], probe: bool = False) -> None:
+        overload = error is not None and is_overload_error(error)
+        with self._cond:
+            if probe:
+                if overload:
+                    self._delay = min(self._delay * 2, self.max_cooldown)
+                    self._trip(f"probe failed ({error_label(error)})")
+                else:
+                    self.state = "closed"
+                    self._delay = self.cooldown
+                    with print_lock:
+                        print("\n[Breaker] Probe succeeded; resuming.", file=sys.stderr)
+                    self._cond.notify_all()
+                return
+            # Attempts that started before the breaker opened say nothing new
+            if self.state != "closed" or self.threshold <= 0:
+                return
+            self._outcomes.append(overload)
+            failed = sum(self._outcomes)
+            if len(self._outcomes) == self._outcomes.maxlen and failed >= self.threshold * len(self._outcomes):
+                self._trip(f"{failed} of the last {len(self._outcomes)} requests failed")
+
+    def _trip(self, reason: str) -> None:
+        self.state = "open"
+        self.trips += 1
+        self._outcomes.clear()
+        self._open_until = time.monotonic() + self._delay
+        with print_lock:
+            print(f"\n[Breaker] {reason}; pausing requests for {self._delay:.0f}s.", file=sys.stderr)
+
+
+CIRCUIT_BREAKER = CircuitBreaker()
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    # Other 4xx answers will not change on a retry
+    if isinstance(error, urllib.error.HTTPError) and 400 <= error.code < 500:
+        return error.code in (408, 425, 429)
+    return True
+
+
+# Request hedging (--hedge): a request still unanswered after the observed p95 latency of its endpoint gets
+# a duplicate, and whichever answers first wins. Hedges are capped to a share of all requests made, so a
+# slow server cannot double the load on itself.
+class HedgePolicy:
+    def __init__(
+        self,
+        endpoint: str,
+        pct: float = HEDGE_PERCENTILE,
+        max_share: float = HEDGE_MAX_SHARE,
+        window: int = HEDGE_WINDOW,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        metrics: Optional[RunMetrics] = None,
+    ) -> None:
+        self.endpoint = endpoint
+        self.metrics = metrics or RUN_METRICS
+        self.pct = pct
+        self.max_share = max_share
+        self.min_samples = min_samples
+        self.requests = 0
+        self.fired = 0
+        self.won = 0
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=max(1, window))
+        self._threshold: Optional[float] = None
+
+    def observe(self, endpoint: str, latency: float, error: Optional[BaseException]) -> None:
+        if endpoint != self.endpoint:
+            return
+        with self._lock:
+            self.requests += 1
+            if error is not None:
+                return
+            self._latencies.append(latency)
+            # Re-sorting the window on every answer would cost more than it tells
+            if len(self._latencies) >= self.min_samples and (self._threshold is None or self.requests % 10 == 0):
+                self._threshold = percentile(list(self._latencies), self.pct)
+
+    def threshold(self) -> Optional[float]:
+        # None until enough answers have been seen to trust the percentile
+        return self._threshold
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.fired + 1 > self.max_share * self.requests:
+                return False
+            self.fired += 1
+        self.metrics.record_hedge_fired(self.endpoint)
+        return True
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.won += 1
+        self.metrics.record_hedge_won(self.endpoint)
+
+    def report(self) -> None:
+        threshold = f"; hedged after {self._threshold:.2f}s (p{self.pct:g})" if self._threshold is not None else ""
+        share = self.fired / self.requests * 100 if self.requests else 0.0
+        print(
+            f"Hedged requests: {self.fired} fired ({share:.1f}% of {self.requests} {self.endpoint} requests),"
+            f" {self.won} won{threshold}.",
+            file=sys.stderr,
+        )
+
+
+# Runs jobs on a fixed set of worker threads. A failed job goes back on a shared heap with a due time
+# instead of sleeping in its thread, so backoff waits never occupy a worker, and every attempt first
+# passes the circuit breaker. Jobs should make a single HTTP attempt (retries=1); this class retries.
+# With a HedgePolicy, a job whose request is slow gets a second copy; the first answer is kept and the
+# request of the other copy is cancelled.
+class RetryScheduler:
+    def __init__(
+        self,
+        endpoint: str,
+        workers: int,
+        controller: Optional[AdaptiveConcurrency] = None,
+        attempts: int = RETRY_ATTEMPTS,
+        backoff: float = RETRY_BACKOFF,
+        breaker: Optional[CircuitBreaker] = None,
+        describe: Callable[[Any], str] = str,
+        deadline: Optional[float] = None,
+        hedge: Optional[HedgePolicy] = None,
+        results: "Optional[queue.Queue[Tuple[Any, Any, Optional[BaseException]]]]" = None,
+        pool: Optional[ConnectionPool] = None,
+        limiter: Optional[TokenBucket] = None,
+        metrics: Optional[RunMetrics] = None,
+    ) -> None:
+        self.endpoint = endpoint
+        self.describe = describe
+        # time.monotonic() value after which as_completed() stops and pending jobs are dropped
+        self.deadline = deadline
+        self.cancelled = False
+        self.controller = controller
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.breaker = breaker if breaker is not None else CIRCUIT_BREAKER
+        self.hedge = hedge
+        # The pool the jobs' requests go through (for cancelling hedge losers), the limiter a 429 pauses
+        # and where retries are counted; a SekolahKitaClient passes its own
+        self.pool = pool or CONNECTION_POOL
+        self.limiter = limiter or RATE_LIMITER
+        self.metrics = metrics or RUN_METRICS
+        self._cond = threading.Condition()
+        # (due, sequence, job, failed attempts, hedge copy); unfinished jobs are (key, fn, args) in _jobs
+        self._heap: List[Tuple[float, int, int, int, bool]] = []
+        self._jobs: Dict[int, Tuple[Any, Callable[..., Any], Tuple[Any, ...]]] = {}
+        # Job copies being run, by worker thread: (job, hedge copy, failed attempts before this one)
+        self._running: Dict[int, Tuple[int, bool, int]] = {}
+        self._hedged: set = set()
+        self._seq = 0
+        # Schedulers may share a results queue; whoever reads it then counts results instead of using as_completed()
+        self._results: "queue.Queue[Tuple[Any, Any, Optional[BaseException]]]" = results or queue.Queue()
+        self._submitted = 0
+        self._yielded = 0
+        self._closed = False
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(max(1, workers))]
+        if hedge is not None:
+            self._threads.append(threading.Thread(target=self._watch, daemon=True))
+
+    def __enter__(self) -> "RetryScheduler":
+        for thread in self._threads:
+            thread.start()
+        return self
 
+    def __exit__(self, *exc_info: Any) -> None:
+        self.cancel()
+        # After a deadline, workers still waiting on a response are daemons and are left behind
+        until = time.monotonic() + DEADLINE_GRACE if self.cancelled else None
+        for thread in self._threads:
+            thread.join(None if until is None else max(0.0, until - time.monotonic()))
 
-def get_json(url: str, retries: int = 3, backoff: float = 2.0) -> Dict[str, Any]:
-    # Rate limit delay
-    if not DISABLE_RATE_LIMIT:
-        time.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
+    def cancel(self) -> None:
+        # Drops every job that has not started; jobs already running finish, but their results are not read
+        with self._cond:
+            self._closed = True
+            self._heap.clear()
+            self._cond.notify_all()
+
+    def submit(self, key: Any, fn: Callable[..., Any], *args: Any) -> None:
+        with self._cond:
+            job = self._submitted
+            self._jobs[job] = (key, fn, args)
+            self._submitted += 1
+        self._push(time.monotonic(), job, 0)
+
+    def as_completed(self) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+        # (key, result, error) once per submitted job; error is set only when every attempt failed.
+        # With a deadline, iteration ends when it passes and the remaining jobs are cancelled.
+        while self._yielded < self._submitted:
+            timeout = None if self.deadline is None else self.deadline - time.monotonic()
+            try:
+                if timeout is not None and timeout <= 0:
+                    raise queue.Empty
+                result = self._results.get(timeout=timeout)
+            except queue.Empty:
+                self.cancelled = True
+                self.cancel()
+                return
+            self._yielded += 1
+            yield result
+
+    def _push(self, due: float, job: int, failures: int, hedge: bool = False) -> None:
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, job, failures, hedge))
+            self._cond.notify()
+
+    def _next(self) -> Optional[Tuple[int, int, bool, Tuple[Any, Callable[..., Any], Tuple[Any, ...]]]]:
+        # The next due (job, failed attempts, hedge copy, (key, fn, args)), registered as running in this thread
+        with self._cond:
+            while not self._closed:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                wait = self._heap[0][0] - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                _, _, job, failures, hedge = heapq.heappop(self._heap)
+                if job not in self._jobs:
+                    # A hedge copy whose original answered before it started
+                    continue
+                if hedge and not any(running == job and not copy for running, copy, _ in self._running.values()):
+                    # The original failed before the copy started; its queued retry stands in for the copy
+                    continue
+                self._running[threading.get_ident()] = (job, hedge, failures)
+                return job, failures, hedge, self._jobs[job]
+            return None
+
+    def _work(self) -> None:
+        thread = threading.get_ident()
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            job, failures, hedge, (key, fn, args) = entry
+            probe = self.breaker.wait(lambda: self._closed)
+            if probe is None:
+                return
+            error: Optional[Exception] = None
+            result: Any = None
+            try:
+                result = self.controller.run(fn, *args) if self.controller else fn(*args)
+            except Exception as exc:
+                error = exc
+            with self._cond:
+                self._running.pop(thread, None)
+                others = [other for other, (running, _, _) in self._running.items() if running == job]
+                # Lost the race to the other copy, or failed while the other copy may still answer
+                lost = job not in self._jobs or (error is not None and bool(others))
+                finished = not lost and (
+                    error is None or failures + 1 >= self.attempts or not is_retryable_error(error)
+                )
+                if finished:
+                    del self._jobs[job]
+                    if error is None:
+                        # Under the lock, so the other copy cannot have moved on to another job's request
+                        for other in others:
+                            self.pool.cancel(other)
+            # A cancelled copy says nothing about the server
+            self.breaker.record(None if isinstance(error, RequestCancelled) else error, probe)
+            if lost:
+                continue
+            if finished:
+                if error is None and hedge and self.hedge is not None:
+                    self.hedge.record_win()
+                self._results.put((key, result, error))
+                continue
+            failures += 1
+            delay = retry_delay(error, failures, self.backoff, self.limiter)
+            self.metrics.record_retry(self.endpoint, delay)
+            with print_lock:
+                print(
+                    f"[Warn] {self.endpoint} {self.describe(key)} failed (attempt {failures}/{self.attempts}): {error}."
+                    f" Retrying in {delay:.2f}s...",
+                    file=sys.stderr,
+                )
+            self._push(time.monotonic() + delay, job, failures)
+
+    def _watch(self) -> None:
+        # Puts a copy of every job whose request has been out longer than the hedge threshold at the
+        # front of the queue; each job is hedged at most once
+        while not self._closed:
+            time.sleep(HEDGE_POLL_INTERVAL)
+            threshold = self.hedge.threshold()
+            if threshold is None:
+                continue
+            now = time.monotonic()
+            with self._cond:
+                running = [
+                    (thread, job, failures) for thread, (job, hedge, failures) in self._running.items() if not hedge
+                ]
+            for thread, job, failures in running:
+                started = self.pool.started(thread)
+                if job in self._hedged or started is None or now - started < threshold:
+                    continue
+                if not self.hedge.allow():
+                    break
+                self._hedged.add(job)
+                # The copy continues the original's attempt count, so hedging never adds retries
+                self._push(0.0, job, failures, hedge=True)
+
+
+def retry_call(endpoint: str, fn: Callable[..., Any], *args: Any) -> Any:
+    # One job on its own scheduler, for a request whose answer is needed before anything else can start
+    with RetryScheduler(endpoint, 1) as scheduler:
+        scheduler.submit(None, fn, *args)
+        for _, result, error in scheduler.as_completed():
+            if error is not None:
+                raise error
+            return result
+    raise RuntimeError("RetryScheduler returned no result")
+
+
+def request_json(
+    method: str,
+    url: str,
+    payload: Optional[Dict[str, Any]] = None,
+    retries: int = 3,
+    backoff: float = 2.0,
+    object_hook: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    stream_key: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None,
+    limiter: Optional[TokenBucket] = None,
+    archive: Optional[str] = None,
+    metrics: Optional[RunMetrics] = None,
+    observers: Optional[List[Callable[[str, float, Optional[BaseException]], None]]] = None,
+) -> Dict[str, Any]:
+    # With stream_key, that array member is parsed item by item while the body is still arriving.
+    # With archive, the raw school items of a successful response are stored in that ARCHIVE table.
+    # Requests go through the process-wide pool, rate limiter, metrics and observers unless a client
+    # passes its own.
+    pool = pool or CONNECTION_POOL
+    limiter = limiter or RATE_LIMITER
+    metrics = metrics or RUN_METRICS
+    body: Optional[bytes] = None
+    headers: Dict[str, str] = {}
+    if payload is not None:
+        body = json.dumps(payload).encode("utf-8")
+        headers["Content-Type"] = "application/json"
     attempt = 0
     last_err: Optional[BaseException] = None
+    endpoint = endpoint_name(url)
     while attempt < retries:
+        raw: List[Dict[str, Any]] = []
+        hook = keeping_raw_items(raw, object_hook) if archive is not None and ARCHIVE is not None else object_hook
+        consume: Optional[Callable[[ResponseBody], Any]] = None
+        if stream_key is not None:
+            consume = functools.partial(read_json_array, key=stream_key, object_hook=hook)
+        queued = time.monotonic()
+        limiter.acquire()
+        started = time.monotonic()
+        received: Optional[float] = None
+        nbytes = 0
         try:
-            req = urllib.request.Request(url, method="GET")
-            req.add_header("Accept", "application/json")
-            # User-Agent to avoid blocking
-            req.add_header("User-Agent", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
-            
-            with urllib.request.urlopen(req, timeout=60) as resp:
-                body = resp.read().decode("utf-8", errors="ignore")
-            return json.loads(body)
-        except (urllib.error.HTTPError, urllib.error.URLError, TimeoutError, json.JSONDecodeError) as exc:
+            status, reason, resp_headers, data, nbytes = pool.request(method, url, body, headers, consume)
+            received = time.monotonic()
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, reason, resp_headers, None)
+            if consume is not None:
+                # Parsing overlapped the transfer; only the parser's own time counts as decoding
+                result, parse_seconds = data
+                received -= parse_seconds
+            else:
+                result = json.loads(data.decode("utf-8", errors="ignore"), object_hook=hook)
+        except RequestCancelled:
+            # The other copy of a hedged request answered first; neither a failure nor worth a retry
+            raise
+        except (OSError, http.client.HTTPException, ValueError) as exc:
+            finished = time.monotonic()
+            notify_request(endpoint, finished - started, exc, observers)
+            metrics.record(endpoint, queued, started, received, finished, nbytes, exc)
             last_err = exc
             attempt += 1
+            wait_time = retry_delay(exc, attempt, backoff, limiter)
             if attempt >= retries:
                 break
-            # Exponential backoff with jitter
-            wait_time = (backoff * attempt) + random.uniform(0.5, 1.5)
+            metrics.record_retry(endpoint, wait_time)
             with print_lock:
-                print(f"[Warn] GET {url} failed (attempt {attempt}/{retries}): {exc}. Retrying in {wait_time:.2f}s...", file=sys.stderr)
+                print(f"[Warn] {method} {url} failed (attempt {attempt}/{retries}): {exc}. Retrying in {wait_time:.2f}s...", file=sys.stderr)
             time.sleep(wait_time)
+            continue
+        finished = time.monotonic()
+        notify_request(endpoint, finished - started, None, observers)
+        metrics.record(endpoint, queued, started, received, finished, nbytes, None)
+        if raw:
+            ARCHIVE.add_many(archive, [(item["sekolah_id"], item) for item in raw])
+        return result
     if last_err:
         raise last_err
-    raise RuntimeError("Unknown error in get_json")
+    raise RuntimeError("Unknown error in request_json")
+
+
+def post_json(
+    url: str,
+    payload: Dict[str, Any],
+    retries: int = 3,
+    backoff: float = 2.0,
+    object_hook: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    stream_key: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None,
+    limiter: Optional[TokenBucket] = None,
+    archive: Optional[str] = None,
+    metrics: Optional[RunMetrics] = None,
+    observers: Optional[List[Callable[[str, float, Optional[BaseException]], None]]] = None,
+) -> Dict[str, Any]:
+    return request_json(
+        "POST",
+        url,
+        payload,
+        retries=retries,
+        backoff=backoff,
+        object_hook=object_hook,
+        stream_key=stream_key,
+        pool=pool,
+        limiter=limiter,
+        archive=archive,
+        metrics=metrics,
+        observers=observers,
+    )
+
+
+def get_json(
+    url: str,
+    retries: int = 3,
+    backoff: float = 2.0,
+    pool: Optional[ConnectionPool] = None,
+    limiter: Optional[TokenBucket] = None,
+    metrics: Optional[RunMetrics] = None,
+    observers: Optional[List[Callable[[str, float, Optional[BaseException]], None]]] = None,
+) -> Dict[str, Any]:
+    return request_json(
+        "GET",
+        url,
+        retries=retries,
+        backoff=backoff,
+        pool=pool,
+        limiter=limiter,
+        metrics=metrics,
+        observers=observers,
+    )
 
 
-def fetch_page(page: int, size: int, kabupaten_kota: str = "") -> Dict[str, Any]:
-    payload = {
+def build_page_payload(
+    page: int, size: int, kabupaten_kota: str = "", bentuk: str = ALLOWED_BENTUK_PENDIDIKAN, status: str = ""
+) -> Dict[str, Any]:
+    return {
         "page": page,
         "size": size,
         "keyword": "",
         "kabupaten_kota": kabupaten_kota,
-        "bentuk_pendidikan": ALLOWED_BENTUK_PENDIDIKAN,
-        "status_sekolah": "",
+        "bentuk_pendidikan": bentuk,
+        "status_sekolah": status,
     }
-    return post_json(CARI_ENDPOINT, payload)
 
 
-def collect_pages(
-    page_size: int,
-    max_pages: Optional[int],
-    workers: int,
-    kabupaten_kota: str = "",
-) -> Tuple[List[Dict[str, Any]], int]:
-    # If page_size is <= 0, fetch total count first and use that as page_size
-    if page_size <= 0:
-        print("Fetching metadata to determine total count...", file=sys.stderr)
+# Reported listing totals per (kabupaten_kota, bentuk_pendidikan, status_sekolah) filter. Every listing
+# response records its total here, so the TUI, page sizing, batches and the partition planner share one
+# count per filter. Counts seen in earlier runs are kept in the cache directory; they only serve as size
+# estimates for planning, never as the total of a listing.
+class ListingCounts:
+    def __init__(self) -> None:
+        self.path: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._live: Dict[Tuple[str, str, str], int] = {}
+        self._saved: Dict[Tuple[str, str, str], int] = {}
+
+    def load(self, path: Path) -> None:
+        self.path = path
         try:
-            meta = fetch_page(0, 1, kabupaten_kota)
-            total_found = int(meta.get("total", 0))
-            if total_found > 0:
-                page_size = total_found
-                print(f"Auto-detected total records: {total_found}. Setting page size to {total_found}.", file=sys.stderr)
-            else:
-                # Fallback if total is 0 or missing
-                page_size = 1000
-                print("Could not determine total. Defaulting page size to 1000.", file=sys.stderr)
-        except Exception as exc:
-            print(f"Error fetching metadata: {exc}. Defaulting page size to 1000.", file=sys.stderr)
-            page_size = 1000
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("bentuk_pendidikan") == ALLOWED_BENTUK_PENDIDIKAN:
+                self._saved = {(kab, bentuk, status): int(total) for kab, bentuk, status, total in data["counts"]}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
 
-    # Page index starts at 0 for this API
-    first = fetch_page(0, page_size, kabupaten_kota)
-    total = int(first.get("total", len(first.get("data", []) or [])))
-    if total <= 0:
-        return [], 0
-    total_pages = int(math.ceil(total / float(page_size)))
-    if max_pages is not None and max_pages > 0:
-        total_pages = min(total_pages, max_pages)
-    pages_data: Dict[int, List[Dict[str, Any]]] = {}
-    pages_data[0] = list(first.get("data") or [])
-    failed_pages: List[int] = []
-    
-    print(f"Total pages to fetch: {total_pages}", file=sys.stderr)
-    completed_count = 1
-    
-    if total_pages > 1:
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = {
-                executor.submit(fetch_page, page, page_size, kabupaten_kota): page
-                for page in range(1, total_pages)
-            }
-            for future in as_completed(futures):
-                completed_count += 1
-                page = futures[future]
-                try:
-                    result = future.result()
-                    items = list(result.get("data") or [])
-                    pages_data[page] = items
-                except BaseException as exc:
-                    with print_lock:
-                        print(f"\nFailed to fetch page {page}: {exc}", file=sys.stderr)
-                    failed_pages.append(page)
-                
-                # Progress indicator
-                if completed_count % 5 == 0 or completed_count == total_pages:
-                    with print_lock:
-                        print(f"Pages processed: {completed_count}/{total_pages} ({completed_count/total_pages*100:.1f}%)", end="\r", file=sys.stderr)
-    
-    # Clear progress line
-    print(file=sys.stderr)
-    
-    if failed_pages:
-        for page in sorted(set(failed_pages)):
-            attempt = 0
-            while attempt < 3:
-                attempt += 1
+    def record(self, key: Tuple[str, str, str], total: int) -> None:
+        with self._lock:
+            self._live[key] = total
+
+    def live(self, key: Tuple[str, str, str]) -> Optional[int]:
+        with self._lock:
+            return self._live.get(key)
+
+    def estimate(self, key: Tuple[str, str, str]) -> Optional[int]:
+        with self._lock:
+            return self._live.get(key, self._saved.get(key))
+
+    def save(self) -> None:
+        with self._lock:
+            if self.path is None or not self._live:
+                return
+            counts = dict(self._saved)
+            counts.update(self._live)
+        data = {
+            "saved_at": time.time(),
+            "bentuk_pendidikan": ALLOWED_BENTUK_PENDIDIKAN,
+            "counts": [[kab, bentuk, status, total] for (kab, bentuk, status), total in sorted(counts.items())],
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_file_atomic(str(self.path), json.dumps(data, ensure_ascii=False))
+
+
+LISTING_COUNTS = ListingCounts()
+
+
+def listing_counts_path(cache_dir: str) -> Path:
+    return Path(cache_dir) / "listing_counts.json"
+
+
+def record_listing_total(
+    result: Dict[str, Any], kabupaten_kota: str, bentuk: str = ALLOWED_BENTUK_PENDIDIKAN, status: str = ""
+) -> Dict[str, Any]:
+    if "total" in result:
+        LISTING_COUNTS.record((kabupaten_kota, bentuk, status), int(result.get("total") or 0))
+    return result
+
+
+class SchoolRecord:
+    # The listing fields the scraper reads, projected from each API item while the page is parsed.
+    # A slotted object with interned region names is a fraction of the size of the raw item dict.
+    __slots__ = ("sekolah_id", "nama", "alamat_jalan", "kabupaten", "provinsi", "bentuk_pendidikan")
+    FIELDS = frozenset(__slots__)
+
+    def __init__(
+        self,
+        sekolah_id: Optional[str],
+        nama: Optional[str],
+        alamat_jalan: Optional[str],
+        kabupaten: Optional[str],
+        provinsi: Optional[str],
+        bentuk_pendidikan: Optional[str] = None,
+    ) -> None:
+        self.sekolah_id = sekolah_id
+        self.nama = nama
+        self.alamat_jalan = alamat_jalan
+        # A few hundred distinct values shared by every school
+        self.kabupaten = sys.intern(kabupaten) if isinstance(kabupaten, str) else kabupaten
+        self.provinsi = sys.intern(provinsi) if isinstance(provinsi, str) else provinsi
+        self.bentuk_pendidikan = sys.intern(bentuk_pendidikan) if isinstance(bentuk_pendidikan, str) else bentuk_pendidikan
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any]) -> "SchoolRecord":
+        get = item.get
+        return cls(
+            get("sekolah_id"), get("nama"), get("alamat_jalan"), get("kabupaten"), get("provinsi"), get("bentuk_pendidikan")
+        )
+
+    def get(self, field: str, default: Any = None) -> Any:
+        # Dict-style access, so code written against raw API items works on records too
+        return getattr(self, field) if field in self.FIELDS else default
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"SchoolRecord({self.as_dict()!r})"
+
+
+def school_record_hook(obj: Dict[str, Any]) -> Any:
+    # json object_hook: school items become records as soon as they are decoded, so a page never
+    # holds its full raw dicts; everything else (the page envelope, journal entries) stays a dict
+    return SchoolRecord.from_item(obj) if "sekolah_id" in obj else obj
+
+
+def keeping_raw_items(
+    raw: List[Dict[str, Any]], object_hook: Optional[Callable[[Dict[str, Any]], Any]]
+) -> Callable[[Dict[str, Any]], Any]:
+    # Wraps an object_hook so school items are also kept as decoded, for archiving once the parse is done
+    def hook(obj: Dict[str, Any]) -> Any:
+        if "sekolah_id" in obj:
+            raw.append(obj)
+        return object_hook(obj) if object_hook is not None else obj
+
+    return hook
+
+
+def fetch_page(
+    page: int,
+    size: int,
+    kabupaten_kota: str = "",
+    retries: int = 3,
+    bentuk: str = ALLOWED_BENTUK_PENDIDIKAN,
+    status: str = "",
+) -> Dict[str, Any]:
+    result = post_json(
+        CARI_ENDPOINT,
+        build_page_payload(page, size, kabupaten_kota, bentuk, status),
+        retries=retries,
+        object_hook=school_record_hook,
+        stream_key="data",
+        archive="listing",
+    )
+    return record_listing_total(result, kabupaten_kota, bentuk, status)
+
+
+def count_listing(
+    kabupaten_kota: str = "", bentuk: str = ALLOWED_BENTUK_PENDIDIKAN, status: str = "", retry: bool = True
+) -> int:
+    # The total reported for this filter during this run, or a one-row count request. The request is
+    # retried on its own scheduler; a caller that is already a scheduler job passes retry=False.
+    total = LISTING_COUNTS.live((kabupaten_kota, bentuk, status))
+    if total is None:
+        request = functools.partial(fetch_page, 0, 1, kabupaten_kota, 1, bentuk, status)
+        total = int((retry_call("cari-sekolah", request) if retry else request()).get("total", 0))
+    return total
+
+
+def page_size_from_meta(meta: Optional[Dict[str, Any]], error: Optional[BaseException] = None) -> int:
+    if error is not None:
+        print(f"Error fetching metadata: {error}. Defaulting page size to 1000.", file=sys.stderr)
+        return 1000
+    total_found = int((meta or {}).get("total", 0))
+    if total_found > 0:
+        print(f"Auto-detected total records: {total_found}. Setting page size to {total_found}.", file=sys.stderr)
+        return total_found
+    # Fallback if total is 0 or missing
+    print("Could not determine total. Defaulting page size to 1000.", file=sys.stderr)
+    return 1000
+
+
+def merge_pages(pages_data: Dict[int, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # Consumes pages_data: each page list is released as soon as it has been appended
+    all_items: List[Dict[str, Any]] = []
+    for page in sorted(pages_data.keys()):
+        all_items.extend(pages_data.pop(page))
+    return all_items
+
+
+def dedupe_schools(
+    groups: Iterable[List[Any]], key: Callable[[Any], Optional[str]] = lambda row: row.get("sekolah_id")
+) -> Tuple[List[Any], int]:
+    # Keep the first row seen for each sekolah_id; rows without an id cannot be matched and are kept
+    seen: set = set()
+    rows: List[Any] = []
+    duplicates = 0
+    for group in groups:
+        for row in group:
+            sekolah_id = key(row)
+            if sekolah_id:
+                if sekolah_id in seen:
+                    duplicates += 1
+                    continue
+                seen.add(sekolah_id)
+            rows.append(row)
+    return rows, duplicates
+
+
+# Append-only JSONL journal of completed listing pages and resolved phones, used by --resume
+class ScrapeJournal:
+    def __init__(
+        self,
+        path: Path,
+        job: Dict[str, Any],
+        resume: bool = False,
+        fsync_every: int = 200,
+        fsync_interval: float = 1.0,
+    ) -> None:
+        self.path = path
+        self.job = job
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.page_size = 0
+        self.total = 0
+        self.pages: Dict[int, List[Dict[str, Any]]] = {}
+        self.phones: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        if resume:
+            self._load()
+        if self.pages or self.phones:
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+            self._append({"type": "job", "job": job})
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            print(f"No journal found at {self.path}; starting from scratch.", file=sys.stderr)
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
                 try:
-                    result = fetch_page(page, page_size, kabupaten_kota)
+                    entry = json.loads(line, object_hook=school_record_hook)
+                except ValueError:
+                    # A crash can leave a torn last line; everything before it is still valid
+                    continue
+                kind = entry.get("type")
+                if kind == "job" and entry.get("job") != self.job:
+                    print(f"Journal {self.path} belongs to a different job; starting from scratch.", file=sys.stderr)
+                    self.pages.clear()
+                    self.phones.clear()
+                    return
+                if kind == "page":
+                    if entry["size"] != self.page_size:
+                        # Pages of another size do not line up with this run's page grid
+                        self.page_size = entry["size"]
+                        self.pages.clear()
+                    self.total = entry["total"]
+                    self.pages[entry["page"]] = entry["items"]
+                elif kind == "phone":
+                    self.phones[entry["id"]] = entry["phone"]
+        print(
+            f"Resuming from journal {self.path}: {len(self.pages)} pages, {len(self.phones)} phones already done.",
+            file=sys.stderr,
+        )
+
+    def resumed_pages(self, page_size: int) -> Dict[int, List[Dict[str, Any]]]:
+        return dict(self.pages) if page_size == self.page_size else {}
+
+    def record_page(self, page_size: int, page: int, total: int, items: List[Dict[str, Any]]) -> None:
+        self._append({"type": "page", "size": page_size, "page": page, "total": total, "items": items})
+
+    def record_phone(self, sekolah_id: str, phone: Optional[str]) -> None:
+        self._append({"type": "phone", "id": sekolah_id, "phone": phone})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = json.dumps(entry, ensure_ascii=False, default=SchoolRecord.as_dict) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            now = time.monotonic()
+            # Batch fsyncs: a crash loses at most the last batch, which is simply fetched again
+            if self._pending >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+                self._sync(now)
+
+    def _sync(self, now: float) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = now
+
+    def close(self, remove: bool = False) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync(time.monotonic())
+            self._file.close()
+        if remove:
+            self.path.unlink()
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 504
+    return isinstance(error, (TimeoutError, socket.timeout, asyncio.TimeoutError))
+
+
+def tune_page_size(
+    workers: int, kabupaten_kota: str = "", latency_target: float = DEFAULT_PAGE_LATENCY_TARGET
+) -> Tuple[int, int, Optional[Dict[str, Any]]]:
+    # Probe a few page sizes, fit latency = a + b * size, and pick the size with the lowest estimated
+    # listing time across `workers` parallel requests whose predicted latency stays within the target.
+    # Returns the chosen size, the reported total, and the probe response for page 0 if it can be reused.
+    print("Probing page sizes...", file=sys.stderr)
+    latencies: List[float] = []
+
+    def observe(endpoint: str, latency: float, error: Optional[BaseException]) -> None:
+        if endpoint == "cari-sekolah" and error is None:
+            latencies.append(latency)
+
+    samples: List[Tuple[int, float]] = []
+    probes: Dict[int, Dict[str, Any]] = {}
+    total = 0
+    REQUEST_OBSERVERS.append(observe)
+    try:
+        for size in PAGE_SIZE_PROBES:
+            try:
+                result = fetch_page(0, size, kabupaten_kota, retries=1)
+            except Exception as exc:
+                print(f"  size {size}: failed ({exc})", file=sys.stderr)
+                break
+            latency = latencies[-1] if latencies else 0.0
+            records = len(result.get("data") or [])
+            total = int(result.get("total", records))
+            print(f"  size {size}: {latency:.2f}s, {records} records", file=sys.stderr)
+            samples.append((size, latency))
+            probes[size] = result
+            if records >= total or latency > latency_target:
+                break
+    finally:
+        REQUEST_OBSERVERS.remove(observe)
+    if not samples:
+        print(f"Page size probing failed. Falling back to {PAGE_SIZE_PROBES[0]}.", file=sys.stderr)
+        return PAGE_SIZE_PROBES[0], 0, None
+    if total <= samples[-1][0]:
+        size = samples[-1][0]
+        print(f"All {total} records fit in one page of {size}.", file=sys.stderr)
+        return size, total, probes[size]
+
+    if len(samples) >= 2:
+        n = len(samples)
+        mean_x = sum(x for x, _ in samples) / n
+        mean_y = sum(y for _, y in samples) / n
+        var_x = sum((x - mean_x) ** 2 for x, _ in samples)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in samples) / var_x if var_x else 0.0
+        intercept = mean_y - slope * mean_x
+    else:
+        slope, intercept = 0.0, samples[0][1]
+    if slope <= 0:
+        # Latency did not grow with size: assume it is proportional to the largest probe
+        slope, intercept = samples[-1][1] / samples[-1][0], 0.0
+    intercept = max(0.0, intercept)
+
+    best_size, best_time = MIN_TUNED_PAGE_SIZE, float("inf")
+    size = MIN_TUNED_PAGE_SIZE
+    while True:
+        predicted = intercept + slope * size
+        if size > MIN_TUNED_PAGE_SIZE and predicted > latency_target * 0.8:
+            break
+        rounds = math.ceil(math.ceil(total / size) / max(1, workers))
+        estimate = rounds * predicted
+        if estimate <= best_time:
+            best_size, best_time = size, estimate
+        if size >= total:
+            break
+        size *= 2
+    print(
+        f"Chose page size {best_size}: ~{intercept + slope * best_size:.2f}s per page, "
+        f"{math.ceil(total / best_size)} pages, estimated listing time {best_time:.1f}s.",
+        file=sys.stderr,
+    )
+    return best_size, total, probes.get(best_size)
+
+
+def fetch_span(page: int, size: int, kabupaten_kota: str = "") -> List[Dict[str, Any]]:
+    # A page that times out is fetched again as the two half-size pages covering the same records.
+    # Other errors propagate; callers run this under a RetryScheduler, which owns backoff and the breaker.
+    try:
+        return list(fetch_page(page, size, kabupaten_kota, retries=1).get("data") or [])
+    except Exception as exc:
+        if not (is_timeout_error(exc) and size >= 2 * MIN_TUNED_PAGE_SIZE and size % 2 == 0):
+            raise
+    half = size // 2
+    with print_lock:
+        print(f"\nPage {page} (size {size}) timed out; splitting into two pages of {half}.", file=sys.stderr)
+    return fetch_span(page * 2, half, kabupaten_kota) + fetch_span(page * 2 + 1, half, kabupaten_kota)
+
+
+def collect_pages(
+    page_size: int,
+    max_pages: Optional[int],
+    workers: int,
+    kabupaten_kota: str = "",
+    controller: Optional[AdaptiveConcurrency] = None,
+    journal: Optional[ScrapeJournal] = None,
+    tune_latency_target: Optional[float] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    first: Optional[Dict[str, Any]] = None
+    known_total = 0
+    if page_size <= 0 and journal is not None and journal.page_size:
+        page_size = journal.page_size
+        print(f"Using page size {page_size} from journal.", file=sys.stderr)
+    if page_size <= 0 and tune_latency_target is not None:
+        page_size, known_total, first = tune_page_size(workers, kabupaten_kota, tune_latency_target)
+    if page_size <= 0:
+        page_size = page_size_from_index(kabupaten_kota)
+    # If page_size is <= 0, fetch total count first and use that as page_size
+    if page_size <= 0:
+        print("Fetching metadata to determine total count...", file=sys.stderr)
+        try:
+            page_size = page_size_from_meta({"total": count_listing(kabupaten_kota)})
+        except Exception as exc:
+            page_size = page_size_from_meta(None, exc)
+
+    def fetch_items(page: int) -> List[Dict[str, Any]]:
+        # Tuned pages fail fast on timeouts and shrink instead of sitting through three 60s retries
+        if tune_latency_target is not None:
+            return fetch_span(page, page_size, kabupaten_kota)
+        return list(fetch_page(page, page_size, kabupaten_kota, retries=1).get("data") or [])
+
+    pages_data: Dict[int, List[Dict[str, Any]]] = journal.resumed_pages(page_size) if journal else {}
+    if 0 in pages_data:
+        total = journal.total
+    else:
+        # Page index starts at 0 for this API
+        if first is None and tune_latency_target is not None:
+            # Page 0 also goes through the shrinking path; the probe (or a count request) supplies the total
+            if not known_total:
+                known_total = count_listing(kabupaten_kota)
+            first = {"total": known_total, "data": retry_call("cari-sekolah", fetch_items, 0)}
+        elif first is None:
+            first = retry_call("cari-sekolah", fetch_page, 0, page_size, kabupaten_kota, 1)
+        total = int(first.get("total", len(first.get("data", []) or [])))
+        pages_data[0] = list(first.get("data") or [])
+        if journal is not None and total > 0:
+            journal.record_page(page_size, 0, total, pages_data[0])
+    if total <= 0:
+        return [], 0
+    total_pages = int(math.ceil(total / float(page_size)))
+    if max_pages is not None and max_pages > 0:
+        total_pages = min(total_pages, max_pages)
+    remaining = [page for page in range(1, total_pages) if page not in pages_data]
+    
+    print(f"Total pages to fetch: {total_pages}", file=sys.stderr)
+    completed_count = total_pages - len(remaining)
+    meter = ProgressMeter("Pages processed", total_pages, completed_count)
+    
+    if remaining:
+        # With a controller the scheduler runs its ceiling of threads and the controller gates how many run at once
+        with RetryScheduler(
+            "cari-sekolah", controller.maximum if controller else workers, controller, describe=lambda page: f"page {page}"
+        ) as scheduler:
+            for page in remaining:
+                scheduler.submit(page, fetch_items, page)
+            for page, items, error in scheduler.as_completed():
+                completed_count += 1
+                if error is not None:
+                    with print_lock:
+                        print(f"\nPermanent failure for page {page}: {error}", file=sys.stderr)
+                else:
+                    pages_data[page] = items
+                    if journal is not None:
+                        journal.record_page(page_size, page, total, items)
+                
+                # Progress indicator
+                if completed_count % 5 == 0 or completed_count == total_pages:
+                    meter.update(completed_count)
+    
+    # Clear progress line
+    print(file=sys.stderr)
+    return merge_pages(pages_data), total
+
+
+def collect_regions(
+    regions: List[str],
+    page_size: int,
+    max_pages: Optional[int],
+    workers: int,
+    controller: Optional[AdaptiveConcurrency] = None,
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, int], bool]:
+    # Every region's pages go through one listing pool (and the process-wide rate limiter). Regions are
+    # counted first and queued largest first, so a big region never ends up running alone at the tail.
+    # Returns (rows per region, reported total per region, whether every count and page succeeded).
+    complete = True
+    pages: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+    totals: Dict[str, int] = {}
+    def describe(key: Any) -> str:
+        return f"page {key[1]} of {key[0]}" if isinstance(key, tuple) else f"count of {key}"
+
+    with RetryScheduler("cari-sekolah", controller.maximum if controller else workers, controller, describe=describe) as scheduler:
+        for kab in regions:
+            known = LISTING_COUNTS.live((kab, ALLOWED_BENTUK_PENDIDIKAN, ""))
+            if known is not None:
+                totals[kab] = known
+        uncounted = [kab for kab in regions if kab not in totals]
+        if uncounted:
+            print(f"Counting schools in {len(uncounted)} regions...", file=sys.stderr)
+        for kab in uncounted:
+            scheduler.submit(kab, fetch_page, 0, 1, kab, 1)
+        for kab, result, error in scheduler.as_completed():
+            if error is not None:
+                print(f"Failed to count schools in {kab}: {error}", file=sys.stderr)
+                complete = False
+            else:
+                totals[kab] = int(result.get("total", 0))
+        order = sorted((kab for kab in regions if totals.get(kab, 0) > 0), key=lambda kab: -totals[kab])
+        for kab in regions:
+            if kab in totals and totals[kab] <= 0:
+                print(f"No schools found in {kab}.", file=sys.stderr)
+        tasks: List[Tuple[str, int, int]] = []
+        for kab in order:
+            # Without --page-size each region is fetched in one page sized to its own total
+            size = page_size if page_size > 0 else totals[kab]
+            region_pages = int(math.ceil(totals[kab] / float(size)))
+            if max_pages is not None and max_pages > 0:
+                region_pages = min(region_pages, max_pages)
+            tasks.extend((kab, page, size) for page in range(region_pages))
+            pages[kab] = {}
+        if not tasks:
+            return {}, totals, complete
+        print(
+            f"Total pages to fetch: {len(tasks)} across {len(order)} regions"
+            f" (largest: {order[0]}, {totals[order[0]]} schools).",
+            file=sys.stderr,
+        )
+        for kab, page, size in tasks:
+            scheduler.submit((kab, page), fetch_page, page, size, kab, 1)
+        meter = ProgressMeter("Pages processed", len(tasks))
+        for completed_count, ((kab, page), result, error) in enumerate(scheduler.as_completed(), 1):
+            if error is not None:
+                with print_lock:
+                    print(f"\nPermanent failure for page {page} of {kab}: {error}", file=sys.stderr)
+                complete = False
+            else:
+                pages[kab][page] = list(result.get("data") or [])
+            if completed_count % 5 == 0 or completed_count == len(tasks):
+                meter.update(completed_count)
+    print(file=sys.stderr)
+    return {kab: merge_pages(pages[kab]) for kab in regions if kab in pages}, totals, complete
+
+
+def plan_partitions(regions: List[str]) -> Tuple[List[Tuple[Tuple[str, str, str], Optional[int]]], int]:
+    # Every region split into bentuk_pendidikan x status_sekolah sub-queries, largest estimate first so the
+    # long ones start early (unknown sizes count as largest). Estimates come from listing counts of this or an
+    # earlier run, else from the region index split evenly by status. Sub-queries estimated empty are left
+    # out; if one has gained schools since, the totals check catches it. Returns (plan, sub-queries skipped).
+    plan: List[Tuple[Tuple[str, str, str], Optional[int]]] = []
+    skipped = 0
+    for kab in regions:
+        for bentuk in ALLOWED_BENTUK_PENDIDIKAN.split(","):
+            form_total = REGION_INDEX.form_count(kab, bentuk) if REGION_INDEX is not None else None
+            for status in PARTITION_STATUSES:
+                key = (kab, bentuk, status)
+                estimate = LISTING_COUNTS.estimate(key)
+                if estimate is None and form_total is not None:
+                    estimate = int(math.ceil(form_total / float(len(PARTITION_STATUSES))))
+                if estimate == 0:
+                    skipped += 1
+                    continue
+                plan.append((key, estimate))
+    plan.sort(key=lambda entry: -(entry[1] if entry[1] is not None else math.inf))
+    return plan, skipped
+
+
+def collect_partitions(
+    regions: List[str],
+    page_size: int,
+    max_pages: Optional[int],
+    workers: int,
+    controller: Optional[AdaptiveConcurrency] = None,
+) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, int], bool]:
+    # Lists every region as independent bentuk_pendidikan x status_sekolah sub-queries on one listing pool.
+    # Each sub-query's page 0 reports its live total and queues the rest of its pages; without --page-size
+    # a sub-query is fetched in one page of its estimated size. Once all of a region's sub-queries have
+    # reported, their totals must add up to the region's unpartitioned total; a region that comes up short
+    # (schools with another form or status, or a skipped sub-query that has grown) is listed again
+    # unpartitioned. Same return shape as collect_regions.
+    plan, skipped = plan_partitions(regions)
+    complete = True
+    pages: Dict[Tuple[str, str, str], Dict[int, List[Any]]] = {}
+    fallback: Dict[str, Dict[int, List[Any]]] = {}
+    totals: Dict[str, int] = {}
+    partition_totals: Dict[str, int] = {kab: 0 for kab in regions}
+    # Reports still missing before a region can be checked: its sub-queries' page 0 plus its own total
+    waiting: Dict[str, int] = {kab: 1 for kab in regions}
+    for (kab, _, _), _ in plan:
+        waiting[kab] += 1
+    unchecked = set()
+    mismatched: List[str] = []
+
+    def describe(task: Tuple[Any, ...]) -> str:
+        if task[0] == "total":
+            return f"count of {task[1] or 'all regions'}"
+        if task[0] == "full":
+            return f"page {task[2]} of {task[1] or 'all regions'}"
+        kab, bentuk, status = task[1]
+        return f"page {task[2]} of {kab or 'all regions'} {bentuk} {status}"
+
+    def page_count(total: int, size: int) -> int:
+        count = int(math.ceil(total / float(size)))
+        return min(count, max_pages) if max_pages is not None and max_pages > 0 else count
+
+    print(
+        f"Planned {len(plan)} sub-queries across {len(regions)} region(s)"
+        + (f" ({skipped} known to be empty left out)" if skipped else "")
+        + ".",
+        file=sys.stderr,
+    )
+    sizes: Dict[Tuple[str, str, str], int] = {}
+    with RetryScheduler("cari-sekolah", controller.maximum if controller else workers, controller, describe=describe) as scheduler:
+        for kab in regions:
+            scheduler.submit(("total", kab), fetch_page, 0, 1, kab, 1)
+        for key, estimate in plan:
+            sizes[key] = page_size if page_size > 0 else max(1, estimate or PARTITION_PAGE_SIZE)
+            pages[key] = {}
+            scheduler.submit(("page", key, 0), fetch_page, 0, sizes[key], key[0], 1, key[1], key[2])
+        submitted = len(regions) + len(plan)
+        meter = ProgressMeter("Listing requests", submitted)
+        for completed_count, (task, result, error) in enumerate(scheduler.as_completed(), 1):
+            kind = task[0]
+            kab = task[1] if kind != "page" else task[1][0]
+            if error is not None:
+                with print_lock:
+                    print(f"\nPermanent failure for {describe(task)}: {error}", file=sys.stderr)
+                complete = False
+                if kind == "total" or (kind == "page" and task[2] == 0):
+                    unchecked.add(kab)
+            elif kind == "total":
+                totals[kab] = int(result.get("total", 0))
+            elif kind == "full":
+                fallback[kab][task[2]] = list(result.get("data") or [])
+            else:
+                key, page = task[1], task[2]
+                pages[key][page] = list(result.get("data") or [])
+                if page == 0:
+                    live = int(result.get("total", 0))
+                    partition_totals[kab] += live
+                    for more in range(1, page_count(live, sizes[key])):
+                        scheduler.submit(("page", key, more), fetch_page, more, sizes[key], kab, 1, key[1], key[2])
+                        submitted += 1
+            if kind == "total" or (kind == "page" and task[2] == 0):
+                waiting[kab] -= 1
+                if waiting[kab] == 0 and kab not in unchecked and partition_totals[kab] != totals.get(kab, 0):
+                    mismatched.append(kab)
+                    with print_lock:
+                        print(
+                            f"\nSub-query totals of {kab or 'all regions'} add up to {partition_totals[kab]},"
+                            f" but the unpartitioned total is {totals[kab]}.",
+                            file=sys.stderr,
+                        )
+                    if partition_totals[kab] < totals[kab]:
+                        with print_lock:
+                            print("Listing it again without partitions.", file=sys.stderr)
+                        fallback[kab] = {}
+                        size = page_size if page_size > 0 else totals[kab]
+                        for page in range(page_count(totals[kab], size)):
+                            scheduler.submit(("full", kab, page), fetch_page, page, size, kab, 1)
+                            submitted += 1
+            meter.total = submitted
+            if completed_count % 5 == 0 or completed_count == submitted:
+                meter.update(completed_count)
+    print(file=sys.stderr)
+    checked = len(regions) - len(unchecked)
+    print(
+        f"Sub-query totals matched the unpartitioned total in {checked - len(mismatched)} of {len(regions)} region(s).",
+        file=sys.stderr,
+    )
+    region_items: Dict[str, List[Dict[str, Any]]] = {}
+    for kab in regions:
+        groups = [merge_pages(pages[key]) for key, _ in plan if key[0] == kab]
+        if kab in fallback:
+            groups.append(merge_pages(fallback[kab]))
+        region_items[kab], _ = dedupe_schools(groups)
+    return region_items, totals, complete
+
+
+# SQLite-backed cache of full-detail responses keyed by sekolah_id, with a TTL and LRU size bound
+class DetailCache:
+    def __init__(
+        self,
+        cache_dir: Path,
+        ttl: float,
+        max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024,
+        commit_every: int = 100,
+    ) -> None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        self.path = cache_dir / "full_detail.sqlite3"
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # Processes sharing one cache file commit every write so none holds the write lock for long
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS detail ("
+            "sekolah_id TEXT PRIMARY KEY, body TEXT NOT NULL, fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS detail_accessed ON detail (accessed_at)")
+        self._conn.execute("DELETE FROM detail WHERE fetched_at < ?", (time.time() - ttl,))
+        self._conn.commit()
+        self._size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM detail").fetchone()[0]
+
+    def get(self, sekolah_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT body FROM detail WHERE sekolah_id = ? AND fetched_at >= ?", (sekolah_id, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE detail SET accessed_at = ? WHERE sekolah_id = ?", (now, sekolah_id))
+                    self._changed()
+            except sqlite3.OperationalError:
+                # Locked by another process: treat as a miss rather than failing the lookup
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, sekolah_id: str, data: Dict[str, Any]) -> None:
+        body = json.dumps(data, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            try:
+                old = self._conn.execute(
+                    "SELECT LENGTH(body) FROM detail WHERE sekolah_id = ?", (sekolah_id,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO detail (sekolah_id, body, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (sekolah_id, body, now, now),
+                )
+                self._size += len(body) - (old[0] if old else 0)
+                if self._size > self.max_bytes:
+                    self._evict()
+                self._changed()
+            except sqlite3.OperationalError:
+                # Skipping a write only costs a refetch next time
+                pass
+
+    def fresh_ids(self) -> set:
+        # Every sekolah_id a lookup would currently answer from the cache, in one query
+        with self._lock:
+            rows = self._conn.execute("SELECT sekolah_id FROM detail WHERE fetched_at >= ?", (time.time() - self.ttl,))
+            return {row[0] for row in rows}
+
+    def _evict(self) -> None:
+        # Drop least recently used entries until the cache is back under 90% of its bound
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT sekolah_id, LENGTH(body) FROM detail ORDER BY accessed_at").fetchall()
+        doomed: List[Tuple[str]] = []
+        for sekolah_id, size in rows:
+            if self._size <= target:
+                break
+            doomed.append((sekolah_id,))
+            self._size -= size
+        self._conn.executemany("DELETE FROM detail WHERE sekolah_id = ?", doomed)
+
+    def _changed(self) -> None:
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._conn.commit()
+            self._uncommitted = 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> None:
+        print(
+            f"Detail cache: {self.hits} hits, {self.misses} misses ({self.hit_rate() * 100:.1f}% hit rate).",
+            file=sys.stderr,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+DETAIL_CACHE: Optional[DetailCache] = None
+
+
+# Append-only archive of raw API data (--archive): every listing item and full-detail response as
+# zlib-compressed JSON in SQLite. A school gets a new row only when its content changed, so the
+# archive keeps every distinct version and `export` reads the latest one without touching the network.
+class ResponseArchive:
+    TABLES = ("listing", "detail")
+
+    def __init__(self, path: Path, commit_every: int = 500) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.commit_every = commit_every
+        self.added = 0
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        for table in self.TABLES:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, sekolah_id TEXT NOT NULL,"
+                " digest BLOB NOT NULL, fetched_at REAL NOT NULL, body BLOB NOT NULL, UNIQUE (sekolah_id, digest))"
+            )
+        self._conn.commit()
+
+    def add(self, table: str, sekolah_id: str, data: Dict[str, Any]) -> None:
+        self.add_many(table, [(sekolah_id, data)])
+
+    def add_many(self, table: str, items: Sequence[Tuple[str, Dict[str, Any]]]) -> None:
+        # (sekolah_id, response) pairs, inserted together; a listing page is one call
+        now = time.time()
+        rows = []
+        for sekolah_id, data in items:
+            # Canonical JSON, so an unchanged response hashes the same on every run
+            raw = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            rows.append((sekolah_id, hashlib.blake2b(raw, digest_size=16).digest(), now, zlib.compress(raw, 6)))
+        with self._lock:
+            cursor = self._conn.executemany(
+                f"INSERT OR IGNORE INTO {table} (sekolah_id, digest, fetched_at, body) VALUES (?, ?, ?, ?)", rows
+            )
+            self.added += cursor.rowcount
+            self._uncommitted += len(rows)
+            if self._uncommitted >= self.commit_every:
+                self._conn.commit()
+                self._uncommitted = 0
+
+    def latest(self, with_detail: bool = True) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        # (listing item, detail response or None) for the newest version of every school, in archive order
+        detail = (
+            "(SELECT body FROM detail WHERE detail.sekolah_id = listing.sekolah_id ORDER BY id DESC LIMIT 1)"
+            if with_detail
+            else "NULL"
+        )
+        with self._lock:
+            self._conn.commit()
+            self._uncommitted = 0
+        # A connection of its own reads a WAL snapshot, so threads can keep adding while this streams
+        conn = sqlite3.connect(str(self.path))
+        try:
+            rows = conn.execute(
+                f"SELECT body, {detail} FROM listing"
+                " WHERE id IN (SELECT MAX(id) FROM listing GROUP BY sekolah_id) ORDER BY id"
+            )
+            for listing_body, detail_body in rows:
+                yield (
+                    json.loads(zlib.decompress(listing_body)),
+                    json.loads(zlib.decompress(detail_body)) if detail_body is not None else None,
+                )
+        finally:
+            conn.close()
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                table: self._conn.execute(f"SELECT COUNT(DISTINCT sekolah_id) FROM {table}").fetchone()[0]
+                for table in self.TABLES
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+
+ARCHIVE: Optional[ResponseArchive] = None
+
+
+def region_search_key(name: str) -> str:
+    # "Kab. Bandung Barat" -> "bandung barat": lowercase words without the administrative prefix
+    words = re.sub(r"[^a-z0-9]+", " ", name.lower()).split()
+    while len(words) > 1 and words[0] in ("kab", "kabupaten", "kota", "adm", "administrasi", "prov", "provinsi"):
+        words.pop(0)
+    return " ".join(words)
+
+
+# On-disk index of every kabupaten/kota with school counts per bentuk_pendidikan. It makes region search
+# local and lets a single-region run size its page without a count request. Counts can be up to a TTL
+# old; that is safe for sizing, because page 0 still reports the live total and any remainder is paged.
+class RegionIndex:
+    def __init__(self, provinces: Dict[str, Dict[str, Dict[str, int]]], built_at: float) -> None:
+        self.provinces = provinces
+        self.built_at = built_at
+        # kabupaten/kota -> (province, schools)
+        self.regions: Dict[str, Tuple[str, int]] = {}
+        for province, regions in provinces.items():
+            for kab, counts in regions.items():
+                previous = self.regions.get(kab, (province, 0))[1]
+                self.regions[kab] = (province, previous + sum(counts.values()))
+        self._keys = {kab: region_search_key(kab) for kab in self.regions}
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]]) -> "RegionIndex":
+        provinces: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for row in items:
+            kab = row.get("kabupaten")
+            if not kab:
+                continue
+            counts = provinces.setdefault(row.get("provinsi") or "", {}).setdefault(kab, {})
+            bentuk = row.get("bentuk_pendidikan") or ""
+            counts[bentuk] = counts.get(bentuk, 0) + 1
+        return cls(provinces, time.time())
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["RegionIndex"]:
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            # Counts taken under a different school-form filter do not size our pages
+            if data.get("bentuk_pendidikan") != ALLOWED_BENTUK_PENDIDIKAN:
+                return None
+            return cls(data["provinces"], float(data["built_at"]))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"built_at": self.built_at, "bentuk_pendidikan": ALLOWED_BENTUK_PENDIDIKAN, "provinces": self.provinces}
+        write_file_atomic(str(path), json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True))
+
+    def age_days(self) -> float:
+        return max(0.0, time.time() - self.built_at) / 86400
+
+    def count(self, kabupaten_kota: str = "") -> Optional[int]:
+        if not kabupaten_kota:
+            return sum(total for _, total in self.regions.values())
+        entry = self.regions.get(kabupaten_kota)
+        return entry[1] if entry else None
+
+    def form_count(self, kabupaten_kota: str, bentuk: str) -> Optional[int]:
+        # Schools of one bentuk_pendidikan in a region (all regions for ""); None for an unknown region
+        if kabupaten_kota and kabupaten_kota not in self.regions:
+            return None
+        return sum(
+            counts.get(bentuk, 0)
+            for regions in self.provinces.values()
+            for kab, counts in regions.items()
+            if not kabupaten_kota or kab == kabupaten_kota
+        )
+
+    def search(self, query: str, limit: int = 20) -> List[str]:
+        # Ranked: exact name, name without prefix, prefix, substring, province; close spellings only if none match.
+        # ties go to the region with more schools
+        full = " ".join(re.sub(r"[^a-z0-9]+", " ", query.lower()).split())
+        key = region_search_key(query)
+        if not key:
+            return []
+        ranks: Dict[str, int] = {}
+        for kab, (province, _) in self.regions.items():
+            name_key = self._keys[kab]
+            if " ".join(re.sub(r"[^a-z0-9]+", " ", kab.lower()).split()) == full:
+                ranks[kab] = 0
+            elif name_key == key:
+                ranks[kab] = 1
+            elif name_key.startswith(key):
+                ranks[kab] = 2
+            elif key in name_key:
+                ranks[kab] = 3
+            elif key in region_search_key(province):
+                ranks[kab] = 4
+        if not ranks:
+            # Typos: closest spellings first
+            by_key: Dict[str, List[str]] = {}
+            for kab, name_key in self._keys.items():
+                by_key.setdefault(name_key, []).append(kab)
+            for position, match in enumerate(difflib.get_close_matches(key, list(by_key), n=limit, cutoff=0.6)):
+                for kab in by_key[match]:
+                    ranks.setdefault(kab, 5 + position)
+        return sorted(ranks, key=lambda kab: (ranks[kab], -self.regions[kab][1], kab))[:limit]
+
+    def describe(self, kabupaten_kota: str) -> str:
+        province, total = self.regions[kabupaten_kota]
+        return f"{kabupaten_kota} ({province}, {total} schools)"
+
+
+REGION_INDEX: Optional[RegionIndex] = None
+
+
+def region_index_path(cache_dir: str) -> Path:
+    return Path(cache_dir) / "regions.json"
+
+
+def page_size_from_index(kabupaten_kota: str = "") -> int:
+    total = REGION_INDEX.count(kabupaten_kota) if REGION_INDEX is not None else None
+    if not total:
+        return 0
+    print(f"Using page size {total} from the region index.", file=sys.stderr)
+    return total
+
+
+def build_region_index(workers: int) -> RegionIndex:
+    print("Building the region index from a nationwide listing...", file=sys.stderr)
+    items, total = collect_pages(REGION_INDEX_PAGE_SIZE, None, workers)
+    if not items or len(items) < total:
+        # A partial listing would under-count; keep the old index instead
+        raise RuntimeError(f"listed {len(items)} of {total} schools")
+    return RegionIndex.from_items(items)
+
+
+def load_region_index(path: Path, ttl_days: float, workers: int = 1, build: bool = True, refresh: bool = False) -> Optional[RegionIndex]:
+    # A fresh index on disk is used as is; otherwise it is rebuilt when `build` is set, and a stale
+    # index is still returned if the rebuild fails
+    index = RegionIndex.load(path)
+    if index is not None and not refresh and index.age_days() <= ttl_days:
+        return index
+    if not build:
+        return None
+    try:
+        rebuilt = build_region_index(workers)
+        rebuilt.save(path)
+    except Exception as exc:
+        print(f"Failed to build region index: {exc}", file=sys.stderr)
+        return index
+    print(f"Saved region index of {len(rebuilt.regions)} regions to {path}", file=sys.stderr)
+    return rebuilt
+
+
+def lookup_phone(sekolah_id: str, retries: int = 3) -> Optional[str]:
+    data = DETAIL_CACHE.get(sekolah_id) if DETAIL_CACHE is not None else None
+    if data is None:
+        data = get_json(f"{DETAIL_ENDPOINT}/{sekolah_id}", retries=retries)
+        if DETAIL_CACHE is not None:
+            DETAIL_CACHE.put(sekolah_id, data)
+    # Cache hits are archived too; an unchanged response is not stored twice
+    if ARCHIVE is not None:
+        ARCHIVE.add("detail", sekolah_id, data)
+    return parse_phone(data)
+
+
+def fetch_phone(sekolah_id: str) -> Optional[str]:
+    try:
+        return lookup_phone(sekolah_id)
+    except BaseException as exc:
+        print(f"Failed to fetch detail for {sekolah_id}: {exc}", file=sys.stderr)
+        return None
+
+
+def detail_record(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # The school object inside a full-detail response
+    detail = (data or {}).get("data") or {}
+    sekolah_list = detail.get("sekolah") if isinstance(detail, dict) else None
+    if not sekolah_list or not isinstance(sekolah_list, list):
+        return {}
+    return sekolah_list[0] or {}
+
+
+def parse_phone(data: Dict[str, Any]) -> Optional[str]:
+    phone = detail_record(data).get("nomor_telepon")
+    if phone is None:
+        return None
+    text = str(phone).strip()
+    return text or None
+
+
+def split_journaled_phones(
+    ids: List[str], journal: Optional[ScrapeJournal]
+) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    if journal is None:
+        return {}, ids
+    phones = {sekolah_id: journal.phones[sekolah_id] for sekolah_id in ids if sekolah_id in journal.phones}
+    if phones:
+        print(f"Skipping {len(phones)} schools already resolved in the journal.", file=sys.stderr)
+    return phones, [sekolah_id for sekolah_id in ids if sekolah_id not in phones]
+
+
+def enrich_with_phones(
+    items: Iterable[Dict[str, Any]],
+    workers: int,
+    controller: Optional[AdaptiveConcurrency] = None,
+    journal: Optional[ScrapeJournal] = None,
+    deadline: Optional[float] = None,
+    hedge: Optional[HedgePolicy] = None,
+) -> Dict[str, Optional[str]]:
+    # Schools are looked up in the order given; with a deadline, the ones not reached are left out of the result
+    ids = [row.get("sekolah_id") for row in items if row.get("sekolah_id")]
+    phones, ids = split_journaled_phones(ids, journal)
+    if not ids:
+        return phones
+        
+    total_items = len(ids)
+    processed_count = 0
+    print(f"Fetching details for {total_items} schools...", file=sys.stderr)
+    meter = ProgressMeter("Details processed", total_items)
+    
+    with RetryScheduler(
+        "full-detail", controller.maximum if controller else workers, controller, deadline=deadline, hedge=hedge
+    ) as scheduler:
+        for sekolah_id in ids:
+            scheduler.submit(sekolah_id, lookup_phone, sekolah_id, 1)
+        for sekolah_id, phone, error in scheduler.as_completed():
+            processed_count += 1
+            if error is not None:
+                with print_lock:
+                    print(f"\nFailed to get phone for {sekolah_id}: {error}", file=sys.stderr)
+            elif journal is not None:
+                journal.record_phone(sekolah_id, phone)
+            phones[sekolah_id] = phone
+            
+            # Progress indicator
+            if processed_count % 10 == 0 or processed_count == total_items:
+                meter.update(processed_count)
+    
+    # Clear progress line
+    print(file=sys.stderr)
+    if scheduler.cancelled:
+        print(f"Time budget reached; cancelled {total_items - processed_count} pending detail lookups.", file=sys.stderr)
+    if hedge is not None:
+        hedge.report()
+    if DETAIL_CACHE is not None:
+        DETAIL_CACHE.report()
+    
+    return phones
+
+
+# In-process API for Python code that wants the records rather than a CSV file:
+#
+#     with SekolahKitaClient(rps=2.0, cache_dir="cache") as client:
+#         for school in client.iter_schools(region="Kota Bandung", with_phone=True):
+#             ...
+#
+# Endpoints, rate limit, connection pool and detail cache belong to the client, so clients with different
+# settings can run side by side. Pass `pool`, `limiter` or `cache` to share one between clients; a client
+# only closes what it created. Schools are dicts with the CSV columns (CSV_FIELDNAMES).
+class SekolahKitaClient:
+    def __init__(
+        self,
+        api_base: Optional[str] = None,
+        rps: float = DEFAULT_RPS,
+        burst: int = DEFAULT_BURST,
+        rate_limit: bool = True,
+        workers: int = SAFE_DETAIL_WORKERS_MAX,
+        retries: int = 3,
+        timeout: float = 60.0,
+        cache_dir: Optional[str] = None,
+        cache_ttl_days: float = DEFAULT_CACHE_TTL_DAYS,
+        pool: Optional[ConnectionPool] = None,
+        limiter: Optional[TokenBucket] = None,
+        cache: Optional[DetailCache] = None,
+        metrics: Optional[RunMetrics] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        base = (api_base or API_BASE).rstrip("/")
+        self.cari_endpoint = f"{base}{CARI_PATH}"
+        self.detail_endpoint = f"{base}{DETAIL_PATH}"
+        self.workers = max(1, workers)
+        self.retries = max(1, retries)
+        self._owned: List[Any] = []
+        if pool is None:
+            pool = ConnectionPool(timeout)
+            self._owned.append(pool)
+        if cache is None and cache_dir:
+            cache = DetailCache(Path(cache_dir), cache_ttl_days * 86400)
+            self._owned.append(cache)
+        self.pool = pool
+        self.limiter = limiter if limiter is not None else TokenBucket(rps, burst, enabled=rate_limit)
+        self.cache = cache
+        # Nothing is shared with the command line's globals or with other clients unless passed in
+        self.metrics = metrics if metrics is not None else RunMetrics()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        # Called after every HTTP attempt as (endpoint, latency seconds, error or None)
+        self.observers: List[Callable[[str, float, Optional[BaseException]], None]] = []
+
+    def __enter__(self) -> "SekolahKitaClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        owned, self._owned = self._owned, []
+        for resource in owned:
+            resource.close()
+
+    def fetch_page(self, page: int, size: int, region: str = "") -> Dict[str, Any]:
+        # One cari-sekolah page: {"total": schools in the listing, "data": [SchoolRecord, ...]}
+        return post_json(
+            self.cari_endpoint,
+            build_page_payload(page, size, region),
+            retries=self.retries,
+            object_hook=school_record_hook,
+            stream_key="data",
+            pool=self.pool,
+            limiter=self.limiter,
+            metrics=self.metrics,
+            observers=self.observers,
+        )
+
+    def count(self, region: str = "") -> int:
+        return int(self.fetch_page(0, 1, region).get("total", 0))
+
+    def fetch_detail(self, sekolah_id: str, retries: Optional[int] = None) -> Dict[str, Any]:
+        data = self.cache.get(sekolah_id) if self.cache is not None else None
+        if data is None:
+            data = get_json(
+                f"{self.detail_endpoint}/{sekolah_id}",
+                retries=retries or self.retries,
+                pool=self.pool,
+                limiter=self.limiter,
+                metrics=self.metrics,
+                observers=self.observers,
+            )
+            if self.cache is not None:
+                self.cache.put(sekolah_id, data)
+        return data
+
+    def fetch_phone(self, sekolah_id: str, retries: Optional[int] = None) -> Optional[str]:
+        return parse_phone(self.fetch_detail(sekolah_id, retries))
+
+    def iter_pages(
+        self, region: str = "", page_size: int = STREAM_PAGE_SIZE, max_pages: Optional[int] = None
+    ) -> Iterator[List[SchoolRecord]]:
+        # Listing pages in order; the next page is already on its way while the caller handles this one
+        first = self.fetch_page(0, page_size, region)
+        total = int(first.get("total", 0))
+        pages = int(math.ceil(total / float(page_size))) if total > 0 else 0
+        if max_pages is not None and max_pages > 0:
+            pages = min(pages, max_pages)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result = first
+            for page in range(pages):
+                upcoming = executor.submit(self.fetch_page, page + 1, page_size, region) if page + 1 < pages else None
+                yield list(result.get("data") or [])
+                if upcoming is not None:
+                    result = upcoming.result()
+
+    def iter_schools(
+        self,
+        region: str = "",
+        with_phone: bool = False,
+        page_size: int = STREAM_PAGE_SIZE,
+        max_pages: Optional[int] = None,
+    ) -> Iterator[Dict[str, str]]:
+        # Yields each page's schools as soon as the page (and, with_phone, its phone lookups) is done.
+        # A failed detail lookup leaves that phone empty instead of ending the iteration.
+        for items in self.iter_pages(region, page_size, max_pages):
+            phones = self._phones(items) if with_phone else {}
+            for row in items:
+                yield dict(zip(CSV_FIELDNAMES, output_row(row, phones.get(row.get("sekolah_id")))))
+
+    def _phones(self, items: List[SchoolRecord]) -> Dict[str, Optional[str]]:
+        # Lookups retry through a scheduler on this client's pool, limiter, metrics and breaker
+        phones: Dict[str, Optional[str]] = {}
+        with RetryScheduler(
+            "full-detail",
+            self.workers,
+            attempts=self.retries,
+            breaker=self.breaker,
+            pool=self.pool,
+            limiter=self.limiter,
+            metrics=self.metrics,
+        ) as scheduler:
+            for row in items:
+                if row.get("sekolah_id"):
+                    scheduler.submit(row.get("sekolah_id"), self.fetch_phone, row.get("sekolah_id"), 1)
+            for sekolah_id, phone, error in scheduler.as_completed():
+                if error is not None:
+                    with print_lock:
+                        print(f"Failed to fetch detail for {sekolah_id}: {error}", file=sys.stderr)
+                phones[sekolah_id] = phone
+        return phones
+
+
+# Minimal HTTP/1.1 client on asyncio streams that keeps connections alive per host
+class AsyncHTTPClient:
+    def __init__(self, timeout: float = 60.0) -> None:
+        self.timeout = timeout
+        self._idle: Dict[Tuple[str, str, int], List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]] = {}
+        self._ssl_context = ssl.create_default_context()
+        self.connections_opened = 0
+        self.requests_served = 0
+        self.reconnects = 0
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, str, http.client.HTTPMessage, bytes]:
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80))
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        lines = [
+            f"{method} {target} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            f"User-Agent: {USER_AGENT}",
+            "Accept: application/json",
+            f"Accept-Encoding: {ACCEPT_ENCODING}",
+            "Connection: keep-alive",
+        ]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        raw = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+        return await asyncio.wait_for(self._exchange(key, raw, method), self.timeout)
+
+    async def _exchange(
+        self, key: Tuple[str, str, int], raw: bytes, method: str
+    ) -> Tuple[int, str, http.client.HTTPMessage, bytes]:
+        while True:
+            reader, writer, reused = await self._acquire(key)
+            try:
+                writer.write(raw)
+                await writer.drain()
+                status, reason, headers, body, keep_alive = await self._read_response(reader, method)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused:
+                    # The server closed an idle keep-alive connection; retry on a fresh one.
+                    self.reconnects += 1
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                self._idle.setdefault(key, []).append((reader, writer))
+            else:
+                writer.close()
+            self.requests_served += 1
+            return status, reason, headers, body
+
+    async def _acquire(
+        self, key: Tuple[str, str, int]
+    ) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, bool]:
+        idle = self._idle.get(key) or []
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer, True
+            writer.close()
+        scheme, host, port = key
+        reader, writer = await asyncio.open_connection(
+            host, port, ssl=self._ssl_context if scheme == "https" else None
+        )
+        self.connections_opened += 1
+        return reader, writer, False
+
+    async def _read_response(
+        self, reader: asyncio.StreamReader, method: str
+    ) -> Tuple[int, str, http.client.HTTPMessage, bytes, bool]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Remote end closed connection without response")
+        version, status_text, reason = (status_line.decode("latin-1").rstrip("\r\n").split(None, 2) + [""])[:3]
+        status = int(status_text)
+        headers = http.client.HTTPMessage()
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip()] = value.strip()
+        connection = (headers.get("Connection") or "").lower()
+        keep_alive = connection != "close" and (version != "HTTP/1.0" or connection == "keep-alive")
+        if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+            body = b""
+        elif (headers.get("Transfer-Encoding") or "").lower() == "chunked":
+            body = await self._read_chunked(reader)
+        elif headers.get("Content-Length") is not None:
+            body = await reader.readexactly(int(headers["Content-Length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return status, reason, headers, body, keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            size_line = await reader.readline()
+            if not size_line:
+                raise asyncio.IncompleteReadError(b"".join(chunks), None)
+            size = int(size_line.split(b";", 1)[0].strip(), 16)
+            if size == 0:
+                # Skip optional trailers up to the terminating blank line
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections_opened": self.connections_opened,
+            "requests_served": self.requests_served,
+            "reconnects": self.reconnects,
+        }
+
+    async def close(self) -> None:
+        writers = [writer for conns in self._idle.values() for _, writer in conns]
+        self._idle.clear()
+        for writer in writers:
+            writer.close()
+        for writer in writers:
+            try:
+                await writer.wait_closed()
+            except (OSError, ssl.SSLError):
+                pass
+
+
+async def request_json_async(
+    client: AsyncHTTPClient,
+    method: str,
+    url: str,
+    payload: Optional[Dict[str, Any]] = None,
+    retries: int = 3,
+    backoff: float = 2.0,
+    object_hook: Optional[Callable[[Dict[str, Any]], Any]] = None,
+    archive: Optional[str] = None,
+) -> Dict[str, Any]:
+    body: Optional[bytes] = None
+    headers: Dict[str, str] = {}
+    if payload is not None:
+        body = json.dumps(payload).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    attempt = 0
+    last_err: Optional[BaseException] = None
+    endpoint = endpoint_name(url)
+    while attempt < retries:
+        queued = time.monotonic()
+        # The event loop has no RetryScheduler, so each attempt checks in with the breaker itself
+        probe = await CIRCUIT_BREAKER.wait_async()
+        await RATE_LIMITER.acquire_async()
+        started = time.monotonic()
+        received: Optional[float] = None
+        data = b""
+        raw: List[Dict[str, Any]] = []
+        hook = keeping_raw_items(raw, object_hook) if archive is not None and ARCHIVE is not None else object_hook
+        try:
+            status, reason, resp_headers, data = await client.request(method, url, body, headers)
+            received = time.monotonic()
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, reason, resp_headers, None)
+            text = decode_content(data, resp_headers.get("Content-Encoding")).decode("utf-8", errors="ignore")
+            result = json.loads(text, object_hook=hook)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as exc:
+            finished = time.monotonic()
+            notify_request(endpoint, finished - started, exc)
+            RUN_METRICS.record(endpoint, queued, started, received, finished, len(data), exc)
+            CIRCUIT_BREAKER.record(exc, probe)
+            last_err = exc
+            attempt += 1
+            wait_time = retry_delay(exc, attempt, backoff)
+            if attempt >= retries:
+                break
+            RUN_METRICS.record_retry(endpoint, wait_time)
+            print(f"[Warn] {method} {url} failed (attempt {attempt}/{retries}): {exc}. Retrying in {wait_time:.2f}s...", file=sys.stderr)
+            await asyncio.sleep(wait_time)
+            continue
+        finished = time.monotonic()
+        notify_request(endpoint, finished - started, None)
+        RUN_METRICS.record(endpoint, queued, started, received, finished, len(data), None)
+        CIRCUIT_BREAKER.record(None, probe)
+        if raw:
+            ARCHIVE.add_many(archive, [(item["sekolah_id"], item) for item in raw])
+        return result
+    if last_err:
+        raise last_err
+    raise RuntimeError("Unknown error in request_json_async")
+
+
+async def run_async_workers(jobs: Iterable[Any], handler: Any, concurrency: int) -> None:
+    # Workers share one iterator, so at most `concurrency` handlers are in flight at once
+    pending = iter(jobs)
+
+    async def worker() -> None:
+        for job in pending:
+            await handler(job)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+
+async def fetch_page_async(
+    client: AsyncHTTPClient, page: int, size: int, kabupaten_kota: str = ""
+) -> Dict[str, Any]:
+    result = await request_json_async(
+        client,
+        "POST",
+        CARI_ENDPOINT,
+        build_page_payload(page, size, kabupaten_kota),
+        object_hook=school_record_hook,
+        archive="listing",
+    )
+    return record_listing_total(result, kabupaten_kota)
+
+
+async def collect_pages_async(
+    client: AsyncHTTPClient,
+    page_size: int,
+    max_pages: Optional[int],
+    workers: int,
+    kabupaten_kota: str = "",
+    journal: Optional[ScrapeJournal] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    if page_size <= 0 and journal is not None and journal.page_size:
+        page_size = journal.page_size
+        print(f"Using page size {page_size} from journal.", file=sys.stderr)
+    if page_size <= 0:
+        page_size = page_size_from_index(kabupaten_kota)
+    if page_size <= 0:
+        print("Fetching metadata to determine total count...", file=sys.stderr)
+        try:
+            known = LISTING_COUNTS.live((kabupaten_kota, ALLOWED_BENTUK_PENDIDIKAN, ""))
+            if known is not None:
+                page_size = page_size_from_meta({"total": known})
+            else:
+                page_size = page_size_from_meta(await fetch_page_async(client, 0, 1, kabupaten_kota))
+        except Exception as exc:
+            page_size = page_size_from_meta(None, exc)
+
+    pages_data: Dict[int, List[Dict[str, Any]]] = journal.resumed_pages(page_size) if journal else {}
+    if 0 in pages_data:
+        total = journal.total
+    else:
+        first = await fetch_page_async(client, 0, page_size, kabupaten_kota)
+        total = int(first.get("total", len(first.get("data", []) or [])))
+        pages_data[0] = list(first.get("data") or [])
+        if journal is not None and total > 0:
+            journal.record_page(page_size, 0, total, pages_data[0])
+    if total <= 0:
+        return [], 0
+    total_pages = int(math.ceil(total / float(page_size)))
+    if max_pages is not None and max_pages > 0:
+        total_pages = min(total_pages, max_pages)
+    remaining = [page for page in range(1, total_pages) if page not in pages_data]
+    failed_pages: List[int] = []
+
+    print(f"Total pages to fetch: {total_pages}", file=sys.stderr)
+    completed_count = total_pages - len(remaining)
+    meter = ProgressMeter("Pages processed", total_pages, completed_count)
+
+    async def fetch_and_record(page: int) -> None:
+        result = await fetch_page_async(client, page, page_size, kabupaten_kota)
+        pages_data[page] = list(result.get("data") or [])
+        if journal is not None:
+            journal.record_page(page_size, page, total, pages_data[page])
+
+    async def handle(page: int) -> None:
+        nonlocal completed_count
+        try:
+            await fetch_and_record(page)
+        except Exception as exc:
+            print(f"\nFailed to fetch page {page}: {exc}", file=sys.stderr)
+            failed_pages.append(page)
+        completed_count += 1
+        if completed_count % 5 == 0 or completed_count == total_pages:
+            meter.update(completed_count)
+
+    if remaining:
+        await run_async_workers(remaining, handle, workers)
+
+    # Clear progress line
+    print(file=sys.stderr)
+
+    async def retry(page: int) -> None:
+        try:
+            await fetch_and_record(page)
+        except Exception as exc:
+            print(f"Permanent failure for page {page}: {exc}", file=sys.stderr)
+
+    # One more concurrent pass; request_json_async backs off and checks the breaker between attempts
+    if failed_pages:
+        await run_async_workers(sorted(set(failed_pages)), retry, workers)
+    return merge_pages(pages_data), total
+
+
+async def lookup_phone_async(client: AsyncHTTPClient, sekolah_id: str) -> Optional[str]:
+    data = DETAIL_CACHE.get(sekolah_id) if DETAIL_CACHE is not None else None
+    if data is None:
+        data = await request_json_async(client, "GET", f"{DETAIL_ENDPOINT}/{sekolah_id}")
+        if DETAIL_CACHE is not None:
+            DETAIL_CACHE.put(sekolah_id, data)
+    if ARCHIVE is not None:
+        ARCHIVE.add("detail", sekolah_id, data)
+    return parse_phone(data)
+
+
+async def fetch_phone_async(client: AsyncHTTPClient, sekolah_id: str) -> Optional[str]:
+    try:
+        return await lookup_phone_async(client, sekolah_id)
+    except Exception as exc:
+        print(f"Failed to fetch detail for {sekolah_id}: {exc}", file=sys.stderr)
+        return None
+
+
+async def enrich_with_phones_async(
+    client: AsyncHTTPClient,
+    items: Iterable[Dict[str, Any]],
+    concurrency: int,
+    journal: Optional[ScrapeJournal] = None,
+    deadline: Optional[float] = None,
+) -> Dict[str, Optional[str]]:
+    ids = [row.get("sekolah_id") for row in items if row.get("sekolah_id")]
+    phones, ids = split_journaled_phones(ids, journal)
+    if not ids:
+        return phones
+
+    total_items = len(ids)
+    processed_count = 0
+    print(f"Fetching details for {total_items} schools...", file=sys.stderr)
+    meter = ProgressMeter("Details processed", total_items)
+
+    async def handle(sekolah_id: str) -> None:
+        nonlocal processed_count
+        try:
+            phones[sekolah_id] = await lookup_phone_async(client, sekolah_id)
+            if journal is not None:
+                journal.record_phone(sekolah_id, phones[sekolah_id])
+        except Exception as exc:
+            print(f"\nFailed to get phone for {sekolah_id}: {exc}", file=sys.stderr)
+            phones[sekolah_id] = None
+        processed_count += 1
+        if processed_count % 10 == 0 or processed_count == total_items:
+            meter.update(processed_count)
+
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    cancelled = False
+    try:
+        # Cancelling at the deadline also aborts the requests in flight
+        await asyncio.wait_for(run_async_workers(ids, handle, concurrency), timeout)
+    except asyncio.TimeoutError:
+        cancelled = True
+
+    # Clear progress line
+    print(file=sys.stderr)
+    if cancelled:
+        print(f"Time budget reached; cancelled {total_items - processed_count} pending detail lookups.", file=sys.stderr)
+    if DETAIL_CACHE is not None:
+        DETAIL_CACHE.report()
+
+    return phones
+
+
+CSV_FIELDNAMES = ["school_name", "address", "city", "province", "phone", "sekolah_id"]
+
+
+def output_row(row: Dict[str, Any], phone: Optional[str]) -> Tuple[str, ...]:
+    # One output row as a tuple in CSV_FIELDNAMES order
+    return (
+        row.get("nama") or "",
+        row.get("alamat_jalan") or "",
+        row.get("kabupaten") or "",
+        row.get("provinsi") or "",
+        phone or "",
+        row.get("sekolah_id") or "",
+    )
+
+
+def import_optional(module: str, output_format: str) -> Any:
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        package = module.split(".")[0]
+        raise RuntimeError(
+            f"--format {output_format} needs the optional '{package}' package (pip install {package})."
+        ) from None
+
+
+# Output writers take tuples in `fieldnames` order (CSV_FIELDNAMES unless exporting a projection). write() may buffer, flush() pushes out what
+# the format can cheaply make visible, and close() finishes the file.
+class CsvWriter:
+    def __init__(self, path: str, fieldnames: Sequence[str] = CSV_FIELDNAMES) -> None:
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(fieldnames)
+
+    def write(self, rows: Iterable[Tuple[str, ...]]) -> None:
+        self._writer.writerows(rows)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class JsonlWriter:
+    def __init__(self, path: str, output_format: str, fieldnames: Sequence[str] = CSV_FIELDNAMES) -> None:
+        self.fieldnames = list(fieldnames)
+        if output_format == "jsonl.zst":
+            zstandard = import_optional("zstandard", output_format)
+            compressed = zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb"))
+            self._file = io.TextIOWrapper(compressed, encoding="utf-8", newline="\n")
+        else:
+            self._file = gzip.open(path, "wt", compresslevel=6, encoding="utf-8", newline="\n")
+
+    def write(self, rows: Iterable[Tuple[str, ...]]) -> None:
+        dumps = json.dumps
+        self._file.writelines(dumps(dict(zip(self.fieldnames, row)), ensure_ascii=False) + "\n" for row in rows)
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    # Rows are buffered and written one row group at a time, so memory stays at one group
+    def __init__(
+        self, path: str, fieldnames: Sequence[str] = CSV_FIELDNAMES, row_group_rows: int = PARQUET_ROW_GROUP_ROWS
+    ) -> None:
+        self._pa = import_optional("pyarrow", "parquet")
+        parquet = import_optional("pyarrow.parquet", "parquet")
+        self._schema = self._pa.schema([(name, self._pa.string()) for name in fieldnames])
+        self._writer = parquet.ParquetWriter(path, self._schema, compression="zstd")
+        self.row_group_rows = row_group_rows
+        self._rows: List[Tuple[str, ...]] = []
+
+    def write(self, rows: Iterable[Tuple[str, ...]]) -> None:
+        for row in rows:
+            self._rows.append(row)
+            if len(self._rows) >= self.row_group_rows:
+                self._write_group()
+
+    def _write_group(self) -> None:
+        columns = [self._pa.array(column, self._pa.string()) for column in zip(*self._rows)]
+        self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+        self._rows = []
+
+    def flush(self) -> None:
+        # Small row groups would hurt compression and scans; groups are only cut when full
+        pass
+
+    def close(self) -> None:
+        if self._rows:
+            self._write_group()
+        self._writer.close()
+
+
+class SqliteWriter:
+    def __init__(self, path: str, fieldnames: Sequence[str] = CSV_FIELDNAMES, batch_rows: int = SQLITE_BATCH_ROWS) -> None:
+        # The output is replaced like a CSV would be, and a crash leaves it incomplete anyway
+        if os.path.exists(path):
+            os.remove(path)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode = OFF")
+        self._conn.execute("PRAGMA synchronous = OFF")
+        columns = ", ".join('"{}" TEXT'.format(name.replace('"', '""')) for name in fieldnames)
+        self._conn.execute(f"CREATE TABLE schools ({columns})")
+        self._insert = f"INSERT INTO schools VALUES ({', '.join('?' for _ in fieldnames)})"
+        self._indexed = "sekolah_id" in fieldnames
+        self.batch_rows = batch_rows
+        self._rows: List[Tuple[str, ...]] = []
+
+    def write(self, rows: Iterable[Tuple[str, ...]]) -> None:
+        for row in rows:
+            self._rows.append(row)
+            if len(self._rows) >= self.batch_rows:
+                self.flush()
+
+    def flush(self) -> None:
+        # One transaction per batch
+        if self._rows:
+            with self._conn:
+                self._conn.executemany(self._insert, self._rows)
+            self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+        # Indexing once after the bulk load is cheaper than maintaining it per insert
+        if self._indexed:
+            with self._conn:
+                self._conn.execute("CREATE INDEX schools_sekolah_id ON schools (sekolah_id)")
+        self._conn.close()
+
+
+def open_writer(path: str, output_format: str = "csv", fieldnames: Sequence[str] = CSV_FIELDNAMES) -> Any:
+    if output_format == "csv":
+        return CsvWriter(path, fieldnames)
+    if output_format in ("jsonl.gz", "jsonl.zst"):
+        return JsonlWriter(path, output_format, fieldnames)
+    if output_format == "parquet":
+        return ParquetWriter(path, fieldnames)
+    if output_format == "sqlite":
+        return SqliteWriter(path, fieldnames)
+    raise ValueError(f"Unknown output format: {output_format}")
+
+
+def check_output_format(output_format: str) -> None:
+    # Fail before scraping, not after, when an optional writer dependency is missing
+    if output_format == "jsonl.zst":
+        import_optional("zstandard", output_format)
+    elif output_format == "parquet":
+        import_optional("pyarrow.parquet", output_format)
+
+
+def write_rows(
+    rows: Iterable[Tuple[str, ...]],
+    output_path: str,
+    output_format: str = "csv",
+    fieldnames: Sequence[str] = CSV_FIELDNAMES,
+) -> None:
+    writer = open_writer(output_path, output_format, fieldnames)
+    try:
+        writer.write(rows)
+    finally:
+        writer.close()
+
+
+def write_output(
+    rows: Iterable[Dict[str, Any]],
+    phones: Dict[str, Optional[str]],
+    output_path: str,
+    output_format: str = "csv",
+) -> None:
+    write_rows((output_row(row, phones.get(row.get("sekolah_id"))) for row in rows), output_path, output_format)
+
+
+def listing_hash(name: str, address: str, city: str, province: str) -> str:
+    return hashlib.sha1("\x1f".join((name, address, city, province)).encode("utf-8")).hexdigest()
+
+
+def item_listing_hash(row: Dict[str, Any]) -> str:
+    return listing_hash(
+        row.get("nama") or "", row.get("alamat_jalan") or "", row.get("kabupaten") or "", row.get("provinsi") or ""
+    )
+
+
+def load_previous_csv(path: str) -> Dict[str, Dict[str, str]]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        if "sekolah_id" not in (reader.fieldnames or []):
+            raise ValueError(f"{path} has no sekolah_id column; it predates delta support, so run a full scrape first")
+        return {row["sekolah_id"]: row for row in reader if row.get("sekolah_id")}
+
+
+def classify_listing(
+    items: List[Dict[str, Any]], previous: Dict[str, Dict[str, str]]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[str]], List[Dict[str, str]]]:
+    # Returns the items that need a detail request, phones carried over from the previous run, and the report rows
+    to_fetch: List[Dict[str, Any]] = []
+    carried: Dict[str, Optional[str]] = {}
+    report: List[Dict[str, str]] = []
+    for row in items:
+        sekolah_id = row.get("sekolah_id")
+        if not sekolah_id:
+            continue
+        old = previous.get(sekolah_id)
+        if old is None:
+            change = "added"
+        elif item_listing_hash(row) != listing_hash(old["school_name"], old["address"], old["city"], old["province"]):
+            change = "changed"
+        else:
+            carried[sekolah_id] = old.get("phone") or None
+            continue
+        to_fetch.append(row)
+        report.append(
+            {
+                "change": change,
+                "sekolah_id": sekolah_id,
+                "school_name": row.get("nama") or "",
+                "city": row.get("kabupaten") or "",
+                "province": row.get("provinsi") or "",
+            }
+        )
+    return to_fetch, carried, report
+
+
+def removed_schools(previous: Dict[str, Dict[str, str]], seen: Iterable[str]) -> List[Dict[str, str]]:
+    seen_ids = set(seen)
+    return [
+        {
+            "change": "removed",
+            "sekolah_id": sekolah_id,
+            "school_name": old["school_name"],
+            "city": old["city"],
+            "province": old["province"],
+        }
+        for sekolah_id, old in previous.items()
+        if sekolah_id not in seen_ids
+    ]
+
+
+def diff_listing(
+    items: List[Dict[str, Any]], previous: Dict[str, Dict[str, str]]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[str]], List[Dict[str, str]]]:
+    to_fetch, carried, report = classify_listing(items, previous)
+    report.extend(removed_schools(previous, (row.get("sekolah_id") for row in items)))
+    return to_fetch, carried, report
+
+
+def print_delta_summary(report: List[Dict[str, str]], unchanged: int, since: str) -> None:
+    counts = {"added": 0, "changed": 0, "removed": 0}
+    for entry in report:
+        counts[entry["change"]] += 1
+    print(
+        f"Compared with {since}: {counts['added']} added, {counts['changed']} changed, "
+        f"{counts['removed']} removed, {unchanged} unchanged.",
+        file=sys.stderr,
+    )
+
+
+def delta_report_path(output_path: str) -> str:
+    base, _ = split_output_suffix(output_path)
+    return str(base.with_name(f"{base.name}.delta.csv"))
+
+
+def write_delta_report(report: List[Dict[str, str]], output_path: str) -> None:
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["change", "sekolah_id", "school_name", "city", "province"])
+        writer.writeheader()
+        writer.writerows(report)
+
+
+def parse_duration(text: str) -> float:
+    # "5400", "90m", "1h30m" or "45s" -> seconds
+    value = text.strip().lower()
+    if re.fullmatch(r"\d+(\.\d+)?", value):
+        return float(value)
+    match = re.fullmatch(r"(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s)?", value)
+    if not value or not match:
+        raise ValueError(f"invalid duration: {text!r} (use seconds or e.g. 90m, 1h30m)")
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600.0 + minutes * 60.0 + seconds
+
+
+def parse_deadline(text: str, now: datetime) -> datetime:
+    # "HH:MM[:SS]" is the next time the clock shows it; anything else is an ISO date and time in local time
+    value = text.strip()
+    for fmt in ("%H:%M", "%H:%M:%S"):
+        try:
+            clock = datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+        target = datetime.combine(now.date(), clock)
+        return target if target > now else datetime.combine(now.date() + timedelta(days=1), clock)
+    try:
+        target = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid deadline: {text!r} (use HH:MM or YYYY-MM-DDTHH:MM)") from None
+    if target.tzinfo is not None:
+        target = target.astimezone().replace(tzinfo=None)
+    if target <= now:
+        raise ValueError(f"deadline {text!r} has already passed")
+    return target
+
+
+def detail_deadline(deadline: Optional[str], time_budget: Optional[str]) -> Optional[float]:
+    # time.monotonic() value at which the detail phase stops, leaving a reserve to write the output
+    budgets: List[float] = []
+    if time_budget:
+        budgets.append(parse_duration(time_budget))
+    if deadline:
+        now = datetime.now()
+        budgets.append((parse_deadline(deadline, now) - now).total_seconds())
+    if not budgets:
+        return None
+    budget = min(budgets)
+    if budget <= 0:
+        raise ValueError("the time budget must be positive")
+    reserve = max(DEADLINE_RESERVE_MIN, budget * DEADLINE_RESERVE_SHARE)
+    print(
+        f"Time budget {format_duration(budget)}: detail lookups stop after {format_duration(max(0.0, budget - reserve))}.",
+        file=sys.stderr,
+    )
+    return time.monotonic() + budget - reserve
+
+
+def prioritise_details(items: List[Dict[str, Any]], regions: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    # Order of detail lookups under a deadline: schools the cache already answers (no request needed), then
+    # the priority regions (Kabupaten/Kota or province) in the order given, then the rest in listing order
+    cached = DETAIL_CACHE.fresh_ids() if DETAIL_CACHE is not None else set()
+    rank = {name.strip().lower(): position for position, name in enumerate(regions)}
+
+    def priority(row: Dict[str, Any]) -> int:
+        if row.get("sekolah_id") in cached:
+            return -1
+        return min(
+            rank.get((row.get("kabupaten") or "").lower(), len(rank)),
+            rank.get((row.get("provinsi") or "").lower(), len(rank)),
+        )
+
+    return sorted(items, key=priority)
+
+
+def skipped_report_path(output_path: str) -> str:
+    base, _ = split_output_suffix(output_path)
+    return str(base.with_name(f"{base.name}.skipped.csv"))
+
+
+def write_skipped_report(rows: List[Dict[str, Any]], output_path: str) -> None:
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sekolah_id", "school_name", "city", "province"])
+        writer.writerows(
+            (row.get("sekolah_id") or "", row.get("nama") or "", row.get("kabupaten") or "", row.get("provinsi") or "")
+            for row in rows
+        )
+
+
+def stream_scrape(
+    output_path: str,
+    page_size: int,
+    max_pages: Optional[int],
+    metadata_workers: int,
+    detail_workers: int,
+    skip_phone: bool,
+    kabupaten_kota: str = "",
+    listing_controller: Optional[AdaptiveConcurrency] = None,
+    detail_controller: Optional[AdaptiveConcurrency] = None,
+    journal: Optional[ScrapeJournal] = None,
+    previous: Optional[Dict[str, Dict[str, str]]] = None,
+    window: int = STREAM_WINDOW_PAGES,
+    tune_latency_target: Optional[float] = None,
+    output_format: str = "csv",
+) -> Tuple[int, int, bool, List[Dict[str, str]]]:
+    # Listing pages feed detail lookups as soon as they land; finished pages are written in page order.
+    # At most `window` pages are fetched-but-unwritten at any time, so memory does not grow with the country.
+    # Returns (rows written, reported total, whether nothing was lost, delta report rows).
+    first: Optional[Dict[str, Any]] = None
+    if page_size <= 0 and journal is not None and journal.page_size:
+        page_size = journal.page_size
+    elif page_size <= 0 and tune_latency_target is not None:
+        page_size, _, first = tune_page_size(metadata_workers, kabupaten_kota, tune_latency_target)
+    elif page_size <= 0:
+        page_size = STREAM_PAGE_SIZE
+    print(f"Streaming with page size {page_size}.", file=sys.stderr)
+    resumed = journal.resumed_pages(page_size) if journal is not None else {}
+    preloaded_total = journal.total if resumed else 0
+    # Preloaded pages that are not in the journal yet; pages replayed from it are not appended again
+    unjournaled: set = set()
+    if first is not None and 0 not in resumed:
+        # The probe already returned page 0 at the chosen size
+        resumed[0] = list(first.get("data") or [])
+        preloaded_total = int(first.get("total", len(resumed[0])))
+        unjournaled.add(0)
+    # Both schedulers report (key, result, error) here; keys are ("page", page) or ("phone", page, sekolah_id)
+    events: "queue.Queue[Tuple[Any, Any, Optional[BaseException]]]" = queue.Queue()
+    listing = RetryScheduler(
+        "cari-sekolah",
+        listing_controller.maximum if listing_controller else metadata_workers,
+        listing_controller,
+        describe=lambda key: f"page {key[1]}",
+        results=events,
+    )
+    details = RetryScheduler(
+        "full-detail",
+        detail_controller.maximum if detail_controller else detail_workers,
+        detail_controller,
+        describe=lambda key: key[2],
+        results=events,
+    )
+
+    def fetch_span_page(page: int) -> Dict[str, Any]:
+        # Only page 0's total is read; a one-row count request supplies it so page 0 can be split too
+        total = count_listing(kabupaten_kota, retry=False) if page == 0 else 0
+        return {"total": total, "data": fetch_span(page, page_size, kabupaten_kota)}
+
+    def submit_page(page: int) -> None:
+        if page in resumed:
+            events.put((("resumed", page), {"total": preloaded_total, "data": resumed.pop(page)}, None))
+            return
+        if tune_latency_target is not None:
+            listing.submit(("page", page), fetch_span_page, page)
+            return
+        listing.submit(("page", page), fetch_page, page, page_size, kabupaten_kota, 1)
+
+    total = 0
+    total_pages: Optional[int] = None
+    complete = True
+    delta_report: List[Dict[str, str]] = []
+    seen: List[str] = []
+    page_rows: Dict[int, List[Dict[str, Any]]] = {}
+    page_phones: Dict[int, Dict[str, Optional[str]]] = {}
+    waiting: Dict[int, int] = {}
+    next_submit = 1
+    next_write = 0
+    written = 0
+    started = time.monotonic()
+    meter: Optional[ProgressMeter] = None
+
+    def start_details(page: int, items: List[Dict[str, Any]]) -> None:
+        ids = [row.get("sekolah_id") for row in items if row.get("sekolah_id")]
+        phones: Dict[str, Optional[str]] = {}
+        if previous is not None:
+            seen.extend(ids)
+            to_fetch, phones, report = classify_listing(items, previous)
+            delta_report.extend(report)
+            ids = [row.get("sekolah_id") for row in to_fetch]
+        if skip_phone:
+            ids = []
+        if journal is not None:
+            phones.update({sekolah_id: journal.phones[sekolah_id] for sekolah_id in ids if sekolah_id in journal.phones})
+            ids = [sekolah_id for sekolah_id in ids if sekolah_id not in journal.phones]
+        page_rows[page] = items
+        page_phones[page] = phones
+        waiting[page] = len(ids)
+        for sekolah_id in ids:
+            details.submit(("phone", page, sekolah_id), lookup_phone, sekolah_id, 1)
+
+    submit_page(0)
+    try:
+        with listing, details, closing(open_writer(output_path, output_format)) as writer:
+            while total_pages is None or next_write < total_pages:
+                key, result, error = events.get()
+                kind, page = key[0], key[1]
+                if kind != "phone":
+                    # The scheduler has already retried a page that comes back with an error
+                    if error is not None:
+                        if page == 0:
+                            raise error
+                        with print_lock:
+                            print(f"\nPermanent failure for page {page}: {error}", file=sys.stderr)
+                        complete = False
+                        result = {}
                     items = list(result.get("data") or [])
-                    pages_data[page] = items
-                    break
-                except BaseException as exc:
-                    if attempt >= 3:
-                        print(f"Permanent failure for page {page}: {exc}", file=sys.stderr)
+                    if page == 0:
+                        total = int(result.get("total", len(items)))
+                        total_pages = int(math.ceil(total / float(page_size))) if total > 0 else 0
+                        if max_pages is not None and max_pages > 0:
+                            total_pages = min(total_pages, max_pages)
+                        print(f"Total pages to fetch: {total_pages}", file=sys.stderr)
+                        meter = ProgressMeter("Pages written", total_pages)
+                    if (kind == "page" or page in unjournaled) and journal is not None and items:
+                        journal.record_page(page_size, page, total, items)
+                    start_details(page, items)
+                else:
+                    sekolah_id = key[2]
+                    if error is not None:
+                        with print_lock:
+                            print(f"\nFailed to get phone for {sekolah_id}: {error}", file=sys.stderr)
+                        phone = None
                     else:
-                        time.sleep(attempt)
-    all_items: List[Dict[str, Any]] = []
-    for page in sorted(pages_data.keys()):
-        all_items.extend(pages_data[page])
-    return all_items, total
+                        phone = result
+                        if journal is not None:
+                            journal.record_phone(sekolah_id, phone)
+                    page_phones[page][sekolah_id] = phone
+                    waiting[page] -= 1
+
+                # Write every finished page at the head of the queue, then refill the listing window
+                while next_write in waiting and waiting[next_write] == 0:
+                    rows = page_rows.pop(next_write)
+                    phones = page_phones.pop(next_write)
+                    writer.write(output_row(row, phones.get(row.get("sekolah_id"))) for row in rows)
+                    writer.flush()
+                    if rows and not written:
+                        with print_lock:
+                            print(f"\nFirst rows written after {time.monotonic() - started:.1f}s.", file=sys.stderr)
+                    written += len(rows)
+                    del waiting[next_write]
+                    next_write += 1
+                while total_pages is not None and next_submit < min(total_pages, next_write + window):
+                    submit_page(next_submit)
+                    next_submit += 1
+                if total_pages and meter is not None:
+                    meter.update(next_write, f", rows written: {written}")
+    finally:
+        # Clear progress line
+        print(file=sys.stderr)
+    if previous is not None:
+        delta_report.extend(removed_schools(previous, seen))
+    return written, total, complete, delta_report
+
+
+def run_scrape(
+    output_path: str,
+    page_size: int,
+    max_pages: Optional[int],
+    metadata_workers: int,
+    detail_workers: int,
+    skip_phone: bool,
+    kabupaten_kota: str = "",
+    engine: str = "thread",
+    concurrency: int = ASYNC_CONCURRENCY_DEFAULT,
+    adaptive: bool = False,
+    max_metadata_workers: int = ADAPTIVE_METADATA_WORKERS_MAX,
+    max_detail_workers: int = ADAPTIVE_DETAIL_WORKERS_MAX,
+    latency_target: Optional[float] = None,
+    journal_path: Optional[str] = None,
+    resume: bool = False,
+    cache_dir: Optional[str] = None,
+    cache_ttl_days: float = DEFAULT_CACHE_TTL_DAYS,
+    cache_max_mb: int = DEFAULT_CACHE_MAX_MB,
+    since: Optional[str] = None,
+    stream: bool = False,
+    tune_latency_target: Optional[float] = None,
+    regions: Optional[List[str]] = None,
+    per_region_output: bool = False,
+    output_format: str = "csv",
+    partition: bool = False,
+    deadline: Optional[float] = None,
+    priority_regions: Sequence[str] = (),
+    hedge_percentile: Optional[float] = None,
+    hedge_max_share: float = HEDGE_MAX_SHARE,
+) -> None:
+    previous: Optional[Dict[str, Dict[str, str]]] = None
+    if since:
+        try:
+            previous = load_previous_csv(since)
+        except (OSError, ValueError) as exc:
+            print(f"Failed to read previous output: {exc}", file=sys.stderr)
+            sys.exit(1)
+    global DETAIL_CACHE
+    if cache_dir and not skip_phone:
+        DETAIL_CACHE = DetailCache(Path(cache_dir), cache_ttl_days * 86400, cache_max_mb * 1024 * 1024)
+    journal: Optional[ScrapeJournal] = None
+    if journal_path:
+        # A batch journal only records phones; its listing is cheap to redo across regions
+        job: Dict[str, Any] = {"regions": regions} if regions else {"kabupaten_kota": kabupaten_kota}
+        job["bentuk_pendidikan"] = ALLOWED_BENTUK_PENDIDIKAN
+        journal = ScrapeJournal(Path(journal_path), job, resume=resume)
+    complete = True
+    region_items: Dict[str, List[Dict[str, Any]]] = {}
+    listing_controller: Optional[AdaptiveConcurrency] = None
+    detail_controller: Optional[AdaptiveConcurrency] = None
+    if adaptive and engine == "thread":
+        listing_controller = AdaptiveConcurrency(
+            "cari-sekolah", metadata_workers, max_metadata_workers, latency_target=latency_target
+        )
+        detail_controller = AdaptiveConcurrency(
+            "full-detail", detail_workers, max_detail_workers, latency_target=latency_target
+        )
+        REQUEST_OBSERVERS.extend([listing_controller.observe, detail_controller.observe])
+    hedge: Optional[HedgePolicy] = None
+    if hedge_percentile is not None and engine == "thread" and not skip_phone:
+        hedge = HedgePolicy("full-detail", hedge_percentile, hedge_max_share)
+        REQUEST_OBSERVERS.append(hedge.observe)
+    # The async engine drives both phases from one event loop so connections are reused across them
+    loop = asyncio.new_event_loop() if engine == "async" else None
+    client = AsyncHTTPClient() if loop is not None else None
+    try:
+        if stream:
+            begin_phase("stream")
+            try:
+                written, total, complete, delta_report = stream_scrape(
+                    output_path,
+                    page_size=page_size,
+                    max_pages=max_pages,
+                    metadata_workers=max(1, metadata_workers),
+                    detail_workers=max(1, detail_workers),
+                    skip_phone=skip_phone,
+                    kabupaten_kota=kabupaten_kota,
+                    listing_controller=listing_controller,
+                    detail_controller=detail_controller,
+                    journal=journal,
+                    previous=previous,
+                    tune_latency_target=tune_latency_target,
+                    output_format=output_format,
+                )
+            except BaseException as exc:
+                print(f"Failed to scrape schools: {exc}", file=sys.stderr)
+                if journal is not None:
+                    journal.close()
+                sys.exit(1)
+            if not written:
+                print("No school data returned from API.", file=sys.stderr)
+                sys.exit(1)
+            print(f"Streamed {written} schools (reported total {total}).", file=sys.stderr)
+            if previous is not None:
+                print_delta_summary(delta_report, written - sum(1 for r in delta_report if r["change"] != "removed"), since)
+        else:
+            begin_phase("listing")
+            try:
+                if loop is not None:
+                    items, total = loop.run_until_complete(
+                        collect_pages_async(
+                            client,
+                            page_size=page_size,
+                            max_pages=max_pages,
+                            workers=max(1, metadata_workers),
+                            kabupaten_kota=kabupaten_kota,
+                            journal=journal,
+                        )
+                    )
+                elif regions or partition:
+                    listed = regions or [kabupaten_kota]
+                    region_items, region_totals, complete = (collect_partitions if partition else collect_regions)(
+                        listed,
+                        page_size=page_size,
+                        max_pages=max_pages,
+                        workers=max(1, metadata_workers),
+                        controller=listing_controller,
+                    )
+                    total = sum(region_totals.values())
+                    items, duplicates = dedupe_schools(region_items[kab] for kab in listed if kab in region_items)
+                    if duplicates:
+                        print(f"Dropped {duplicates} schools listed under more than one region.", file=sys.stderr)
+                else:
+                    items, total = collect_pages(
+                        page_size=page_size,
+                        max_pages=max_pages,
+                        workers=max(1, metadata_workers),
+                        kabupaten_kota=kabupaten_kota,
+                        controller=listing_controller,
+                        journal=journal,
+                        tune_latency_target=tune_latency_target,
+                    )
+            except BaseException as exc:
+                print(f"Failed to list schools: {exc}", file=sys.stderr)
+                if journal is not None:
+                    journal.close()
+                sys.exit(1)
+            if not items:
+                print("No school data returned from API.", file=sys.stderr)
+                sys.exit(1)
+            print(f"Fetched metadata for {len(items)} schools (reported total {total}).", file=sys.stderr)
+            phones: Dict[str, Optional[str]] = {}
+            to_fetch = items
+            delta_report: List[Dict[str, str]] = []
+            if previous is not None:
+                # Only new or changed schools need a detail request; the rest keep last run's phone
+                to_fetch, phones, delta_report = diff_listing(items, previous)
+                print_delta_summary(delta_report, len(phones), since)
+            skipped: List[Dict[str, Any]] = []
+            if not skip_phone:
+                begin_phase("details")
+                if deadline is not None:
+                    to_fetch = prioritise_details(to_fetch, priority_regions)
+                try:
+                    if loop is not None:
+                        fetched = loop.run_until_complete(
+                            enrich_with_phones_async(
+                                client, to_fetch, concurrency=max(1, concurrency), journal=journal, deadline=deadline
+                            )
+                        )
+                    else:
+                        fetched = enrich_with_phones(
+                            to_fetch,
+                            workers=max(1, detail_workers),
+                            controller=detail_controller,
+                            journal=journal,
+                            deadline=deadline,
+                            hedge=hedge,
+                        )
+                    phones.update(fetched)
+                except BaseException as exc:
+                    print(f"Failed while fetching phone numbers: {exc}", file=sys.stderr)
+                    complete = False
+                if deadline is not None:
+                    skipped = [row for row in to_fetch if row.get("sekolah_id") and row.get("sekolah_id") not in phones]
+                    if skipped:
+                        # The journal keeps the phones found so far, so --resume can pick up the rest
+                        complete = False
+                        looked_up = len(to_fetch) - len(skipped)
+                        print(
+                            f"Looked up {looked_up} of {len(to_fetch)} schools"
+                            f" ({looked_up / len(to_fetch) * 100:.1f}%) within the time budget.",
+                            file=sys.stderr,
+                        )
+    finally:
+        for controller in (listing_controller, detail_controller):
+            if controller is not None:
+                REQUEST_OBSERVERS.remove(controller.observe)
+        if hedge is not None:
+            REQUEST_OBSERVERS.remove(hedge.observe)
+        stats = client.stats() if client is not None else CONNECTION_POOL.stats()
+        print(
+            f"Connections opened: {stats['connections_opened']}, requests served: {stats['requests_served']}"
+            f" (reconnects: {stats['reconnects']}).",
+            file=sys.stderr,
+        )
+        if loop is not None:
+            loop.run_until_complete(client.close())
+            loop.close()
+        else:
+            CONNECTION_POOL.close()
+        if DETAIL_CACHE is not None:
+            DETAIL_CACHE.close()
+            DETAIL_CACHE = None
+        begin_phase(None)
+    if not stream:
+        begin_phase("write")
+        try:
+            write_output(items, phones, output_path, output_format)
+            if per_region_output:
+                for kab, rows in region_items.items():
+                    write_output(rows, phones, region_output_path(output_path, kab), output_format)
+        except BaseException as exc:
+            print(f"Failed to write output: {exc}", file=sys.stderr)
+            if journal is not None:
+                journal.close()
+            sys.exit(1)
+    begin_phase(None)
+    print(f"Wrote {output_format.upper()} to {output_path}", file=sys.stderr)
+    if per_region_output and region_items:
+        print(f"Wrote {len(region_items)} per-region files next to it.", file=sys.stderr)
+    if previous is not None:
+        report_path = delta_report_path(output_path)
+        try:
+            write_delta_report(delta_report, report_path)
+            print(f"Wrote change report to {report_path}", file=sys.stderr)
+        except OSError as exc:
+            print(f"Failed to write change report: {exc}", file=sys.stderr)
+    if not stream and skipped:
+        report_path = skipped_report_path(output_path)
+        try:
+            write_skipped_report(skipped, report_path)
+            print(f"Wrote {len(skipped)} schools without a detail lookup to {report_path}", file=sys.stderr)
+        except OSError as exc:
+            print(f"Failed to write skipped report: {exc}", file=sys.stderr)
+    if journal is not None:
+        # A finished run no longer needs its journal; an interrupted one keeps it for --resume
+        journal.close(remove=complete)
+        if not complete:
+            print(f"Journal kept at {journal.path}; re-run with --resume to finish.", file=sys.stderr)
+
+
+# Output columns `export` knows by name, as (source, field); other names are looked up as raw fields
+EXPORT_COLUMNS: Dict[str, Tuple[str, str]] = {
+    "school_name": ("listing", "nama"),
+    "address": ("listing", "alamat_jalan"),
+    "city": ("listing", "kabupaten"),
+    "province": ("listing", "provinsi"),
+    "phone": ("detail", "nomor_telepon"),
+    "sekolah_id": ("listing", "sekolah_id"),
+}
+
+
+def export_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return str(value)
+
+
+def lookup_field(record: Any, path: str) -> Any:
+    # Dotted path through nested objects and list indexes, e.g. "akreditasi.0.nilai"
+    for part in path.split("."):
+        if isinstance(record, dict):
+            record = record.get(part)
+        elif isinstance(record, list) and part.isdigit() and int(part) < len(record):
+            record = record[int(part)]
+        else:
+            return None
+    return record
+
+
+def parse_export_columns(spec: str) -> List[Tuple[str, str, str]]:
+    # "name" or "name=source" entries, where source is a known column, listing.FIELD, detail.FIELD or a raw
+    # field looked up in the listing item first and the detail record second. Returns (name, source, path).
+    columns: List[Tuple[str, str, str]] = []
+    for entry in spec.split(","):
+        name, _, source = (part.strip() for part in entry.partition("="))
+        if not name:
+            continue
+        source = source or name
+        if source in EXPORT_COLUMNS:
+            columns.append((name,) + EXPORT_COLUMNS[source])
+        elif source.startswith(("listing.", "detail.")):
+            table, _, path = source.partition(".")
+            columns.append((name, table, path))
+        else:
+            columns.append((name, "any", source))
+    if not columns:
+        raise ValueError("no columns given")
+    return columns
+
+
+def export_rows(
+    archive: ResponseArchive, columns: List[Tuple[str, str, str]], regions: Iterable[str] = ()
+) -> Iterator[Tuple[str, ...]]:
+    wanted = set(regions)
+    for item, data in archive.latest(with_detail=any(source != "listing" for _, source, _ in columns)):
+        if wanted and item.get("kabupaten") not in wanted:
+            continue
+        record = detail_record(data)
+        row: List[str] = []
+        for _, source, path in columns:
+            if source == "detail" and path == "nomor_telepon":
+                # Same cleanup as a scrape applies
+                row.append(parse_phone(data) or "" if data is not None else "")
+                continue
+            value = lookup_field(item, path) if source != "detail" else None
+            if value is None and source != "listing":
+                value = lookup_field(record, path)
+            row.append(export_value(value))
+        yield tuple(row)
+
+
+def archive_fields(archive: ResponseArchive, sample: int = 500) -> Tuple[List[str], List[str]]:
+    # Top-level field names seen in the first `sample` listing items and detail records
+    listing: Dict[str, None] = {}
+    detail: Dict[str, None] = {}
+    for count, (item, data) in enumerate(archive.latest()):
+        if count >= sample:
+            break
+        listing.update(dict.fromkeys(item))
+        detail.update(dict.fromkeys(detail_record(data)))
+    return sorted(listing), sorted(detail)
+
+
+def default_archive_path(cache_dir: Optional[str]) -> Path:
+    return Path(cache_dir or default_cache_dir()) / "archive.sqlite3"
+
+
+def parse_export_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="scrape_sekolah_kita.py export",
+        description="Rebuild output from an archive written with --archive, without any network requests.",
+    )
+    parser.add_argument(
+        "archive",
+        nargs="?",
+        default=None,
+        help="Archive file (default: archive.sqlite3 in the cache directory).",
+    )
+    parser.add_argument("--cache-dir", default=None, help="Cache directory holding the default archive.")
+    parser.add_argument("--output", "-o", default=None, help="Output file path. If omitted, a timestamped name is used.")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default="csv", help="Output format (default csv).")
+    parser.add_argument(
+        "--columns",
+        default=",".join(CSV_FIELDNAMES),
+        help="Comma-separated columns: known names (" + ", ".join(EXPORT_COLUMNS) + "), raw field names such as npsn,"
+        " or NAME=listing.FIELD / NAME=detail.FIELD (dotted paths reach nested values). Default: the scraper's columns.",
+    )
+    parser.add_argument(
+        "--kabupaten-kota",
+        action="append",
+        default=[],
+        help="Only export schools in this Kabupaten/Kota (repeatable).",
+    )
+    parser.add_argument("--list-fields", action="store_true", help="List raw listing and detail fields in the archive.")
+    return parser.parse_args(argv)
+
+
+def run_export(args: argparse.Namespace) -> None:
+    path = Path(args.archive) if args.archive else default_archive_path(args.cache_dir)
+    if not path.exists():
+        print(f"Archive not found: {path}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        columns = parse_export_columns(args.columns)
+        check_output_format(args.format)
+    except (ValueError, RuntimeError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(2)
+    archive = ResponseArchive(path)
+    try:
+        if args.list_fields:
+            listing, detail = archive_fields(archive)
+            print("Listing fields: " + ", ".join(listing))
+            print("Detail fields:  " + ", ".join(detail))
+            return
+        name = args.kabupaten_kota[0] if len(args.kabupaten_kota) == 1 else ""
+        output_path = args.output or str(build_timestamped_output(Path.cwd(), kabupaten_kota=name, output_format=args.format))
+        started = time.monotonic()
+        count = 0
+
+        def counted(rows: Iterator[Tuple[str, ...]]) -> Iterator[Tuple[str, ...]]:
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        write_rows(
+            counted(export_rows(archive, columns, args.kabupaten_kota)),
+            output_path,
+            args.format,
+            [name for name, _, _ in columns],
+        )
+    finally:
+        archive.close()
+    print(f"Exported {count} schools to {output_path} in {time.monotonic() - started:.1f}s.", file=sys.stderr)
+
+
+# Columns `serve` loads from an archive: the scraper's columns plus the listing fields worth filtering on
+SERVE_ARCHIVE_COLUMNS = ",".join(CSV_FIELDNAMES + ["npsn", "bentuk_pendidikan", "status_sekolah", "kecamatan"])
+# Scrape outputs `serve` picks from a directory; per-region and delta files have a suffix after the timestamp
+DATASET_NAME = re.compile(
+    r"^sekolah_kita(_[a-z0-9_]+)?_\d{8}_\d{6}(" + "|".join(re.escape(suffix) for suffix in OUTPUT_FORMATS.values()) + ")$"
+)
+NAME_TOKEN = re.compile(r"\w+")
+
+
+def index_key(value: str) -> str:
+    return " ".join(value.casefold().split())
+
+
+def read_dataset(path: Path) -> Tuple[List[str], List[Tuple[str, ...]]]:
+    # (fieldnames, rows) of a scrape output in any --format, or of an --archive file
+    if path.name.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            return next(reader, []), [tuple(row) for row in reader]
+    if path.name.endswith((".jsonl.gz", ".jsonl.zst")):
+        if path.name.endswith(".zst"):
+            zstandard = import_optional("zstandard", "jsonl.zst")
+            f = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+        else:
+            f = gzip.open(path, "rt", encoding="utf-8")
+        with f:
+            records = [json.loads(line) for line in f if line.strip()]
+        fieldnames = list(records[0]) if records else list(CSV_FIELDNAMES)
+        return fieldnames, [tuple(export_value(record.get(name)) for name in fieldnames) for record in records]
+    if path.name.endswith(".parquet"):
+        table = import_optional("pyarrow.parquet", "parquet").read_table(str(path))
+        columns = table.to_pydict()
+        return table.column_names, [
+            tuple(export_value(value) for value in row) for row in zip(*(columns[name] for name in table.column_names))
+        ]
+    # SQLite: a --format sqlite output has a schools table, an archive has listing and detail tables
+    with closing(sqlite3.connect(path.resolve().as_uri() + "?mode=ro", uri=True)) as conn:
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "schools" in tables:
+            cursor = conn.execute("SELECT * FROM schools")
+            return [column[0] for column in cursor.description], [
+                tuple(export_value(value) for value in row) for row in cursor
+            ]
+    if "listing" not in tables:
+        raise ValueError(f"{path} is neither a scrape output nor an archive")
+    archive = ResponseArchive(path)
+    try:
+        columns = parse_export_columns(SERVE_ARCHIVE_COLUMNS)
+        return [name for name, _, _ in columns], list(export_rows(archive, columns))
+    finally:
+        archive.close()
+
+
+def resolve_dataset(source: Path) -> Path:
+    # A file is used as is; in a directory, the newest scrape output
+    if not source.is_dir():
+        return source
+    candidates = [path for path in source.iterdir() if DATASET_NAME.match(path.name)]
+    if not candidates:
+        raise FileNotFoundError(f"no sekolah_kita_*{OUTPUT_FORMATS['csv']} outputs in {source}")
+    return max(candidates, key=lambda path: path.stat().st_mtime)
+
+
+def dataset_signature(path: Path) -> Tuple[Any, ...]:
+    # Changes whenever the file is rewritten; an archive's recent writes live in its WAL file
+    stat = path.stat()
+    wal = Path(str(path) + "-wal")
+    return (str(path), stat.st_mtime_ns, stat.st_size, wal.stat().st_size if wal.exists() else 0)
+
+
+class SchoolIndex:
+    # Immutable once built: the server swaps in a whole new index instead of updating this one
+    def __init__(self, fieldnames: List[str], rows: List[Tuple[str, ...]], source: Path) -> None:
+        self.fieldnames = fieldnames
+        self.rows = rows
+        self.source = source
+        self.loaded_at = time.time()
+        column = {name: position for position, name in enumerate(fieldnames)}
+        id_column, name_column = column.get("sekolah_id"), column.get("school_name")
+        city_column, province_column = column.get("city"), column.get("province")
+        self.by_id: Dict[str, int] = {}
+        self.by_city: Dict[str, List[int]] = {}
+        self.by_province: Dict[str, List[int]] = {}
+        self.by_token: Dict[str, List[int]] = {}
+        self.regions: Dict[str, Tuple[str, str]] = {}
+        for position, row in enumerate(rows):
+            if id_column is not None and row[id_column]:
+                self.by_id[row[id_column]] = position
+            if city_column is not None:
+                key = index_key(row[city_column])
+                self.by_city.setdefault(key, []).append(position)
+                if key not in self.regions:
+                    self.regions[key] = (row[city_column], row[province_column] if province_column is not None else "")
+            if province_column is not None:
+                self.by_province.setdefault(index_key(row[province_column]), []).append(position)
+            if name_column is not None:
+                for token in set(NAME_TOKEN.findall(row[name_column].casefold())):
+                    self.by_token.setdefault(token, []).append(position)
+        # Sorted vocabulary for prefix search on the last word of a name query
+        self.vocabulary = sorted(self.by_token)
+        self.name_column = name_column
+
+    @classmethod
+    def load(cls, path: Path) -> "SchoolIndex":
+        fieldnames, rows = read_dataset(path)
+        return cls(fieldnames, rows, path)
+
+    def record(self, position: int) -> Dict[str, str]:
+        return dict(zip(self.fieldnames, self.rows[position]))
+
+    def get(self, sekolah_id: str) -> Optional[Dict[str, str]]:
+        position = self.by_id.get(sekolah_id)
+        return None if position is None else self.record(position)
+
+    def _prefixed(self, prefix: str) -> List[str]:
+        start = bisect_left(self.vocabulary, prefix)
+        end = start
+        while end < len(self.vocabulary) and self.vocabulary[end].startswith(prefix):
+            end += 1
+        return self.vocabulary[start:end]
+
+    def query(self, kabupaten: Optional[str] = None, provinsi: Optional[str] = None, q: Optional[str] = None) -> Sequence[int]:
+        # Row positions matching every filter, in dataset order. Name words must match whole tokens,
+        # except the last one, which also matches as a prefix (from two characters) for search-as-you-type.
+        postings: List[Sequence[int]] = []
+        if kabupaten is not None:
+            postings.append(self.by_city.get(index_key(kabupaten), ()))
+        if provinsi is not None:
+            postings.append(self.by_province.get(index_key(provinsi), ()))
+        words = NAME_TOKEN.findall(q.casefold()) if q else []
+        prefix = words.pop() if words and len(words[-1]) >= 2 else None
+        postings.extend(self.by_token.get(word, ()) for word in words)
+        if prefix is not None:
+            terms = self._prefixed(prefix)
+            # The union of the prefix's posting lists joins the intersection when it is the narrowest filter;
+            # otherwise the rows left over are checked against the prefix at the end
+            if not postings or sum(len(self.by_token[term]) for term in terms) <= min(map(len, postings)):
+                postings.append(
+                    self.by_token[terms[0]]
+                    if len(terms) == 1
+                    else sorted(set().union(*(self.by_token[term] for term in terms)))
+                )
+                prefix = None
+        if not postings:
+            return range(len(self.rows))
+        if len(postings) == 1 and prefix is None:
+            return postings[0]
+        # Walk the shortest list and probe the others by binary search, so cost follows the smallest filter
+        postings.sort(key=len)
+        result: List[int] = []
+        for position in postings[0]:
+            for other in postings[1:]:
+                found = bisect_left(other, position)
+                if found == len(other) or other[found] != position:
+                    break
+            else:
+                result.append(position)
+        if prefix is not None and self.name_column is not None:
+            result = [
+                position
+                for position in result
+                if any(token.startswith(prefix) for token in NAME_TOKEN.findall(self.rows[position][self.name_column].casefold()))
+            ]
+        return result
+
+
+class ReadApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], source: Path) -> None:
+        super().__init__(address, ReadApiHandler)
+        self.source = source
+        self.generation = 0
+        self.signature: Optional[Tuple[Any, ...]] = None
+        self.index: Optional[SchoolIndex] = None
+        self._stop = threading.Event()
+
+    def load(self, path: Path, signature: Tuple[Any, ...]) -> None:
+        # Built off to the side and published with a single assignment; requests in flight keep the old index
+        started = time.monotonic()
+        self.signature = signature
+        try:
+            index = SchoolIndex.load(path)
+        except (OSError, ValueError, RuntimeError, sqlite3.Error, csv.Error) as exc:
+            print(f"Failed to load {path}: {exc}; still serving the previous dataset.", file=sys.stderr)
+            return
+        self.index = index
+        self.generation += 1
+        print(
+            f"Loaded {len(index.rows)} schools from {path} in {time.monotonic() - started:.1f}s"
+            f" (generation {self.generation}).",
+            file=sys.stderr,
+        )
+
+    def watch(self, interval: float) -> None:
+        # A changed dataset is loaded once it looks the same on two checks in a row, so a scrape still
+        # writing its output is not picked up half way
+        pending: Optional[Tuple[Any, ...]] = None
+        while not self._stop.wait(interval):
+            try:
+                path = resolve_dataset(self.source)
+                signature = dataset_signature(path)
+            except OSError:
+                continue
+            if signature == self.signature:
+                pending = None
+            elif signature != pending:
+                pending = signature
+            else:
+                self.load(path, signature)
+                pending = None
+
+    def server_close(self) -> None:
+        self._stop.set()
+        super().server_close()
+
+
+class ReadApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: ReadApiServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Any, started: float) -> None:
+        encoded = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.send_header("Server-Timing", f"lookup;dur={(time.perf_counter() - started) * 1000:.3f}")
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    def do_GET(self) -> None:
+        started = time.perf_counter()
+        # One reference per request, so a hot swap never mixes two datasets in a response
+        index = self.server.index
+        url = urllib.parse.urlsplit(self.path)
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        if path == "/status":
+            self._send(
+                200,
+                {
+                    "source": str(index.source) if index else None,
+                    "loaded_at": datetime.fromtimestamp(index.loaded_at, timezone.utc).isoformat() if index else None,
+                    "schools": len(index.rows) if index else 0,
+                    "generation": self.server.generation,
+                },
+                started,
+            )
+            return
+        if index is None:
+            self._send(503, {"message": "No dataset loaded"}, started)
+            return
+        if path.startswith("/schools/"):
+            record = index.get(urllib.parse.unquote(path[len("/schools/") :]))
+            if record is None:
+                self._send(404, {"message": "Not Found"}, started)
+            else:
+                self._send(200, {"data": record}, started)
+            return
+        if path == "/schools":
+            try:
+                limit = min(int(params.get("limit", 100)), SERVE_MAX_LIMIT)
+                offset = int(params.get("offset", 0))
+                if limit < 0 or offset < 0:
+                    raise ValueError
+            except ValueError:
+                self._send(400, {"message": "limit and offset must be non-negative integers"}, started)
+                return
+            matches = index.query(
+                kabupaten=params.get("kabupaten", params.get("kabupaten_kota")),
+                provinsi=params.get("provinsi"),
+                q=params.get("q"),
+            )
+            self._send(
+                200,
+                {
+                    "total": len(matches),
+                    "offset": offset,
+                    "data": [index.record(position) for position in matches[offset : offset + limit]],
+                },
+                started,
+            )
+            return
+        if path == "/regions":
+            provinsi = index_key(params["provinsi"]) if "provinsi" in params else None
+            self._send(
+                200,
+                {
+                    "data": [
+                        {"kabupaten": name, "provinsi": province, "schools": len(index.by_city[key])}
+                        for key, (name, province) in sorted(index.regions.items())
+                        if provinsi is None or index_key(province) == provinsi
+                    ]
+                },
+                started,
+            )
+            return
+        self._send(404, {"message": "Not Found"}, started)
 
 
-def fetch_phone(sekolah_id: str) -> Optional[str]:
-    url = f"{DETAIL_ENDPOINT}/{sekolah_id}"
+def parse_serve_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="scrape_sekolah_kita.py serve",
+        description="Serve school lookups from scraped data over a local HTTP API, without calling the upstream API.",
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default=".",
+        help="Scrape output (any --format), --archive file, or a directory whose newest sekolah_kita_* output is"
+        " served (default: the current directory).",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default 127.0.0.1).")
+    parser.add_argument(
+        "--port", type=int, default=SERVE_PORT_DEFAULT, help=f"Port to listen on (default {SERVE_PORT_DEFAULT})."
+    )
+    parser.add_argument(
+        "--reload-interval",
+        type=float,
+        default=SERVE_RELOAD_INTERVAL,
+        help=f"Seconds between checks for a new or rewritten dataset; 0 disables reloading (default {SERVE_RELOAD_INTERVAL:g}).",
+    )
+    return parser.parse_args(argv)
+
+
+def run_serve(args: argparse.Namespace) -> None:
+    source = Path(args.source)
     try:
-        data = get_json(url)
-    except BaseException as exc:
-        print(f"Failed to fetch detail for {sekolah_id}: {exc}", file=sys.stderr)
-        return None
-    detail = data.get("data") or {}
-    sekolah_list = detail.get("sekolah") if isinstance(detail, dict) else None
-    if not sekolah_list or not isinstance(sekolah_list, list):
-        return None
-    first = sekolah_list[0] or {}
-    phone = first.get("nomor_telepon")
-    if phone is None:
-        return None
-    text = str(phone).strip()
-    return text or None
+        path = resolve_dataset(source)
+        signature = dataset_signature(path)
+    except OSError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    server = ReadApiServer((args.host, args.port), source)
+    server.load(path, signature)
+    if server.index is None:
+        server.server_close()
+        sys.exit(1)
+    if args.reload_interval > 0:
+        threading.Thread(target=server.watch, args=(args.reload_interval,), daemon=True).start()
+    host, port = server.server_address[:2]
+    print(f"Serving on http://{host}:{port} (/schools, /schools/<sekolah_id>, /regions, /status)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
 
 
-def enrich_with_phones(
-    items: Iterable[Dict[str, Any]],
-    workers: int,
-) -> Dict[str, Optional[str]]:
-    ids = [row.get("sekolah_id") for row in items if row.get("sekolah_id")]
-    phones: Dict[str, Optional[str]] = {}
-    if not ids:
-        return phones
-        
-    total_items = len(ids)
-    processed_count = 0
-    print(f"Fetching details for {total_items} schools...", file=sys.stderr)
-    
-    with ThreadPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(fetch_phone, sekolah_id): sekolah_id for sekolah_id in ids}
-        for future in as_completed(futures):
-            processed_count += 1
-            sekolah_id = futures[future]
-            try:
-                phone = future.result()
-            except BaseException as exc:
+# Sharded execution: a coordinator cuts the job into page-range shards and serves them over a
+# multiprocessing manager (TCP) to worker processes on this host or others
+class ShardBoard:
+    # Workers claim shards under a lease and renew it with heartbeats; a shard whose lease runs out
+    # (the worker died or lost the network) goes back to the front of the queue
+    def __init__(self, shards: List[Dict[str, Any]], lease: float = SHARD_LEASE_SECONDS) -> None:
+        self.shards = {shard["id"]: shard for shard in shards}
+        self.lease = lease
+        self.pending: List[int] = [shard["id"] for shard in shards]
+        self.leases: Dict[int, Tuple[str, float]] = {}
+        self.attempts: Dict[int, int] = {}
+        self.results: Dict[int, List[Tuple[str, ...]]] = {}
+        self.failed: Dict[int, str] = {}
+        self.workers: set = set()
+        self._lock = threading.Lock()
+
+    def _reap(self, now: float) -> None:
+        for shard_id, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[shard_id]
+                self.pending.insert(0, shard_id)
                 with print_lock:
-                    print(f"\nFailed to get phone for {sekolah_id}: {exc}", file=sys.stderr)
-                phone = None
-            phones[sekolah_id] = phone
-            
-            # Progress indicator
-            if processed_count % 10 == 0 or processed_count == total_items:
+                    print(f"\nLease on shard {shard_id} held by {worker} expired; reassigning.", file=sys.stderr)
+
+    def claim(self, worker: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        with self._lock:
+            now = time.monotonic()
+            self._reap(now)
+            if worker not in self.workers:
+                self.workers.add(worker)
                 with print_lock:
-                    print(f"Details processed: {processed_count}/{total_items} ({processed_count/total_items*100:.1f}%)", end="\r", file=sys.stderr)
-    
-    # Clear progress line
-    print(file=sys.stderr)
-    
-    return phones
+                    print(f"\nWorker {worker} joined.", file=sys.stderr)
+            if self.pending:
+                shard_id = self.pending.pop(0)
+                self.leases[shard_id] = (worker, now + self.lease)
+                self.attempts[shard_id] = self.attempts.get(shard_id, 0) + 1
+                return "shard", self.shards[shard_id]
+            return ("wait", None) if self.leases else ("done", None)
 
+    def heartbeat(self, worker: str, shard_id: int) -> bool:
+        with self._lock:
+            lease = self.leases.get(shard_id)
+            if lease is None or lease[0] != worker:
+                return False
+            self.leases[shard_id] = (worker, time.monotonic() + self.lease)
+            return True
 
-def write_csv(
-    rows: Iterable[Dict[str, Any]],
-    phones: Dict[str, Optional[str]],
-    output_path: str,
-) -> None:
-    fieldnames = ["school_name", "address", "city", "province", "phone"]
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in rows:
-            sekolah_id = row.get("sekolah_id")
-            writer.writerow(
+    def complete(self, worker: str, shard_id: int, rows: List[Tuple[str, ...]]) -> None:
+        with self._lock:
+            if shard_id in self.results or shard_id in self.failed:
+                return
+            # The first finished copy wins, even from a worker whose lease had already been handed on
+            self.leases.pop(shard_id, None)
+            if shard_id in self.pending:
+                self.pending.remove(shard_id)
+            self.results[shard_id] = rows
+
+    def fail(self, worker: str, shard_id: int, error: str) -> None:
+        with self._lock:
+            lease = self.leases.get(shard_id)
+            if lease is None or lease[0] != worker:
+                return
+            del self.leases[shard_id]
+            with print_lock:
+                if self.attempts[shard_id] >= SHARD_ATTEMPTS:
+                    self.failed[shard_id] = error
+                    print(f"\nPermanent failure for shard {shard_id}: {error}", file=sys.stderr)
+                else:
+                    self.pending.append(shard_id)
+                    print(f"\nShard {shard_id} failed on {worker}: {error}. Requeued.", file=sys.stderr)
+
+    def progress(self) -> Tuple[int, int, bool]:
+        # Returns (shards settled, shards in total, whether nothing is pending or leased)
+        with self._lock:
+            self._reap(time.monotonic())
+            settled = len(self.results) + len(self.failed)
+            return settled, len(self.shards), not self.pending and not self.leases
+
+
+class ShardManager(BaseManager):
+    pass
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def plan_shards(
+    regions: List[str], page_size: int, shard_pages: int, max_pages: Optional[int]
+) -> List[Dict[str, Any]]:
+    # Count each region and cut its page grid into runs of `shard_pages` pages, largest region first
+    totals: Dict[str, int] = {}
+    for kab in regions:
+        totals[kab] = count_listing(kab)
+        if totals[kab] <= 0:
+            print(f"No schools found in {kab or 'any region'}.", file=sys.stderr)
+    size = page_size if page_size > 0 else STREAM_PAGE_SIZE
+    shards: List[Dict[str, Any]] = []
+    for kab in sorted(regions, key=lambda name: -totals[name]):
+        region_pages = int(math.ceil(totals[kab] / float(size)))
+        if max_pages is not None and max_pages > 0:
+            region_pages = min(region_pages, max_pages)
+        for start in range(0, region_pages, shard_pages):
+            shards.append(
                 {
-                    "school_name": row.get("nama") or "",
-                    "address": row.get("alamat_jalan") or "",
-                    "city": row.get("kabupaten") or "",
-                    "province": row.get("provinsi") or "",
-                    "phone": phones.get(sekolah_id) or "",
+                    "id": len(shards),
+                    "kabupaten_kota": kab,
+                    "page_size": size,
+                    "start": start,
+                    "end": min(region_pages, start + shard_pages),
                 }
             )
+    return shards
 
 
-def run_scrape(
+def run_shard(
+    shard: Dict[str, Any], metadata_workers: int, detail_workers: int, skip_phone: bool
+) -> List[Tuple[str, ...]]:
+    kab, size = shard["kabupaten_kota"], shard["page_size"]
+    pages = range(shard["start"], shard["end"])
+    pages_data: Dict[int, List[Dict[str, Any]]] = {}
+    with RetryScheduler("cari-sekolah", metadata_workers, describe=lambda page: f"page {page}") as scheduler:
+        for page in pages:
+            scheduler.submit(page, fetch_page, page, size, kab, 1)
+        for page, result, error in scheduler.as_completed():
+            # A shard is all or nothing; the coordinator hands a failed one out again
+            if error is not None:
+                raise error
+            pages_data[page] = list(result.get("data") or [])
+    items = merge_pages(pages_data)
+    phones = {} if skip_phone else enrich_with_phones(items, workers=detail_workers)
+    return [output_row(row, phones.get(row.get("sekolah_id"))) for row in items]
+
+
+def worker_command(args: argparse.Namespace, address: Tuple[str, int], workers: int) -> List[str]:
+    # Local workers split this host's rate budget between them
+    if getattr(sys, "frozen", False):
+        command = [sys.executable]
+    else:
+        command = [sys.executable, str(Path(__file__).resolve())]
+    command += [
+        "--worker",
+        f"{address[0]}:{address[1]}",
+        "--api-base",
+        API_BASE,
+        "--metadata-workers",
+        str(args.metadata_workers),
+        "--detail-workers",
+        str(args.detail_workers),
+        "--rps",
+        str(args.rps / workers),
+        "--burst",
+        str(max(1, args.burst // workers)),
+        "--cache-ttl",
+        str(args.cache_ttl),
+        "--cache-max-mb",
+        str(args.cache_max_mb),
+        "--breaker-threshold",
+        str(args.breaker_threshold),
+        "--breaker-cooldown",
+        str(args.breaker_cooldown),
+    ]
+    if args.no_rate_limit:
+        command.append("--no-rate-limit")
+    if args.skip_phone:
+        command.append("--skip-phone")
+    if args.no_cache:
+        command.append("--no-cache")
+    elif args.cache_dir:
+        command += ["--cache-dir", args.cache_dir]
+    return command
+
+
+def run_coordinator(
+    args: argparse.Namespace,
     output_path: str,
+    regions: List[str],
     page_size: int,
     max_pages: Optional[int],
-    metadata_workers: int,
-    detail_workers: int,
-    skip_phone: bool,
-    kabupaten_kota: str = "",
 ) -> None:
+    begin_phase("planning")
     try:
-        items, total = collect_pages(
-            page_size=page_size,
-            max_pages=max_pages,
-            workers=max(1, metadata_workers),
-            kabupaten_kota=kabupaten_kota,
-        )
+        shards = plan_shards(regions or [""], page_size, max(1, args.shard_pages), max_pages)
     except BaseException as exc:
-        print(f"Failed to list schools: {exc}", file=sys.stderr)
+        print(f"Failed to count schools: {exc}", file=sys.stderr)
         sys.exit(1)
-    if not items:
+    finally:
+        CONNECTION_POOL.close()
+    if not shards:
         print("No school data returned from API.", file=sys.stderr)
         sys.exit(1)
-    print(f"Fetched metadata for {len(items)} schools (reported total {total}).", file=sys.stderr)
-    phones: Dict[str, Optional[str]] = {}
-    if not skip_phone:
+    board = ShardBoard(shards)
+    ShardManager.register("board", callable=lambda: board)
+    manager = ShardManager(address=parse_address(args.coordinate), authkey=args.authkey.encode("utf-8"))
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.address
+    print(f"Coordinator listening on {host}:{port} with {len(shards)} shards.", file=sys.stderr)
+    # Spawned workers connect over loopback even when the coordinator listens on all interfaces
+    local = ("127.0.0.1" if host in ("", "0.0.0.0") else host, port)
+    env = dict(os.environ, **{AUTHKEY_ENV: args.authkey})
+    procs = [subprocess.Popen(worker_command(args, local, args.spawn_workers), env=env) for _ in range(args.spawn_workers)]
+    if not procs:
+        print(f"Waiting for workers (--worker {host}:{port}).", file=sys.stderr)
+    begin_phase("shards")
+    meter = ProgressMeter("Shards finished", len(shards))
+    try:
+        while True:
+            settled, total, finished = board.progress()
+            meter.update(settled)
+            if finished:
+                break
+            if procs and all(proc.poll() is not None for proc in procs) and not board.leases:
+                print("\nAll local workers exited with shards left; writing partial output.", file=sys.stderr)
+                break
+            time.sleep(1)
+        print(file=sys.stderr)
+        # Let idle workers see that the board is done before the server goes away
+        for proc in procs:
+            try:
+                proc.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+    finally:
+        server.stop_event.set()
+    # Merge in request order (region, then page) and drop schools listed in more than one shard
+    order = {kab: index for index, kab in enumerate(regions or [""])}
+    done = sorted(board.results, key=lambda shard_id: (order[shards[shard_id]["kabupaten_kota"]], shards[shard_id]["start"]))
+    rows, duplicates = dedupe_schools((board.results[shard_id] for shard_id in done), key=lambda row: row[-1])
+    if duplicates:
+        print(f"Dropped {duplicates} schools listed in more than one shard.", file=sys.stderr)
+    missing = len(shards) - len(done)
+    begin_phase("write")
+    try:
+        write_rows(rows, output_path, args.format)
+    except (OSError, RuntimeError) as exc:
+        print(f"Failed to write output: {exc}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Wrote {len(rows)} schools from {len(done)} shards to {output_path}", file=sys.stderr)
+    if missing:
+        print(f"{missing} shards did not finish; the output is incomplete.", file=sys.stderr)
+        sys.exit(1)
+
+
+def heartbeat_loop(board: Any, worker: str, shard_id: int, stop: threading.Event) -> None:
+    while not stop.wait(SHARD_LEASE_SECONDS / 4):
         try:
-            phones = enrich_with_phones(items, workers=max(1, detail_workers))
-        except BaseException as exc:
-            print(f"Failed while fetching phone numbers: {exc}", file=sys.stderr)
+            if not board.heartbeat(worker, shard_id):
+                print(f"\nLost the lease on shard {shard_id}; another worker has it.", file=sys.stderr)
+                return
+        except (OSError, EOFError):
+            return
+
+
+def run_worker(
+    address: str,
+    authkey: str,
+    metadata_workers: int,
+    detail_workers: int,
+    skip_phone: bool,
+    cache_dir: Optional[str] = None,
+    cache_ttl_days: float = DEFAULT_CACHE_TTL_DAYS,
+    cache_max_mb: int = DEFAULT_CACHE_MAX_MB,
+) -> None:
+    global DETAIL_CACHE
+    ShardManager.register("board")
+    manager = ShardManager(address=parse_address(address), authkey=authkey.encode("utf-8"))
     try:
-        write_csv(items, phones, output_path)
-    except BaseException as exc:
-        print(f"Failed to write CSV: {exc}", file=sys.stderr)
+        manager.connect()
+    except OSError as exc:
+        print(f"Failed to reach coordinator at {address}: {exc}", file=sys.stderr)
         sys.exit(1)
-    print(f"Wrote CSV to {output_path}", file=sys.stderr)
+    board = manager.board()
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    if cache_dir and not skip_phone:
+        DETAIL_CACHE = DetailCache(Path(cache_dir), cache_ttl_days * 86400, cache_max_mb * 1024 * 1024, commit_every=1)
+    finished = 0
+    try:
+        while True:
+            try:
+                status, shard = board.claim(worker)
+                if status == "done":
+                    break
+                if status == "wait":
+                    time.sleep(2)
+                    continue
+                print(
+                    f"Shard {shard['id']}: {shard['kabupaten_kota'] or 'all regions'},"
+                    f" pages {shard['start']}-{shard['end'] - 1} of size {shard['page_size']}",
+                    file=sys.stderr,
+                )
+                stop = threading.Event()
+                threading.Thread(target=heartbeat_loop, args=(board, worker, shard["id"], stop), daemon=True).start()
+                try:
+                    rows = run_shard(shard, metadata_workers, detail_workers, skip_phone)
+                except Exception as exc:
+                    board.fail(worker, shard["id"], str(exc))
+                    continue
+                finally:
+                    stop.set()
+                board.complete(worker, shard["id"], rows)
+                finished += 1
+            except (OSError, EOFError):
+                print("Lost connection to the coordinator; stopping.", file=sys.stderr)
+                break
+    finally:
+        CONNECTION_POOL.close()
+        if DETAIL_CACHE is not None:
+            DETAIL_CACHE.close()
+            DETAIL_CACHE = None
+    print(f"Worker {worker} finished {finished} shards.", file=sys.stderr)
 
 
 def get_kabupaten_suggestions(keyword: str) -> List[str]:
@@ -404,21 +4983,22 @@ def get_kabupaten_suggestions(keyword: str) -> List[str]:
         return []
 
 
-def select_kabupaten_kota() -> str:
+def select_kabupaten_kota(index: Optional[RegionIndex] = None) -> str:
     print("--- Region Filter ---")
     while True:
         keyword = prompt_str("Enter Kabupaten/Kota name to search (leave blank to skip)")
         if not keyword:
             return ""
         
-        suggestions = get_kabupaten_suggestions(keyword)
+        # Without a region index, fall back to a live search of the first 100 matching schools
+        suggestions = index.search(keyword) if index is not None else get_kabupaten_suggestions(keyword)
         if not suggestions:
             print("No regions found matching that keyword. Try again.")
             continue
             
         print(f"\nFound {len(suggestions)} regions:")
         for idx, name in enumerate(suggestions, 1):
-            print(f"  {idx}. {name}")
+            print(f"  {idx}. {index.describe(name) if index is not None else name}")
         print(f"  0. Search again")
         print(f"  B. Back / Skip")
         
@@ -440,28 +5020,34 @@ def select_kabupaten_kota() -> str:
 
 
 def run_tui(args: argparse.Namespace) -> None:
-    global DISABLE_RATE_LIMIT
+    global REGION_INDEX
     
-    if getattr(sys, 'frozen', False):
-        # Running as compiled executable: save in the same directory as the .exe
-        script_dir = Path(sys.executable).resolve().parent
-    else:
-        # Running as script: save in the script's directory
-        script_dir = Path(__file__).resolve().parent
+    script_dir = app_dir()
 
     print("Sekolah Kita scraper (interactive mode)")
     print()
     
-    kabupaten_kota = select_kabupaten_kota()
+    index_path = region_index_path(args.cache_dir or str(default_cache_dir()))
+    REGION_INDEX = load_region_index(index_path, args.region_index_ttl, build=False)
+    if REGION_INDEX is None and prompt_bool(
+        "Build the local region index for instant search? (one nationwide listing, refreshed weekly)", True
+    ):
+        REGION_INDEX = load_region_index(
+            index_path, args.region_index_ttl, workers=max(1, min(args.metadata_workers, SAFE_METADATA_WORKERS_MAX))
+        )
+        print()
+    kabupaten_kota = select_kabupaten_kota(REGION_INDEX)
     print()
     
     # Try to detect total records to offer as default page size
     default_page_size = args.page_size if args.page_size > 0 else 1000
-    if args.page_size <= 0:
+    cached_total = REGION_INDEX.count(kabupaten_kota) if REGION_INDEX is not None else None
+    if args.page_size <= 0 and cached_total:
+        default_page_size = cached_total
+    elif args.page_size <= 0:
         try:
             print("Checking total records...", file=sys.stderr)
-            meta = fetch_page(0, 1, kabupaten_kota=kabupaten_kota)
-            total_found = int(meta.get("total", 0))
+            total_found = count_listing(kabupaten_kota)
             if total_found > 0:
                 default_page_size = total_found
         except Exception as exc:
@@ -481,16 +5067,26 @@ def run_tui(args: argparse.Namespace) -> None:
         min_value=1,
         max_value=SAFE_DETAIL_WORKERS_MAX,
     )
+    adaptive = prompt_bool("Adapt worker counts to server load? (starts from the values above)", args.adaptive_workers)
     fetch_phones = prompt_bool("Fetch phone numbers from detail endpoint?", not args.skip_phone)
-    DISABLE_RATE_LIMIT = prompt_bool("Disable rate limiting? (Faster but higher risk)", DISABLE_RATE_LIMIT)
-    output_path = build_timestamped_output(script_dir, kabupaten_kota=kabupaten_kota)
+    RATE_LIMITER.enabled = not prompt_bool("Disable rate limiting? (Faster but higher risk)", not RATE_LIMITER.enabled)
+    if RATE_LIMITER.enabled:
+        rps = prompt_float("Requests per second (shared by all workers)", args.rps, min_value=0.1)
+        RATE_LIMITER.configure(rps, args.burst)
+    output_path = build_timestamped_output(script_dir, kabupaten_kota=kabupaten_kota, output_format=args.format)
     print()
-    print(f"Output CSV will be created at:")
+    print(f"Output {args.format.upper()} will be created at:")
     print(f"  {output_path}")
     print()
+    journal_file = default_journal_path(str(output_path), kabupaten_kota)
+    resume = args.resume
+    if not args.no_journal and journal_file.exists():
+        resume = prompt_bool(f"Found an unfinished run ({journal_file.name}). Resume it?", True)
     if not prompt_bool("Start scraping now?", True):
         print("Cancelled.")
         return
+    if args.profile:
+        start_profiler(str(output_path))
     run_scrape(
         output_path=str(output_path),
         page_size=page_size,
@@ -499,6 +5095,16 @@ def run_tui(args: argparse.Namespace) -> None:
         detail_workers=detail_workers,
         skip_phone=not fetch_phones,
         kabupaten_kota=kabupaten_kota,
+        adaptive=adaptive,
+        max_metadata_workers=args.max_metadata_workers,
+        max_detail_workers=args.max_detail_workers,
+        latency_target=args.latency_target,
+        journal_path=None if args.no_journal else str(default_journal_path(str(output_path), kabupaten_kota)),
+        resume=resume,
+        cache_dir=None if args.no_cache else (args.cache_dir or str(default_cache_dir())),
+        cache_ttl_days=args.cache_ttl,
+        cache_max_mb=args.cache_max_mb,
+        output_format=args.format,
     )
     input("\nPress Enter to exit...")
 
@@ -511,7 +5117,13 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         "--output",
         "-o",
         default=None,
-        help="Output CSV file path. If omitted, a timestamped name is used.",
+        help="Output file path. If omitted, a timestamped name is used.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=list(OUTPUT_FORMATS),
+        default="csv",
+        help="Output format: csv, jsonl.gz, jsonl.zst (needs zstandard), parquet (needs pyarrow) or sqlite (default csv).",
     )
     parser.add_argument(
         "--page-size",
@@ -519,6 +5131,17 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default=0,
         help="Number of schools per API page. Default (0) fetches all reported data in one page.",
     )
+    parser.add_argument(
+        "--tune-page-size",
+        action="store_true",
+        help="Probe a few page sizes and pick the fastest one within --page-latency-target (used when --page-size is 0).",
+    )
+    parser.add_argument(
+        "--page-latency-target",
+        type=float,
+        default=DEFAULT_PAGE_LATENCY_TARGET,
+        help=f"Latency budget in seconds for one listing page when tuning (default {DEFAULT_PAGE_LATENCY_TARGET:g}).",
+    )
     parser.add_argument(
         "--max-pages",
         type=int,
@@ -537,6 +5160,29 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         default=SAFE_DETAIL_WORKERS_MAX,
         help="Number of concurrent workers for detail requests (capped to a safe maximum).",
     )
+    parser.add_argument(
+        "--adaptive-workers",
+        action="store_true",
+        help="Adapt worker counts to server latency and errors (AIMD), starting from --metadata-workers/--detail-workers.",
+    )
+    parser.add_argument(
+        "--max-metadata-workers",
+        type=int,
+        default=ADAPTIVE_METADATA_WORKERS_MAX,
+        help=f"Ceiling for adaptive listing workers (default {ADAPTIVE_METADATA_WORKERS_MAX}).",
+    )
+    parser.add_argument(
+        "--max-detail-workers",
+        type=int,
+        default=ADAPTIVE_DETAIL_WORKERS_MAX,
+        help=f"Ceiling for adaptive detail workers (default {ADAPTIVE_DETAIL_WORKERS_MAX}).",
+    )
+    parser.add_argument(
+        "--latency-target",
+        type=float,
+        default=None,
+        help="p95 latency in seconds above which adaptive workers back off (default: twice the best observed p95).",
+    )
     parser.add_argument(
         "--skip-phone",
         action="store_true",
@@ -545,14 +5191,237 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser.add_argument(
         "--kabupaten-kota",
         type=str,
-        default="",
-        help="Filter by Kabupaten/Kota name (exact match).",
+        action="append",
+        default=[],
+        help="Filter by Kabupaten/Kota name (exact match). Repeat to scrape several regions in one batch.",
+    )
+    parser.add_argument(
+        "--regions-file",
+        type=str,
+        default=None,
+        help="File with one Kabupaten/Kota per line to scrape in one batch ('#' starts a comment).",
+    )
+    parser.add_argument(
+        "--per-region-output",
+        action="store_true",
+        help="In a batch, also write one CSV per region next to the combined output.",
     )
     parser.add_argument(
         "--no-rate-limit",
         action="store_true",
         help="Disable rate limiting (faster, but higher risk of blocking).",
     )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=DEFAULT_RPS,
+        help=f"Target requests per second shared by all workers (default {DEFAULT_RPS}).",
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=DEFAULT_BURST,
+        help=f"Number of requests allowed in a burst above the --rps rate (default {DEFAULT_BURST}).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("thread", "async"),
+        default="thread",
+        help="Fetch engine: 'thread' (worker threads) or 'async' (one event loop with keep-alive connections).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=ASYNC_CONCURRENCY_DEFAULT,
+        help=f"Maximum in-flight detail requests for the async engine (default {ASYNC_CONCURRENCY_DEFAULT}).",
+    )
+    parser.add_argument(
+        "--api-base",
+        type=str,
+        default=API_BASE,
+        help="Base URL of the Sekolah Kita API (e.g. a local stub server for testing).",
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        default=None,
+        help="Checkpoint journal path (default: sekolah_kita_<region>.journal.jsonl next to the output).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the journal of an interrupted run, skipping pages and phones already fetched.",
+    )
+    parser.add_argument(
+        "--no-journal",
+        action="store_true",
+        help="Do not write a checkpoint journal.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=None,
+        help="Directory for the full-detail response cache (default: sekolah_kita_cache next to the script).",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_CACHE_TTL_DAYS,
+        help=f"Days a cached detail response stays valid (default {DEFAULT_CACHE_TTL_DAYS:g}).",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=DEFAULT_CACHE_MAX_MB,
+        help=f"Size bound of the detail cache in MB; least recently used entries are evicted (default {DEFAULT_CACHE_MAX_MB}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the detail cache.",
+    )
+    parser.add_argument(
+        "--since",
+        type=str,
+        default=None,
+        help="Previous output CSV; only new or changed schools get a detail request, and a change report is written.",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=f"Stream rows to the CSV as pages arrive instead of listing everything first "
+        f"(page size defaults to {STREAM_PAGE_SIZE}; thread engine only).",
+    )
+    parser.add_argument(
+        "--partition",
+        action="store_true",
+        help="Split the listing into one sub-query per bentuk_pendidikan and status_sekolah in each region, run them"
+        " in parallel largest first, and check that their totals add up to the unpartitioned total (thread engine).",
+    )
+    parser.add_argument(
+        "--deadline",
+        metavar="TIME",
+        default=None,
+        help="Finish by this local time (HH:MM, or YYYY-MM-DDTHH:MM): detail lookups stop in time to write the full"
+        " listing with the phones found so far, plus a report of the schools that were skipped.",
+    )
+    parser.add_argument(
+        "--time-budget",
+        metavar="DURATION",
+        default=None,
+        help="Like --deadline, but a duration from now: seconds, or e.g. 90m, 1h30m.",
+    )
+    parser.add_argument(
+        "--priority-region",
+        action="append",
+        default=[],
+        metavar="NAME",
+        help="With a time budget, look up schools in this Kabupaten/Kota or province first (can be repeated).",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a second full-detail request for a lookup that is slower than the recent p95, keep whichever"
+        " answers first and cancel the other (thread engine).",
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=HEDGE_PERCENTILE,
+        help=f"With --hedge, the latency percentile after which a request is duplicated (default {HEDGE_PERCENTILE:g}).",
+    )
+    parser.add_argument(
+        "--hedge-max-percent",
+        type=float,
+        default=HEDGE_MAX_SHARE * 100,
+        help=f"With --hedge, at most this percentage of requests may be duplicates (default {HEDGE_MAX_SHARE * 100:g}).",
+    )
+    parser.add_argument(
+        "--coordinate",
+        metavar="HOST:PORT",
+        default=None,
+        help="Run as coordinator: split the job into shards and serve them to --worker processes on this address.",
+    )
+    parser.add_argument(
+        "--worker",
+        metavar="HOST:PORT",
+        default=None,
+        help="Run as a worker for the coordinator at this address until all shards are done.",
+    )
+    parser.add_argument(
+        "--spawn-workers",
+        type=int,
+        default=0,
+        help="With --coordinate, start this many local worker processes (they split --rps between them).",
+    )
+    parser.add_argument(
+        "--shard-pages",
+        type=int,
+        default=SHARD_PAGES_DEFAULT,
+        help=f"Listing pages per shard when coordinating (default {SHARD_PAGES_DEFAULT}).",
+    )
+    parser.add_argument(
+        "--authkey",
+        default=os.environ.get(AUTHKEY_ENV) or None,
+        help=f"Shared secret between coordinator and workers (default: ${AUTHKEY_ENV}). Required with --worker;"
+        " a coordinator without one generates a random key and prints it.",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=float,
+        default=BREAKER_THRESHOLD,
+        help=f"Pause all requests when this share of the last {BREAKER_WINDOW} attempts failed with 5xx/429/timeouts"
+        f" (default {BREAKER_THRESHOLD:g}; 0 disables the circuit breaker).",
+    )
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=BREAKER_COOLDOWN,
+        help=f"Seconds to pause before a probe request; doubles after each failed probe (default {BREAKER_COOLDOWN:g}).",
+    )
+    parser.add_argument(
+        "--find-region",
+        metavar="TEXT",
+        default=None,
+        help="Search the local region index for Kabupaten/Kota names and school counts, then exit.",
+    )
+    parser.add_argument(
+        "--refresh-region-index",
+        action="store_true",
+        help="Rebuild the local region index now (one nationwide listing), then exit.",
+    )
+    parser.add_argument(
+        "--region-index-ttl",
+        type=float,
+        default=REGION_INDEX_TTL_DAYS,
+        help=f"Days before the region index is considered stale (default {REGION_INDEX_TTL_DAYS:g}).",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="FILE",
+        default=None,
+        help="Write a JSON run summary (per-endpoint requests, retries, failures, bytes, latency histogram, time breakdown).",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        metavar="FILE",
+        default=None,
+        help="Write the run summary in Prometheus text format, e.g. into a node_exporter textfile directory.",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="FILE",
+        nargs="?",
+        const="",
+        default=None,
+        help="Keep every raw listing item and detail response in a compressed archive (default file: archive.sqlite3"
+        " in the cache directory), so `export` can rebuild output with other columns without refetching.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile each phase with cProfile and tracemalloc; reports are written next to the output.",
+    )
     parser.add_argument(
         "--tui",
         action="store_true",
@@ -562,25 +5431,203 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
 
 
 def main(argv: Optional[List[str]] = None) -> None:
-    global DISABLE_RATE_LIMIT
-    
     # If no arguments provided (running from double-click or simple command), default to TUI
     if argv is None and len(sys.argv) == 1:
         argv = ["--tui"]
-        
+    command = sys.argv[1:] if argv is None else argv
+    if command and command[0] == "export":
+        run_export(parse_export_args(command[1:]))
+        return
+    if command and command[0] == "serve":
+        run_serve(parse_serve_args(command[1:]))
+        return
+
     args = parse_args(argv)
-    if args.no_rate_limit:
-        DISABLE_RATE_LIMIT = True
-        
+    for flag, enabled in (
+        ("--stream", args.stream),
+        ("--tune-page-size", args.tune_page_size),
+        ("--partition", args.partition),
+        ("--hedge", args.hedge),
+        ("--adaptive-workers", args.adaptive_workers),
+    ):
+        if enabled and args.engine != "thread":
+            print(f"Error: {flag} is only supported with --engine thread.", file=sys.stderr)
+            sys.exit(2)
+    regions = list(args.kabupaten_kota)
+    if args.regions_file:
+        try:
+            regions.extend(load_regions_file(args.regions_file))
+        except OSError as exc:
+            print(f"Failed to read regions file: {exc}", file=sys.stderr)
+            sys.exit(1)
+    # Duplicate names would only be fetched twice
+    regions = list(dict.fromkeys(regions))
+    args.kabupaten_kota = regions[0] if len(regions) == 1 else ""
+    batch = len(regions) > 1
+    if args.coordinate or args.worker:
+        for flag, enabled in (
+            ("--stream", args.stream),
+            ("--tune-page-size", args.tune_page_size),
+            ("--engine async", args.engine != "thread"),
+            ("--since", bool(args.since)),
+            ("--resume", args.resume),
+            ("--tui", args.tui),
+            ("--archive", args.archive is not None),
+            ("--partition", args.partition),
+            ("--deadline/--time-budget", bool(args.deadline or args.time_budget)),
+            ("--hedge", args.hedge),
+            ("--adaptive-workers", args.adaptive_workers),
+        ):
+            if enabled:
+                print(f"Error: {flag} cannot be combined with --coordinate/--worker.", file=sys.stderr)
+                sys.exit(2)
+        if args.worker and args.profile:
+            print("Error: --profile cannot be combined with --worker; profile the coordinator or a single run.", file=sys.stderr)
+            sys.exit(2)
+        # The coordinator unpickles whatever an authenticated peer sends, so there is no default key
+        if args.worker and not args.authkey:
+            print(f"Error: --worker needs --authkey or ${AUTHKEY_ENV} (printed by the coordinator).", file=sys.stderr)
+            sys.exit(2)
+        if args.coordinate and not args.authkey:
+            args.authkey = secrets.token_hex(16)
+            print(f"Generated authkey {args.authkey}; pass it to workers with --authkey.", file=sys.stderr)
+    elif batch:
+        for flag, enabled in (
+            ("--stream", args.stream),
+            ("--tune-page-size", args.tune_page_size),
+            ("--engine async", args.engine != "thread"),
+            ("--tui", args.tui),
+        ):
+            if enabled:
+                print(f"Error: {flag} cannot be combined with several regions.", file=sys.stderr)
+                sys.exit(2)
+    if args.partition:
+        for flag, enabled in (("--stream", args.stream), ("--tune-page-size", args.tune_page_size)):
+            if enabled:
+                print(f"Error: {flag} cannot be combined with --partition.", file=sys.stderr)
+                sys.exit(2)
+    if args.stream and (args.deadline or args.time_budget):
+        print("Error: --deadline/--time-budget cannot be combined with --stream.", file=sys.stderr)
+        sys.exit(2)
+    if args.hedge and args.stream:
+        print("Error: --hedge cannot be combined with --stream.", file=sys.stderr)
+        sys.exit(2)
+    if not 50 <= args.hedge_percentile < 100 or not 0 < args.hedge_max_percent <= 100:
+        print("Error: --hedge-percentile must be in [50, 100) and --hedge-max-percent in (0, 100].", file=sys.stderr)
+        sys.exit(2)
+    try:
+        # The budget is counted from here, so it covers the listing as well as the details
+        args.detail_deadline = detail_deadline(args.deadline, args.time_budget)
+    except ValueError as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        sys.exit(2)
+    if not args.worker:
+        try:
+            check_output_format(args.format)
+        except RuntimeError as exc:
+            print(f"Error: {exc}", file=sys.stderr)
+            sys.exit(2)
+    RATE_LIMITER.enabled = not args.no_rate_limit
+    RATE_LIMITER.configure(args.rps, args.burst)
+    CIRCUIT_BREAKER.configure(args.breaker_threshold, args.breaker_cooldown)
+    set_api_base(args.api_base)
+    status = "failed"
+    try:
+        run_command(args, regions, batch)
+        status = "ok"
+    except SystemExit as exc:
+        status = "failed" if exc.code else "ok"
+        raise
+    except KeyboardInterrupt:
+        status = "interrupted"
+        raise
+    finally:
+        export_run_metrics(status, args.metrics_json, args.metrics_prom)
+        try:
+            LISTING_COUNTS.save()
+        except OSError as exc:
+            print(f"Failed to save listing counts: {exc}", file=sys.stderr)
+        if ARCHIVE is not None:
+            counts = ARCHIVE.counts()
+            ARCHIVE.close()
+            print(
+                f"Archive {ARCHIVE.path}: {ARCHIVE.added} new versions; {counts['listing']} schools,"
+                f" {counts['detail']} with detail.",
+                file=sys.stderr,
+            )
+        if PHASE_PROFILER is not None:
+            try:
+                PHASE_PROFILER.close()
+            except OSError as exc:
+                print(f"Failed to write profile report: {exc}", file=sys.stderr)
+
+
+def export_run_metrics(status: str, json_path: Optional[str], prom_path: Optional[str]) -> None:
+    # Also runs after a failed or interrupted run, which is when the breakdown matters most
+    if RUN_METRICS.total_requests():
+        RUN_METRICS.report()
+    try:
+        if json_path:
+            write_file_atomic(json_path, json.dumps(RUN_METRICS.summary(status), indent=2) + "\n")
+            print(f"Wrote run summary to {json_path}", file=sys.stderr)
+        if prom_path:
+            write_file_atomic(prom_path, RUN_METRICS.prometheus(status))
+            print(f"Wrote Prometheus metrics to {prom_path}", file=sys.stderr)
+    except OSError as exc:
+        print(f"Failed to write run summary: {exc}", file=sys.stderr)
+
+
+def run_command(args: argparse.Namespace, regions: List[str], batch: bool) -> None:
+    global REGION_INDEX, ARCHIVE
+    if args.archive is not None:
+        ARCHIVE = ResponseArchive(Path(args.archive) if args.archive else default_archive_path(args.cache_dir))
     if args.tui:
         run_tui(args)
         return
     metadata_workers = max(1, min(args.metadata_workers, SAFE_METADATA_WORKERS_MAX))
     detail_workers = max(1, min(args.detail_workers, SAFE_DETAIL_WORKERS_MAX))
+    index_path = region_index_path(args.cache_dir or str(default_cache_dir()))
+    if args.find_region is not None or args.refresh_region_index:
+        index = load_region_index(index_path, args.region_index_ttl, metadata_workers, refresh=args.refresh_region_index)
+        if index is None:
+            sys.exit(1)
+        if args.find_region is not None:
+            matches = index.search(args.find_region)
+            for name in matches:
+                print(index.describe(name))
+            if not matches:
+                print("No regions found matching that text.", file=sys.stderr)
+                sys.exit(1)
+        return
+    # Only an index already on disk is used here; building one is a nationwide listing
+    REGION_INDEX = load_region_index(index_path, args.region_index_ttl, build=False)
+    LISTING_COUNTS.load(listing_counts_path(args.cache_dir or str(default_cache_dir())))
+    if args.worker:
+        run_worker(
+            args.worker,
+            args.authkey,
+            metadata_workers=metadata_workers,
+            detail_workers=detail_workers,
+            skip_phone=args.skip_phone,
+            cache_dir=None if args.no_cache else (args.cache_dir or str(default_cache_dir())),
+            cache_ttl_days=args.cache_ttl,
+            cache_max_mb=args.cache_max_mb,
+        )
+        return
+    # A batch is named like a region called "batch" so its output and journal do not clash with a single run
+    name = "batch" if batch else args.kabupaten_kota
     if args.output:
         output_path = args.output
     else:
-        output_path = str(build_timestamped_output(Path.cwd(), kabupaten_kota=args.kabupaten_kota))
+        output_path = str(build_timestamped_output(Path.cwd(), kabupaten_kota=name, output_format=args.format))
+    if args.profile:
+        start_profiler(output_path)
+    if args.coordinate:
+        run_coordinator(args, output_path, regions, page_size=args.page_size, max_pages=args.max_pages)
+        return
+    journal_path: Optional[str] = None
+    if not args.no_journal:
+        journal_path = args.journal or str(default_journal_path(output_path, name))
     run_scrape(
         output_path=output_path,
         page_size=args.page_size,
@@ -589,6 +5636,28 @@ def main(argv: Optional[List[str]] = None) -> None:
         detail_workers=detail_workers,
         skip_phone=args.skip_phone,
         kabupaten_kota=args.kabupaten_kota,
+        engine=args.engine,
+        concurrency=args.concurrency,
+        adaptive=args.adaptive_workers,
+        max_metadata_workers=args.max_metadata_workers,
+        max_detail_workers=args.max_detail_workers,
+        latency_target=args.latency_target,
+        journal_path=journal_path,
+        resume=args.resume,
+        cache_dir=None if args.no_cache else (args.cache_dir or str(default_cache_dir())),
+        cache_ttl_days=args.cache_ttl,
+        cache_max_mb=args.cache_max_mb,
+        since=args.since,
+        stream=args.stream,
+        tune_latency_target=args.page_latency_target if args.tune_page_size else None,
+        regions=regions if batch else None,
+        per_region_output=args.per_region_output,
+        output_format=args.format,
+        partition=args.partition,
+        deadline=args.detail_deadline,
+        priority_regions=args.priority_region,
+        hedge_percentile=args.hedge_percentile if args.hedge else None,
+        hedge_max_share=args.hedge_max_percent / 100,
     )
 
 
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The scraper is a single script at the repository root, not an installed package
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,95 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import scrape_sekolah_kita as sks
+from scrape_sekolah_kita import (
+    DEADLINE_RESERVE_MIN,
+    DEADLINE_RESERVE_SHARE,
+    detail_deadline,
+    parse_deadline,
+    parse_duration,
+    prioritise_details,
+)
+
+NOW = datetime(2024, 5, 1, 22, 30, 0)
+
+
+@pytest.mark.parametrize(
+    "text, seconds",
+    [("5400", 5400.0), ("2.5", 2.5), ("90m", 5400.0), ("1h30m", 5400.0), ("45s", 45.0), ("1h", 3600.0), (" 2M ", 120.0)],
+)
+def test_parse_duration(text, seconds):
+    assert parse_duration(text) == seconds
+
+
+@pytest.mark.parametrize("text", ["", "h", "1d", "30m1h", "-5", "soon"])
+def test_parse_duration_rejects(text):
+    with pytest.raises(ValueError):
+        parse_duration(text)
+
+
+def test_clock_time_later_today():
+    assert parse_deadline("23:15", NOW) == datetime(2024, 5, 1, 23, 15)
+    assert parse_deadline("22:30:30", NOW) == datetime(2024, 5, 1, 22, 30, 30)
+
+
+def test_clock_time_already_past_means_tomorrow():
+    assert parse_deadline("06:00", NOW) == datetime(2024, 5, 2, 6, 0)
+    assert parse_deadline("22:30", NOW) == datetime(2024, 5, 2, 22, 30)
+
+
+def test_iso_deadline():
+    assert parse_deadline("2024-05-02T03:00", NOW) == datetime(2024, 5, 2, 3, 0)
+    aware = (NOW + timedelta(hours=2)).astimezone()
+    assert parse_deadline(aware.isoformat(), NOW) == NOW + timedelta(hours=2)
+
+
+@pytest.mark.parametrize("text", ["2024-05-01T12:00", "tomorrow", "25:00"])
+def test_parse_deadline_rejects(text):
+    with pytest.raises(ValueError):
+        parse_deadline(text, NOW)
+
+
+def test_no_budget_means_no_deadline():
+    assert detail_deadline(None, None) is None
+
+
+def test_small_budget_keeps_the_minimum_reserve():
+    started = time.monotonic()
+    assert detail_deadline(None, "60") - started == pytest.approx(60 - DEADLINE_RESERVE_MIN, abs=0.5)
+
+
+def test_large_budget_keeps_a_share_in_reserve():
+    started = time.monotonic()
+    expected = 3600 * (1 - DEADLINE_RESERVE_SHARE)
+    assert detail_deadline(None, "1h") - started == pytest.approx(expected, abs=0.5)
+
+
+def test_the_earlier_of_deadline_and_budget_wins():
+    started = time.monotonic()
+    soon = (datetime.now() + timedelta(seconds=120)).isoformat(timespec="seconds")
+    assert detail_deadline(soon, "1h") - started == pytest.approx(120 - DEADLINE_RESERVE_MIN, abs=2)
+
+
+def test_zero_budget_is_rejected():
+    with pytest.raises(ValueError):
+        detail_deadline(None, "0")
+
+
+def test_prioritise_details_puts_cached_then_priority_regions_first(monkeypatch):
+    class Cache:
+        def fresh_ids(self):
+            return {"cached"}
+
+    monkeypatch.setattr(sks, "DETAIL_CACHE", Cache())
+    rows = [
+        {"sekolah_id": "a", "kabupaten": "Kota Lain", "provinsi": "Prov. Lain"},
+        {"sekolah_id": "b", "kabupaten": "Kota Bandung", "provinsi": "Prov. Jawa Barat"},
+        {"sekolah_id": "cached", "kabupaten": "Kota Lain", "provinsi": "Prov. Lain"},
+        {"sekolah_id": "c", "kabupaten": "Kab. Garut", "provinsi": "Prov. Jawa Barat"},
+        {"sekolah_id": "d", "kabupaten": "Kota Bandung", "provinsi": "Prov. Jawa Barat"},
+    ]
+    ordered = prioritise_details(rows, ["kota bandung", "Prov. Jawa Barat"])
+    assert [row["sekolah_id"] for row in ordered] == ["cached", "b", "d", "c", "a"]
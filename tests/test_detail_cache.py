@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from scrape_sekolah_kita import DetailCache
+
+DAY = 86400.0
+
+
+def body(tag):
+    # About 110 bytes of JSON each
+    return {"sekolah_id": tag, "telepon": "0" * 80}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = DetailCache(tmp_path, ttl=DAY)
+    yield cache
+    cache.close()
+
+
+def age(cache, sekolah_id, seconds):
+    cache._conn.execute(
+        "UPDATE detail SET fetched_at = fetched_at - ?, accessed_at = accessed_at - ? WHERE sekolah_id = ?",
+        (seconds, seconds, sekolah_id),
+    )
+
+
+def test_round_trip_and_hit_rate(cache):
+    assert cache.get("a") is None
+    cache.put("a", body("a"))
+    assert cache.get("a") == body("a")
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate() == 0.5
+
+
+def test_entries_expire_after_the_ttl(cache):
+    cache.put("old", body("old"))
+    cache.put("new", body("new"))
+    age(cache, "old", DAY + 1)
+    assert cache.get("old") is None
+    assert cache.get("new") == body("new")
+    assert cache.fresh_ids() == {"new"}
+
+
+def test_expired_entries_are_dropped_on_open(tmp_path):
+    cache = DetailCache(tmp_path, ttl=DAY)
+    cache.put("old", body("old"))
+    cache.put("new", body("new"))
+    age(cache, "old", DAY + 1)
+    cache.close()
+    reopened = DetailCache(tmp_path, ttl=DAY)
+    try:
+        count = reopened._conn.execute("SELECT COUNT(*) FROM detail").fetchone()[0]
+        assert count == 1
+        assert reopened.fresh_ids() == {"new"}
+    finally:
+        reopened.close()
+
+
+def test_shorter_ttl_on_a_later_run_applies_to_old_entries(tmp_path):
+    cache = DetailCache(tmp_path, ttl=DAY)
+    cache.put("a", body("a"))
+    age(cache, "a", 3600)
+    cache.close()
+    strict = DetailCache(tmp_path, ttl=60)
+    try:
+        assert strict.get("a") is None
+    finally:
+        strict.close()
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    size = len(json.dumps(body("a"), ensure_ascii=False))
+    cache = DetailCache(tmp_path, ttl=DAY, max_bytes=int(size * 3.5))
+    try:
+        for offset, tag in enumerate("abc"):
+            cache.put(tag, body(tag))
+            # Oldest first: a, b, c
+            age(cache, tag, 30 - offset * 10)
+        # Reading "a" makes "b" the least recently used
+        assert cache.get("a") is not None
+        cache.put("d", body("d"))
+        assert cache.fresh_ids() == {"a", "c", "d"}
+        assert cache._size <= cache.max_bytes
+    finally:
+        cache.close()
+
+
+def test_replacing_an_entry_does_not_count_it_twice(cache):
+    cache.put("a", body("a"))
+    before = cache._size
+    cache.put("a", body("a"))
+    assert cache._size == before
+
+
+def test_cache_survives_reopen(tmp_path):
+    first = DetailCache(tmp_path, ttl=DAY, commit_every=1000)
+    first.put("a", body("a"))
+    first.close()
+    second = DetailCache(tmp_path, ttl=DAY)
+    try:
+        assert second.get("a") == body("a")
+        assert second._size > 0
+    finally:
+        second.close()
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRAPER = ROOT / "scrape_sekolah_kita.py"
+MOCK = ROOT / "mock_sekolah_kita_api.py"
+
+
+@pytest.fixture(scope="module")
+def api_base():
+    # A few 429s with a short Retry-After, so every engine goes through its retry path
+    server = subprocess.Popen(
+        [sys.executable, str(MOCK), "--port", "0", "--schools", "600", "--regions", "3"]
+        + ["--throttle-rate", "0.03", "--retry-after", "0.05"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    try:
+        line = server.stdout.readline()
+        assert line.startswith("Listening on "), line
+        yield line.split()[-1]
+    finally:
+        server.terminate()
+        server.wait(10)
+
+
+def scrape(api_base, output, *extra):
+    command = [sys.executable, str(SCRAPER), "--api-base", api_base, "--no-rate-limit", "--no-cache", "--no-journal"]
+    result = subprocess.run(
+        command + ["-o", str(output), *extra], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=300
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return output.read_bytes()
+
+
+@pytest.mark.parametrize("region", ["", "Kota Daerah 1"])
+def test_engines_write_identical_files(api_base, tmp_path, region):
+    extra = ["--kabupaten-kota", region] if region else []
+    thread = scrape(api_base, tmp_path / "thread.csv", *extra)
+    assert thread.count(b"\n") > 100
+    assert scrape(api_base, tmp_path / "async.csv", "--engine", "async", *extra) == thread
+    assert scrape(api_base, tmp_path / "stream.csv", "--stream", *extra) == thread
+    assert scrape(api_base, tmp_path / "stream-paged.csv", "--stream", "--page-size", "37", *extra) == thread
@@ -0,0 +1,134 @@
+import pytest
+
+from scrape_sekolah_kita import SchoolRecord, ScrapeJournal, split_journaled_phones
+
+JOB = {"kabupaten_kota": "Kota Bandung", "skip_phone": False}
+
+
+def school(n):
+    return {"sekolah_id": f"id-{n}", "nama": f"SD {n}", "alamat_jalan": "Jl. Asia Afrika", "kabupaten": "Kota Bandung"}
+
+
+def ids(items):
+    return [item.get("sekolah_id") for item in items]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / "job.journal"
+
+
+def write_journal(path, job=JOB):
+    journal = ScrapeJournal(path, job)
+    journal.record_page(2, 0, 5, [school(0), school(1)])
+    journal.record_page(2, 2, 5, [SchoolRecord.from_item(school(4))])
+    journal.record_phone("id-0", "022-123")
+    journal.record_phone("id-1", None)
+    journal.close()
+
+
+def test_resume_replays_pages_and_phones(path):
+    write_journal(path)
+    journal = ScrapeJournal(path, JOB, resume=True)
+    try:
+        assert journal.page_size == 2
+        assert journal.total == 5
+        pages = journal.resumed_pages(2)
+        assert sorted(pages) == [0, 2]
+        assert ids(pages[0]) == ["id-0", "id-1"]
+        assert ids(pages[2]) == ["id-4"]
+        # Items come back as the same compact records the listing produces
+        assert all(isinstance(item, SchoolRecord) for item in pages[0])
+        assert pages[0][0].get("nama") == "SD 0"
+        assert journal.phones == {"id-0": "022-123", "id-1": None}
+    finally:
+        journal.close()
+
+
+def test_resume_appends_instead_of_starting_over(path):
+    write_journal(path)
+    journal = ScrapeJournal(path, JOB, resume=True)
+    journal.record_page(2, 1, 5, [school(2), school(3)])
+    journal.close()
+    replayed = ScrapeJournal(path, JOB, resume=True)
+    try:
+        assert sorted(replayed.resumed_pages(2)) == [0, 1, 2]
+        assert len(replayed.phones) == 2
+    finally:
+        replayed.close()
+
+
+def test_pages_of_another_size_are_not_reused(path):
+    write_journal(path)
+    journal = ScrapeJournal(path, JOB, resume=True)
+    try:
+        assert journal.resumed_pages(100) == {}
+    finally:
+        journal.close()
+
+
+def test_a_page_size_change_in_the_journal_drops_the_older_pages(path):
+    journal = ScrapeJournal(path, JOB)
+    journal.record_page(2, 0, 5, [school(0), school(1)])
+    journal.record_page(5, 0, 5, [school(n) for n in range(5)])
+    journal.close()
+    resumed = ScrapeJournal(path, JOB, resume=True)
+    try:
+        assert resumed.page_size == 5
+        assert ids(resumed.resumed_pages(5)[0]) == [f"id-{n}" for n in range(5)]
+    finally:
+        resumed.close()
+
+
+def test_torn_last_line_is_ignored(path):
+    write_journal(path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "phone", "id": "id-4", "pho')
+    journal = ScrapeJournal(path, JOB, resume=True)
+    try:
+        assert sorted(journal.resumed_pages(2)) == [0, 2]
+        assert "id-4" not in journal.phones
+    finally:
+        journal.close()
+
+
+def test_a_different_job_starts_from_scratch(path):
+    write_journal(path)
+    journal = ScrapeJournal(path, {"kabupaten_kota": "Kota Bogor", "skip_phone": False}, resume=True)
+    journal.close()
+    assert journal.pages == {} and journal.phones == {}
+    # The old job's entries are gone from the file too
+    again = ScrapeJournal(path, JOB, resume=True)
+    try:
+        assert again.pages == {} and again.phones == {}
+    finally:
+        again.close()
+
+
+def test_without_resume_the_journal_is_overwritten(path):
+    write_journal(path)
+    ScrapeJournal(path, JOB).close()
+    journal = ScrapeJournal(path, JOB, resume=True)
+    try:
+        assert journal.pages == {}
+    finally:
+        journal.close()
+
+
+def test_close_can_remove_the_journal(path):
+    journal = ScrapeJournal(path, JOB)
+    journal.close(remove=True)
+    assert not path.exists()
+    journal.close()
+
+
+def test_split_journaled_phones(path):
+    write_journal(path)
+    journal = ScrapeJournal(path, JOB, resume=True)
+    try:
+        phones, remaining = split_journaled_phones(["id-0", "id-1", "id-2"], journal)
+        assert phones == {"id-0": "022-123", "id-1": None}
+        assert remaining == ["id-2"]
+    finally:
+        journal.close()
+    assert split_journaled_phones(["id-0"], None) == ({}, ["id-0"])
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from scrape_sekolah_kita import JsonArrayStream, SchoolRecord, read_json_array, school_record_hook
+
+
+def chunked(text: str, size: int):
+    raw = text.encode("utf-8")
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+PAGE = {
+    "total": 3,
+    "data": [
+        {"sekolah_id": "a", "nama": "SD Négeri 1", "score": -12.5e3, "tags": [1, 2.25, None, True]},
+        {"sekolah_id": "b", "nama": "Jl. \"Kutip\" \\ miring", "score": 1000},
+        {"sekolah_id": "c", "nama": "☃ salju", "score": 0},
+    ],
+    "page": {"number": 0, "size": 3},
+}
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100000])
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_matches_json_loads_for_any_chunking(size, separators):
+    text = json.dumps(PAGE, ensure_ascii=False, separators=separators)
+    result, _ = read_json_array(chunked(text, size), "data")
+    assert result == json.loads(text)
+
+
+def test_numbers_split_across_chunks_are_not_truncated():
+    result, _ = read_json_array([b'{"data": [1', b"2.5", b"e1, 3", b"]}"], "data")
+    assert result == {"data": [125.0, 3]}
+
+
+def test_items_are_yielded_before_the_body_ends():
+    def chunks():
+        yield b'{"total": 2, "data": [{"sekolah_id": "a"},'
+        # The first item must already be out before the rest is read
+        assert seen == [{"sekolah_id": "a"}]
+        yield b' {"sekolah_id": "b"}]}'
+
+    seen = []
+    stream = JsonArrayStream(chunks(), "data")
+    for item in stream:
+        seen.append(item)
+    assert seen == [{"sekolah_id": "a"}, {"sekolah_id": "b"}]
+    assert stream.fields == {"total": 2}
+
+
+def test_object_hook_applies_to_items_only():
+    text = json.dumps(PAGE)
+    result, _ = read_json_array(chunked(text, 5), "data", object_hook=school_record_hook)
+    assert all(isinstance(item, SchoolRecord) for item in result["data"])
+    assert result["page"] == {"number": 0, "size": 3}
+
+
+def test_empty_array_and_missing_key():
+    assert read_json_array([b'{"data": [], "total": 0}'], "data")[0] == {"data": [], "total": 0}
+    assert read_json_array([b'{"total": 0}'], "data")[0] == {"total": 0, "data": []}
+
+
+def test_non_array_member_is_kept_whole():
+    assert read_json_array([b'{"data": null}'], "data")[0] == {"data": None}
+
+
+@pytest.mark.parametrize("body", [b'{"data": [1, 2', b'{"data": [1 2]}', b"[1, 2]", b""])
+def test_malformed_bodies_raise_value_error(body):
+    with pytest.raises(ValueError):
+        read_json_array(chunked(body.decode(), 3), "data")
@@ -0,0 +1,104 @@
+import pytest
+
+import scrape_sekolah_kita as sks
+from scrape_sekolah_kita import (
+    ALLOWED_BENTUK_PENDIDIKAN,
+    PARTITION_STATUSES,
+    ListingCounts,
+    collect_partitions,
+    plan_partitions,
+)
+
+FORMS = ALLOWED_BENTUK_PENDIDIKAN.split(",")
+
+
+def make_schools(kab, count, status_of=lambda n: PARTITION_STATUSES[n % 2]):
+    return [
+        {
+            "sekolah_id": f"{kab}-{n}",
+            "nama": f"Sekolah {n}",
+            "kabupaten": kab,
+            "bentuk_pendidikan": FORMS[n % len(FORMS)],
+            "status_sekolah": status_of(n),
+        }
+        for n in range(count)
+    ]
+
+
+@pytest.fixture
+def api(monkeypatch):
+    # In-memory cari-sekolah: fetch_page filtered like the real endpoint, plus a log of the queries made
+    schools = []
+    queries = []
+
+    def fetch_page(page, size, kab="", retries=3, bentuk=ALLOWED_BENTUK_PENDIDIKAN, status=""):
+        queries.append((kab, bentuk, status, page, size))
+        forms = bentuk.split(",")
+        rows = [
+            row
+            for row in schools
+            if row["kabupaten"] == kab and row["bentuk_pendidikan"] in forms and (not status or row["status_sekolah"] == status)
+        ]
+        return {"total": len(rows), "data": rows[page * size : (page + 1) * size]}
+
+    monkeypatch.setattr(sks, "fetch_page", fetch_page)
+    monkeypatch.setattr(sks, "LISTING_COUNTS", ListingCounts())
+    monkeypatch.setattr(sks, "REGION_INDEX", None)
+    monkeypatch.setattr(sks, "CIRCUIT_BREAKER", sks.CircuitBreaker(threshold=0))
+    return schools, queries
+
+
+def ids(items):
+    return sorted(item["sekolah_id"] for item in items)
+
+
+def test_plan_skips_known_empty_sub_queries_and_puts_unknown_sizes_first(api):
+    sks.LISTING_COUNTS.record(("A", "TK", "NEGERI"), 0)
+    sks.LISTING_COUNTS.record(("A", "TK", "SWASTA"), 40)
+    sks.LISTING_COUNTS.record(("A", "KB", "NEGERI"), 7)
+    plan, skipped = plan_partitions(["A"])
+    assert skipped == 1
+    assert len(plan) == len(FORMS) * len(PARTITION_STATUSES) - 1
+    assert ("A", "TK", "NEGERI") not in [key for key, _ in plan]
+    estimates = [estimate for _, estimate in plan]
+    assert estimates[-2:] == [40, 7]
+    assert all(estimate is None for estimate in estimates[:-2])
+
+
+def test_matching_totals_use_the_sub_queries_only(api):
+    schools, queries = api
+    schools.extend(make_schools("A", 57) + make_schools("B", 12))
+    items, totals, complete = collect_partitions(["A", "B"], 5, None, 4)
+    assert complete
+    assert totals == {"A": 57, "B": 12}
+    assert ids(items["A"]) == ids(make_schools("A", 57))
+    assert ids(items["B"]) == ids(make_schools("B", 12))
+    # Only one-row count requests went out unpartitioned
+    assert all(size == 1 for kab, bentuk, status, page, size in queries if not status)
+
+
+def test_a_short_region_is_listed_again_unpartitioned(api):
+    schools, queries = api
+    # Every fifth school has no status, so no NEGERI/SWASTA sub-query returns it
+    schools.extend(make_schools("A", 30, status_of=lambda n: "" if n % 5 == 0 else PARTITION_STATUSES[n % 2]))
+    schools.extend(make_schools("B", 10))
+    items, totals, complete = collect_partitions(["A", "B"], 4, None, 3)
+    assert complete
+    assert ids(items["A"]) == ids(schools[:30])
+    assert len(items["A"]) == 30
+    assert ids(items["B"]) == ids(schools[30:])
+    full = {kab for kab, bentuk, status, page, size in queries if not status and size > 1}
+    assert full == {"A"}
+
+
+def test_a_skipped_sub_query_that_gained_schools_is_caught(api):
+    schools, _ = api
+    schools.extend(make_schools("A", 20))
+    # An earlier run saw no TK NEGERI schools, so the plan leaves that sub-query out
+    grown = ("A", "TK", "NEGERI")
+    sks.LISTING_COUNTS.record(grown, 0)
+    schools.append({"sekolah_id": "A-new", "kabupaten": "A", "bentuk_pendidikan": "TK", "status_sekolah": "NEGERI"})
+    items, totals, complete = collect_partitions(["A"], 0, None, 2)
+    assert totals == {"A": 21}
+    assert "A-new" in ids(items["A"])
+    assert len(items["A"]) == 21
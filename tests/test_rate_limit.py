@@ -0,0 +1,93 @@
+import email.utils
+import time
+import urllib.error
+from email.message import Message
+
+import pytest
+
+from scrape_sekolah_kita import MAX_RETRY_AFTER, TokenBucket, parse_retry_after, retry_delay
+
+
+def http_error(code, retry_after=None):
+    headers = Message()
+    if retry_after is not None:
+        headers["Retry-After"] = retry_after
+    return urllib.error.HTTPError("http://example.test/", code, "error", headers, None)
+
+
+def test_burst_is_free_then_tokens_arrive_at_the_rate():
+    bucket = TokenBucket(rate=10.0, burst=3)
+    waits = [bucket.reserve()[0] for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.1, abs=0.01)
+    assert waits[4] == pytest.approx(0.2, abs=0.01)
+
+
+def test_idle_time_refills_up_to_the_burst():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    for _ in range(2):
+        bucket.reserve()
+    # A long idle spell is worth at most `burst` tokens
+    bucket.updated -= 10.0
+    waits = [bucket.reserve()[0] for _ in range(3)]
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] > 0
+
+
+def test_disabled_bucket_does_not_wait_but_honours_pauses():
+    bucket = TokenBucket(rate=1.0, burst=1, enabled=False)
+    assert [bucket.reserve()[0] for _ in range(10)] == [0.0] * 10
+    bucket.pause(5.0)
+    assert bucket.reserve()[0] == pytest.approx(5.0, abs=0.05)
+
+
+def test_pause_delays_everyone_and_is_counted_once():
+    bucket = TokenBucket(rate=100.0, burst=5)
+    bucket.pause(2.0)
+    bucket.pause(1.0)  # Shorter than the pause in force: ignored
+    wait, pauses = bucket.reserve()
+    assert pauses == 1
+    assert wait == pytest.approx(2.0, abs=0.05)
+    # No tokens piled up during the pause
+    assert bucket.tokens < 1
+
+
+def test_acquire_requeues_after_a_pause_while_sleeping():
+    bucket = TokenBucket(rate=1000.0, burst=1)
+    bucket.reserve()
+    bucket.pause(0.05)
+    started = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - started >= 0.04
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(None, None), ("", None), ("7", 7.0), (" 2.5 ", 2.5), ("-3", 0.0), ("99999", MAX_RETRY_AFTER), ("soon", None)],
+)
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    when = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert parse_retry_after(when) == pytest.approx(30, abs=2)
+    assert parse_retry_after(email.utils.formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+
+def test_retry_delay_uses_retry_after_and_pauses_the_limiter():
+    bucket = TokenBucket(rate=10.0, burst=1)
+    assert retry_delay(http_error(429, "4"), 1, 2.0, bucket) == 4.0
+    assert bucket.pauses == 1
+    assert bucket.paused_until - time.monotonic() == pytest.approx(4.0, abs=0.05)
+
+
+def test_retry_delay_without_retry_after_grows_with_attempts():
+    bucket = TokenBucket(rate=10.0, burst=1)
+    for attempt in (1, 3):
+        delay = retry_delay(http_error(500), attempt, 2.0, bucket)
+        assert 2.0 * attempt + 0.5 <= delay <= 2.0 * attempt + 1.5
+    # Only 429/503 speak for the whole client
+    assert bucket.pauses == 0
+    retry_delay(http_error(503), 1, 2.0, bucket)
+    assert bucket.pauses == 1
@@ -0,0 +1,60 @@
+import json
+import sys
+
+from scrape_sekolah_kita import SchoolRecord, dedupe_schools, merge_pages, output_row, school_record_hook
+
+ITEM = {
+    "sekolah_id": "abc",
+    "npsn": "20219999",
+    "nama": "TK Negeri Pembina",
+    "alamat_jalan": "Jl. Merdeka 1",
+    "kabupaten": "Kota Bandung",
+    "provinsi": "Prov. Jawa Barat",
+    "bentuk_pendidikan": "TK",
+    "status_sekolah": "NEGERI",
+}
+
+
+def test_record_keeps_only_the_fields_the_scraper_reads():
+    record = SchoolRecord.from_item(ITEM)
+    assert record.as_dict() == {field: ITEM[field] for field in SchoolRecord.__slots__}
+    assert record.get("npsn") is None
+    assert record.get("npsn", "-") == "-"
+    assert not hasattr(record, "__dict__")
+
+
+def test_region_names_are_interned():
+    first = SchoolRecord.from_item(json.loads(json.dumps(ITEM)))
+    second = SchoolRecord.from_item(json.loads(json.dumps(ITEM)))
+    assert first.kabupaten is second.kabupaten
+    assert first.provinsi is sys.intern("Prov. Jawa Barat")
+
+
+def test_output_row_is_the_same_for_records_and_raw_items():
+    assert output_row(SchoolRecord.from_item(ITEM), "022") == output_row(ITEM, "022")
+    assert output_row(SchoolRecord.from_item({"sekolah_id": "x"}), None) == ("", "", "", "", "", "x")
+
+
+def test_hook_projects_school_items_only():
+    page = json.loads(json.dumps({"total": 1, "data": [ITEM], "meta": {"page": 0}}), object_hook=school_record_hook)
+    assert isinstance(page["data"][0], SchoolRecord)
+    assert page["meta"] == {"page": 0}
+
+
+def test_record_serialises_back_to_json():
+    text = json.dumps([SchoolRecord.from_item(ITEM)], default=SchoolRecord.as_dict)
+    assert json.loads(text, object_hook=school_record_hook)[0].as_dict() == SchoolRecord.from_item(ITEM).as_dict()
+
+
+def test_merge_pages_orders_and_consumes_pages():
+    pages = {2: ["c"], 0: ["a"], 1: ["b"]}
+    assert merge_pages(pages) == ["a", "b", "c"]
+    assert pages == {}
+
+
+def test_dedupe_keeps_the_first_copy_and_rows_without_an_id():
+    a = SchoolRecord.from_item({"sekolah_id": "a", "nama": "first"})
+    rows, duplicates = dedupe_schools([[a, {"sekolah_id": None}], [{"sekolah_id": "a", "nama": "second"}, {}]])
+    assert rows[0] is a
+    assert len(rows) == 3
+    assert duplicates == 1
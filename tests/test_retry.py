@@ -0,0 +1,313 @@
+import queue
+import socket
+import threading
+import time
+import urllib.error
+
+import pytest
+
+import scrape_sekolah_kita as sks
+from scrape_sekolah_kita import CircuitBreaker, HedgePolicy, RequestCancelled, RetryScheduler, RunMetrics
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    # Retries become due at once; the backoff itself is covered in test_rate_limit
+    monkeypatch.setattr(sks, "retry_delay", lambda *args: 0.0)
+
+
+def http_error(code):
+    return urllib.error.HTTPError("http://example.test/", code, "error", None, None)
+
+
+def flaky(failures, error):
+    # Fails `failures` times with `error`, then returns the number of calls made
+    calls = []
+    lock = threading.Lock()
+
+    def call(*args):
+        with lock:
+            calls.append(args)
+            if len(calls) <= failures:
+                raise error
+            return len(calls)
+
+    return call, calls
+
+
+def run_jobs(scheduler, jobs):
+    with scheduler:
+        for key, fn in jobs.items():
+            scheduler.submit(key, fn)
+        return {key: (result, error) for key, result, error in scheduler.as_completed()}
+
+
+def closed_breaker():
+    return CircuitBreaker(threshold=0)
+
+
+def test_retryable_errors_are_retried_until_success():
+    metrics = RunMetrics()
+    fn, calls = flaky(2, http_error(503))
+    scheduler = RetryScheduler("cari-sekolah", 2, attempts=5, breaker=closed_breaker(), metrics=metrics)
+    assert run_jobs(scheduler, {"page": fn}) == {"page": (3, None)}
+    assert len(calls) == 3
+    assert metrics.endpoints["cari-sekolah"].retries == 2
+
+
+def test_gives_up_after_the_last_attempt():
+    error = socket.timeout("timed out")
+    fn, calls = flaky(10, error)
+    scheduler = RetryScheduler("full-detail", 1, attempts=3, breaker=closed_breaker(), metrics=RunMetrics())
+    assert run_jobs(scheduler, {"id": fn}) == {"id": (None, error)}
+    assert len(calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    error = http_error(404)
+    fn, calls = flaky(10, error)
+    scheduler = RetryScheduler("full-detail", 1, attempts=5, breaker=closed_breaker(), metrics=RunMetrics())
+    assert run_jobs(scheduler, {"id": fn}) == {"id": (None, error)}
+    assert len(calls) == 1
+
+
+def test_every_job_reports_once_and_a_failure_does_not_hold_up_the_rest():
+    slow, _ = flaky(3, http_error(500))
+    jobs = {n: (lambda n=n: n * 10) for n in range(20)}
+    jobs["slow"] = slow
+    scheduler = RetryScheduler("cari-sekolah", 4, attempts=5, breaker=closed_breaker(), metrics=RunMetrics())
+    results = run_jobs(scheduler, jobs)
+    assert results.pop("slow") == (4, None)
+    assert results == {n: (n * 10, None) for n in range(20)}
+
+
+def test_schedulers_can_share_a_results_queue():
+    events = queue.Queue()
+    breaker = closed_breaker()
+    with RetryScheduler("cari-sekolah", 1, breaker=breaker, results=events) as listing, RetryScheduler(
+        "full-detail", 1, breaker=breaker, results=events
+    ) as details:
+        listing.submit(("page", 0), lambda: "page")
+        details.submit(("phone", 0, "a"), lambda: "phone")
+        got = {events.get(timeout=5) for _ in range(2)}
+    assert got == {(("page", 0), "page", None), (("phone", 0, "a"), "phone", None)}
+
+
+def test_deadline_cancels_what_is_left():
+    scheduler = RetryScheduler(
+        "full-detail", 1, breaker=closed_breaker(), metrics=RunMetrics(), deadline=time.monotonic() + 0.2
+    )
+    results = run_jobs(scheduler, {n: (lambda: time.sleep(0.1)) for n in range(10)})
+    assert scheduler.cancelled
+    assert 0 < len(results) < 10
+
+
+def test_breaker_trips_on_overload_and_closes_after_a_good_probe():
+    breaker = CircuitBreaker(threshold=0.5, window=4, cooldown=0.05)
+    for error in (http_error(500), None, http_error(429), None):
+        assert breaker.wait() is False
+        breaker.record(error)
+    assert breaker.state == "open"
+    assert breaker.trips == 1
+    started = time.monotonic()
+    assert breaker.wait() is True
+    assert time.monotonic() - started >= 0.04
+    assert breaker.state == "half-open"
+    breaker.record(None, probe=True)
+    assert breaker.state == "closed"
+    assert breaker.wait() is False
+
+
+def timed_wait(breaker):
+    started = time.monotonic()
+    assert breaker.wait() is True
+    return time.monotonic() - started
+
+
+def test_failed_probe_doubles_the_cooldown():
+    breaker = CircuitBreaker(threshold=1.0, window=1, cooldown=0.1, max_cooldown=0.3)
+    breaker.record(socket.timeout())
+    assert timed_wait(breaker) == pytest.approx(0.1, abs=0.05)
+    breaker.record(http_error(503), probe=True)
+    assert breaker.state == "open"
+    assert timed_wait(breaker) == pytest.approx(0.2, abs=0.05)
+    breaker.record(http_error(503), probe=True)
+    assert timed_wait(breaker) == pytest.approx(0.3, abs=0.05)
+    breaker.record(None, probe=True)
+    assert breaker.state == "closed"
+
+
+def test_only_one_caller_probes():
+    breaker = CircuitBreaker(threshold=1.0, window=1, cooldown=0.02)
+    breaker.record(http_error(500))
+    assert breaker.wait() is True
+    # Everyone else stays parked until the probe answers
+    stop = threading.Event()
+    threading.Timer(0.05, stop.set).start()
+    assert breaker.wait(cancelled=stop.is_set) is None
+    breaker.record(None, probe=True)
+    assert breaker.wait() is False
+
+
+def test_client_errors_do_not_trip_the_breaker():
+    breaker = CircuitBreaker(threshold=0.5, window=4)
+    for _ in range(8):
+        breaker.record(http_error(404))
+    assert breaker.state == "closed"
+
+
+def test_scheduler_holds_jobs_while_the_breaker_is_open():
+    breaker = CircuitBreaker(threshold=1.0, window=1, cooldown=0.2)
+    breaker.record(http_error(500))
+    started = time.monotonic()
+    scheduler = RetryScheduler("full-detail", 2, breaker=breaker, metrics=RunMetrics())
+    assert run_jobs(scheduler, {n: (lambda n=n: n) for n in range(4)}) == {n: (n, None) for n in range(4)}
+    assert time.monotonic() - started >= 0.15
+    assert breaker.state == "closed"
+
+
+class RecordingBreaker(CircuitBreaker):
+    def __init__(self):
+        super().__init__(threshold=0)
+        self.outcomes = []
+
+    def record(self, error, probe=False):
+        self.outcomes.append(error)
+        super().record(error, probe)
+
+
+def test_default_listing_retries_page_zero_through_the_scheduler_and_breaker(monkeypatch):
+    # No --page-size: a count request sizes the page, then the whole listing is page 0
+    schools = [{"sekolah_id": f"id-{n}", "nama": f"SD {n}"} for n in range(30)]
+    calls = []
+
+    def fetch_page(page, size, kab="", retries=3, bentuk=sks.ALLOWED_BENTUK_PENDIDIKAN, status=""):
+        calls.append((page, size, retries))
+        # Each request fails the first time it is sent
+        if calls.count((page, size, retries)) == 1:
+            raise http_error(503)
+        return {"total": len(schools), "data": schools[page * size : (page + 1) * size]}
+
+    breaker = RecordingBreaker()
+    monkeypatch.setattr(sks, "fetch_page", fetch_page)
+    monkeypatch.setattr(sks, "CIRCUIT_BREAKER", breaker)
+    monkeypatch.setattr(sks, "LISTING_COUNTS", sks.ListingCounts())
+    monkeypatch.setattr(sks, "REGION_INDEX", None)
+    items, total = sks.collect_pages(0, None, 2)
+    assert total == 30
+    assert [item["sekolah_id"] for item in items] == [row["sekolah_id"] for row in schools]
+    # One HTTP attempt per job; the scheduler did the retrying
+    assert calls == [(0, 1, 1), (0, 1, 1), (0, 30, 1), (0, 30, 1)]
+    assert [type(error) for error in breaker.outcomes] == [urllib.error.HTTPError, type(None)] * 2
+
+
+class FakePool:
+    # Stands in for ConnectionPool: jobs mark when their "request" started, cancel() aborts it
+    def __init__(self):
+        self.starts = {}
+        self.cancelled = []
+        self._events = {}
+
+    def begin(self):
+        thread = threading.get_ident()
+        self._events[thread] = threading.Event()
+        self.starts[thread] = time.monotonic()
+        return self._events[thread]
+
+    def end(self):
+        self.starts.pop(threading.get_ident(), None)
+
+    def started(self, thread):
+        return self.starts.get(thread)
+
+    def cancel(self, thread):
+        self.cancelled.append(thread)
+        if thread in self._events:
+            self._events[thread].set()
+
+
+def hedge_policy(metrics, max_share=1.0):
+    # Trusts its threshold after a single 10ms answer
+    policy = HedgePolicy("full-detail", pct=50, max_share=max_share, min_samples=1, metrics=metrics)
+    for _ in range(20):
+        policy.observe("full-detail", 0.01, None)
+    return policy
+
+
+def scripted(pool, steps):
+    # Call n runs steps[n]: ("ok", seconds) answers after a delay, ("fail", seconds) raises a 503 after it.
+    # A cancelled call raises RequestCancelled at once. Returns the call function and the threads used.
+    threads = []
+    lock = threading.Lock()
+
+    def call():
+        with lock:
+            n = len(threads)
+            threads.append(threading.get_ident())
+        outcome, seconds = steps[min(n, len(steps) - 1)]
+        cancelled = pool.begin()
+        try:
+            if cancelled.wait(seconds):
+                raise RequestCancelled("cancelled")
+        finally:
+            pool.end()
+        if outcome == "fail":
+            raise http_error(503)
+        return n
+
+    return call, threads
+
+
+def test_slow_request_is_hedged_and_the_loser_cancelled():
+    metrics = RunMetrics()
+    pool = FakePool()
+    policy = hedge_policy(metrics)
+    fn, threads = scripted(pool, [("ok", 5.0), ("ok", 0.0)])
+    scheduler = RetryScheduler(
+        "full-detail", 2, breaker=closed_breaker(), hedge=policy, pool=pool, metrics=metrics
+    )
+    started = time.monotonic()
+    assert run_jobs(scheduler, {"slow": fn}) == {"slow": (1, None)}
+    assert time.monotonic() - started < 2.0
+    assert len(threads) == 2
+    # The original's request was cancelled once the copy answered
+    assert pool.cancelled == [threads[0]]
+    assert (policy.fired, policy.won) == (1, 1)
+    assert (metrics.endpoints["full-detail"].hedges, metrics.endpoints["full-detail"].hedges_won) == (1, 1)
+
+
+def test_fast_requests_are_not_hedged():
+    metrics = RunMetrics()
+    pool = FakePool()
+    policy = hedge_policy(metrics)
+    fn, threads = scripted(pool, [("ok", 0.0)])
+    scheduler = RetryScheduler("full-detail", 2, breaker=closed_breaker(), hedge=policy, pool=pool, metrics=metrics)
+    assert run_jobs(scheduler, {n: fn for n in range(5)}) == {n: (n, None) for n in range(5)}
+    assert policy.fired == 0
+    assert "full-detail" not in metrics.endpoints
+
+
+def test_hedges_are_capped_to_a_share_of_requests():
+    policy = HedgePolicy("full-detail", max_share=0.1, min_samples=1, metrics=RunMetrics())
+    for _ in range(20):
+        policy.observe("full-detail", 0.01, None)
+    # Other endpoints do not count towards the budget
+    policy.observe("cari-sekolah", 0.01, None)
+    assert [policy.allow() for _ in range(3)] == [True, True, False]
+    assert policy.metrics.endpoints["full-detail"].hedges == 2
+    assert policy.metrics.endpoints["full-detail"].hedges_won == 0
+
+
+def test_a_hedge_continues_the_original_attempt_count():
+    # attempts=2: the first attempt fails fast, the last one is slow and gets hedged, then both copies fail
+    pool = FakePool()
+    policy = hedge_policy(RunMetrics())
+    fn, threads = scripted(pool, [("fail", 0.0), ("fail", 0.3), ("fail", 0.4), ("ok", 0.0)])
+    scheduler = RetryScheduler(
+        "full-detail", 2, attempts=2, breaker=closed_breaker(), hedge=policy, pool=pool, metrics=RunMetrics()
+    )
+    results = run_jobs(scheduler, {"id": fn})
+    assert isinstance(results["id"][1], urllib.error.HTTPError)
+    # Two attempts plus the one hedge, not a fresh set of attempts for the copy
+    assert len(threads) == 3
+    assert policy.fired == 1